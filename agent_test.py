@@ -7,23 +7,25 @@ interface, but cannot be automatically assessed for correctness.
 STUDENTS SHOULD NOT NEED TO MODIFY THIS CODE.  IT WOULD BE BEST TO TREAT THIS
 FILE AS A BLACK BOX FOR TESTING.
 """
+import gc
 import random
 import unittest
 import timeit
 import sys
+import tracemalloc
 
 import isolation
 import game_agent
+import memstats
+import pn_search
 
-from collections import Counter
-from copy import deepcopy
-from copy import copy
 from functools import wraps
 from queue import Queue
 from threading import Thread
 from multiprocessing import TimeoutError
 from queue import Empty as QueueEmptyError
 from importlib import reload
+from isolation.clocks import NodeClock
 from patsy.test_highlevel import test_0d_data
 
 WRONG_MOVE = """
@@ -171,47 +173,69 @@ def makeBranchEval(first_branch):
     return score
 
 
-class CounterBoard(isolation.Board):
-    """Subclass of the isolation board that maintains counters for the number
-    of unique nodes and total nodes visited during depth first search.
-
-    Some functions from the base class must be overridden to maintain the
-    counters during search.
+class CounterBoard(isolation.InstrumentedBoard):
+    """Subclass of the instrumented isolation board that reports the number
+    of unique nodes and total nodes visited during depth first search, and
+    the first move on the search path (`root`) of every forecast board.
     """
 
     def __init__(self, *args, **kwargs):
         super(CounterBoard, self).__init__(*args, **kwargs)
-        self.counter = Counter()
-        self.visited = set()
         self.root = None
 
     def copy(self):
-        new_board = CounterBoard(self.__player_1__, self.__player_2__,
-                                 width=self.width, height=self.height)
-        new_board.move_count = self.move_count
-        new_board.__active_player__ = self.__active_player__
-        new_board.__inactive_player__ = self.__inactive_player__
-        new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
-        new_board.counter = self.counter
-        new_board.visited = self.visited
+        new_board = super(CounterBoard, self).copy()
         new_board.root = self.root
         return new_board
 
-    def forecast_move(self, move):
-        self.counter[move] += 1
-        self.visited.add(move)
-        new_board = self.copy()
-        new_board.apply_move(move)
+    def forecast_cell(self, cell):
+        new_board = super(CounterBoard, self).forecast_cell(cell)
         if new_board.root is None:
-            new_board.root = move
+            new_board.root = new_board.to_move(cell)
         return new_board
 
+    @property
+    def visits(self):
+        """ Counter of the visits of every move """
+        return self.counters.forecasts
+
     @property
     def counts(self):
         """ Return counts of (total, unique) nodes visited """
-        return sum(self.counter.values()), len(self.visited)
+        return sum(self.visits.values()), len(self.visits)
+
+
+class UndoCounterBoard(CounterBoard):
+    """Subclass of the counter board for make/unmake search, which applies
+    and takes back moves on a single board instead of forecasting copies.
+
+    Once `track()` is called, every applied move counts as a node visit and
+    `root` follows the first move on the current search path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(UndoCounterBoard, self).__init__(*args, **kwargs)
+        self.path = None
+
+    def track(self):
+        self.counters.reset()
+        self.path = []
+
+    @property
+    def visits(self):
+        return self.counters.applies
+
+    def apply_cell(self, cell):
+        if self.path is not None:
+            self.path.append(cell)
+            self.root = self.to_move(self.path[0])
+        super(UndoCounterBoard, self).apply_cell(cell)
+
+    def undo_cell(self, cell, last_cell):
+        super(UndoCounterBoard, self).undo_cell(cell, last_cell)
+        if self.path is not None:
+            self.path.pop()
+            self.root = self.to_move(self.path[0]) if self.path else None
 
 
 class Project1Test(unittest.TestCase):
@@ -536,5 +560,363 @@ class Project1Test(unittest.TestCase):
             self.assertTrue(chosen_move in legal_moves, INVALID_MOVE.format(
                 legal_moves, chosen_move))
 
+class SearchFeaturesTest(unittest.TestCase):
+    """Test the optional alphabeta refinements (late move reductions and
+    search extensions) against plain alphabeta search."""
+
+    def search(self, board, depth, **kwargs):
+        agentUT = game_agent.CustomPlayer(depth, game_agent.custom_score_improved,
+                                          False, "alphabeta", **kwargs)
+        agentUT.time_left = lambda: 1e3
+        _, move = agentUT.alphabeta(board, depth)
+        return agentUT.nodes, move
+
+    def make_board(self):
+        board = isolation.Board("player1", "player2", 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 1), (3, 4), (4, 3)]:
+            board.apply_move(move)
+        return board
+
+    @timeout(20)
+    def test_late_move_reductions(self):
+        """ Test that late move reductions visit fewer nodes """
+        board = self.make_board()
+        plain_nodes, _ = self.search(board, 5)
+        lmr_nodes, move = self.search(board, 5, lmr=True)
+        self.assertLess(lmr_nodes, plain_nodes)
+        self.assertIn(move, board.get_legal_moves())
+
+    @timeout(20)
+    def test_extensions(self):
+        """ Test that forced positions are searched past the nominal depth """
+        board = isolation.Board("player1", "player2", 7, 7)
+        for move in [(0, 0), (1, 2)]:
+            board.apply_move(move)
+        self.assertEqual(len(board.get_legal_moves()), 1)
+        plain_nodes, _ = self.search(board, 1)
+        ext_nodes, move = self.search(board, 1, extensions=True)
+        self.assertGreater(ext_nodes, plain_nodes)
+        self.assertIn(move, board.get_legal_moves())
+
+
+class PersistentStateTest(unittest.TestCase):
+    """Test the search state retained by CustomPlayer between turns."""
+
+    @timeout(20)
+    def test_state_reuse(self):
+        """ Test that tables survive within a game and reset on a new game """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_improved,
+                                          False, "alphabeta", persistent=True)
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertTrue(agentUT.state.tt)
+        self.assertEqual(board.to_move(agentUT.state.pv[0]), move)
+        expected = agentUT.state.pv[:3]
+
+        board.apply_move(move)
+        board.apply_cell(agentUT.state.pv[1])
+        agentUT.state.begin(board)
+        self.assertTrue(agentUT.state.tt)
+        self.assertEqual(agentUT.state.pv[:1], expected[2:])
+
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        agentUT.state.begin(board)
+        self.assertFalse(agentUT.state.tt)
+        self.assertFalse(agentUT.state.pv)
+
+
+class AnytimeSearchTest(unittest.TestCase):
+    """Test the anytime search mode of CustomPlayer."""
+
+    @timeout(5)
+    def test_anytime_deadline(self):
+        """ Test that an anytime search returns its best move at the deadline """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                          method="alphabeta", anytime=True)
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        legal_moves = board.get_legal_moves()
+
+        start = curr_time_millis()
+        time_left = lambda: 100 - (curr_time_millis() - start)
+        move = agentUT.get_move(board, legal_moves, time_left)
+
+        self.assertGreater(time_left(), 0)
+        self.assertIn(move, legal_moves)
+        self.assertEqual(agentUT._result.move, move)
+        self.assertGreater(agentUT._result.best[2], 1)
+        # only fully completed iterations count as the search depth
+        info = agentUT.search_info()
+        self.assertLessEqual(info["depth"], agentUT._result.completed)
+        self.assertGreater(info["depth"], 0)
+        if agentUT._result.best[2] > info["depth"]:
+            self.assertEqual(info["partial_depth"], agentUT._result.best[2])
+        else:
+            self.assertNotIn("partial_depth", info)
+
+    @timeout(5)
+    def test_anytime_node_clock(self):
+        """ Test that an anytime search under a node clock is reproducible """
+        results = []
+        for _ in range(3):
+            agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                              method="alphabeta", anytime=True)
+            board = isolation.Board(agentUT, "null_agent", 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            move = agentUT.get_move(board, board.get_legal_moves(),
+                                    NodeClock(20000).timer(150))
+            results.append((move, agentUT.depth, agentUT.nodes))
+        self.assertEqual(len(set(results)), 1)
+
+    @timeout(5)
+    def test_worker_joined(self):
+        """ Test that the worker of a move is stopped before the next move """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                          method="alphabeta", anytime=True)
+        fresh = game_agent.CustomPlayer(3, game_agent.custom_score_improved,
+                                        False, "alphabeta")
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+
+        start = curr_time_millis()
+        agentUT.get_move(board, board.get_legal_moves(),
+                         lambda: 30 - (curr_time_millis() - start))
+        agentUT.anytime, agentUT.iterative, agentUT.search_depth = False, False, 3
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertIsNone(agentUT._worker)
+        self.assertEqual(move, fresh.get_move(board, board.get_legal_moves(), lambda: 1e3))
+        self.assertEqual(agentUT.nodes, fresh.nodes)
+
+
+class NegamaxTest(unittest.TestCase):
+    """Test the non-recursive negamax engine against alphabeta."""
+
+    @timeout(20)
+    def test_negamax(self):
+        """ Test CustomPlayer.negamax with the alphabeta node expectations """
+        h, w = 101, 101  # board size
+        counts = [(8, 8), (17, 10), (74, 42), (139, 51), (540, 119)]
+
+        for idx in range(len(counts)):
+            test_depth = idx + 1
+            first_branch = []
+            heuristic = makeBranchEval(first_branch)
+            agentUT = game_agent.CustomPlayer(test_depth, heuristic, False, "negamax")
+            board = UndoCounterBoard(agentUT, 'null_agent', w, h)
+            board.apply_move((50, 50))
+            board.apply_move((0, 0))
+            board.track()
+            state = board.hash_key()
+
+            agentUT.time_left = lambda: 1e3
+            _, move = agentUT.negamax(board, test_depth)
+
+            self.assertEqual(board.counts, counts[idx], WRONG_NUM_EXPLORED.format(
+                "negamax", test_depth, counts[idx], board.counts))
+            self.assertIn(move, first_branch)
+            self.assertEqual(board.hash_key(), state)
+
+    @timeout(20)
+    def test_negamax_matches_alphabeta(self):
+        """ Test that negamax returns the alphabeta score and move """
+        board = isolation.Board("player1", "player2", 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 1), (3, 4), (4, 3)]:
+            board.apply_move(move)
+
+        for depth in range(1, 5):
+            agentUT = game_agent.CustomPlayer(depth, game_agent.custom_score_improved,
+                                              False, "alphabeta")
+            agentUT.time_left = lambda: 1e3
+            expected = agentUT.alphabeta(board, depth)
+            expected_nodes = agentUT.nodes
+            agentUT.nodes = 0
+            self.assertEqual(agentUT.negamax(board, depth), expected)
+            self.assertEqual(agentUT.nodes, expected_nodes)
+
+
+class ProofNumberSearchTest(unittest.TestCase):
+    """Test the proof-number solver against exhaustive search."""
+
+    def has_forced_win(self, game):
+        return any(not self.has_forced_win(game.forecast_move(move))
+                   for move in game.get_legal_moves())
+
+    @timeout(20)
+    def test_solver(self):
+        """ Test that the solver proves exactly the won positions """
+        rng = random.Random(0)
+        for _ in range(20):
+            board = isolation.Board("player1", "player2", 5, 5)
+            while board.move_count < 6 and board.get_legal_moves():
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            if not board.get_legal_moves():
+                continue
+
+            state = board.hash_key()
+            solver = pn_search.ProofNumberSearch(max_entries=500)
+            proven, move = solver.solve(board)
+
+            self.assertEqual(board.hash_key(), state)
+            self.assertEqual(proven, self.has_forced_win(board))
+            if proven:
+                self.assertFalse(self.has_forced_win(board.forecast_move(move)))
+
+    @timeout(5)
+    def test_get_move_proof(self):
+        """ Test that a proven win short-circuits get_move """
+        agentUT = game_agent.CustomPlayer(1, lambda g, p: 0., False, "minimax",
+                                          proof_search=True)
+        board = isolation.Board(agentUT, "null_agent", 5, 5)
+        for move in [(0, 0), (4, 4), (2, 1), (2, 3), (4, 2), (0, 4)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+        move = agentUT.get_move(board, legal_moves, lambda: 1e3)
+        self.assertEqual(agentUT.nodes, 0)
+        self.assertFalse(self.has_forced_win(board.forecast_move(move)))
+
+
+    @timeout(10)
+    def test_untimed_proof(self):
+        """ Test that the solver of an untimed agent stops at its node limit """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_improved, False,
+                                          "alphabeta", timeout=None, proof_search=True)
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        for move in [(6, 6), (6, 0), (5, 4), (4, 1), (4, 2), (2, 0), (6, 1), (0, 1)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+        move = agentUT.get_move(board, legal_moves, lambda: float("inf"))
+        self.assertIn(move, legal_moves)
+        self.assertLessEqual(agentUT.solver.nodes, agentUT.PROOF_NODE_LIMIT +
+                             agentUT.solver.check_interval)
+
+
+class NodeBudgetTest(unittest.TestCase):
+    """Test the fixed-node-budget search mode of CustomPlayer."""
+
+    @timeout(10)
+    def test_node_budget(self):
+        """ Test that a node budget search is reproducible and clock-free """
+        board = isolation.Board("player1", "player2", 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 1)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+
+        results = []
+        for time_left in [lambda: 1e4, lambda: -1.]:
+            agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                              method="alphabeta", timeout=None,
+                                              node_budget=2000)
+            move = agentUT.get_move(board, legal_moves, time_left)
+            self.assertIn(move, legal_moves)
+            self.assertLessEqual(agentUT.nodes, 2000)
+            results.append((move, agentUT.nodes))
+
+        self.assertEqual(results[0], results[1])
+
+    @timeout(10)
+    def test_proof_budget(self):
+        """ Test that the solver nodes count against the node budget """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                          method="alphabeta", timeout=None,
+                                          proof_search=True, node_budget=2000)
+        board = isolation.Board(agentUT, "null_agent", 7, 7)
+        for move in [(6, 6), (6, 0), (5, 4), (4, 1), (4, 2), (2, 0), (6, 1), (0, 1)]:
+            board.apply_move(move)
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4)
+        info = agentUT.search_info()
+        self.assertGreater(info["proof_nodes"], 0)
+        self.assertGreater(info["nodes"], 0)
+        self.assertLessEqual(info["nodes"] + info["proof_nodes"], 2000)
+
+
+class MemoryStatsTest(unittest.TestCase):
+    """Test the memory instrumentation and GC policies of CustomPlayer."""
+
+    @timeout(10)
+    def test_memory_stats(self):
+        """ Test that memory stats are reported without changing the search """
+        board = isolation.Board("player1", "player2", 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 1)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+
+        results = []
+        for policy in [None, 'freeze', 'disable']:
+            gc_enabled = gc.isenabled()
+            agentUT = game_agent.CustomPlayer(4, game_agent.custom_score_improved,
+                                              False, "alphabeta", gc_policy=policy,
+                                              memory_stats=True)
+            move = agentUT.get_move(board, legal_moves, lambda: 1e3)
+            info = agentUT.search_info()
+            self.assertGreater(info["copy_bytes"], 0)
+            self.assertGreater(info["copy_blocks"], 0)
+            self.assertGreaterEqual(info["peak_memory"], info["copy_bytes"])
+            self.assertEqual(gc.isenabled(), gc_enabled)
+            self.assertEqual(gc.get_freeze_count(), 0)
+            if policy == 'disable':
+                self.assertEqual(info["gc_collections"], 0)
+            results.append((move, agentUT.nodes))
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(len(set(results)), 1)
+
+        with self.assertRaises(ValueError):
+            game_agent.CustomPlayer(gc_policy='off')
+
+    def test_instrumented_counts(self):
+        """ Test that monitoring a move leaves the work counters unchanged """
+        counts = []
+        for memory_stats in [False, True]:
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_improved, False,
+                                              "alphabeta", memory_stats=memory_stats)
+            board = isolation.InstrumentedBoard(agentUT, "null_agent", 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            board.counters.reset()
+            agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+            counts.append(board.counters.as_dict())
+        self.assertEqual(counts[0], counts[1])
+
+    def test_host_freeze(self):
+        """ Test that the freeze policy keeps the objects frozen by the host """
+        gc.freeze()
+        try:
+            frozen = gc.get_freeze_count()
+            with memstats.GCPolicy('freeze'):
+                self.assertEqual(gc.get_freeze_count(), frozen)
+            self.assertEqual(gc.get_freeze_count(), frozen)
+        finally:
+            gc.unfreeze()
+        with memstats.GCPolicy('freeze'):
+            self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(gc.get_freeze_count(), 0)
+
+
+class LargeBoardTest(unittest.TestCase):
+    """Test CustomPlayer on boards larger than 7x7."""
+
+    @timeout(10)
+    def test_opening_move(self):
+        """ Test that the first placement on a large board is not searched """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                          method="alphabeta")
+        board = isolation.Board(agentUT, "null_agent", 15, 15)
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 100.)
+        self.assertEqual(move, (7, 7))
+        self.assertEqual(agentUT.nodes, 0)
+
+        board = isolation.Board("null_agent", agentUT, 15, 15)
+        board.apply_move((7, 7))
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 100.)
+        self.assertEqual(len(board.__get_moves__(move)), 8)
+        self.assertNotIn(move, board.__get_moves__((7, 7)))
+        self.assertEqual(agentUT.nodes, 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for the isolation engine and the search agents. Each module
+is runnable from the repository root, e.g. `python -m benchmarks.search_features`.
+"""
@@ -0,0 +1,111 @@
+"""
+Measure how the board and the search scale with the board area, from the
+standard 7x7 board to large boards.
+
+For every square board size the script reports:
+
+  * the time and traced memory to build the geometry tables of the size
+    (once per process, see `isolation.geometry`);
+  * the bytes traced for one board copy (forecast_move());
+  * nodes per second of a fixed-depth alpha-beta search with the improved
+    heuristic from seeded random positions of that size;
+  * the time CustomPlayer takes to choose its first placement on the empty
+    board, which is searched on small boards and chosen by
+    `game_agent.opening_move()` on large ones.
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+from benchmarks.positions import random_positions
+from game_agent import CustomPlayer
+from isolation import Board
+from isolation.geometry import BoardGeometry
+from sample_players import improved_score
+
+SIZES = [7, 9, 11, 15, 21, 31, 51]  # sides of the square boards
+SEARCH_DEPTH = 4  # depth of the fixed-depth searches
+NUM_POSITIONS = 10  # number of positions per board size
+OPENING_TIME = 150  # milliseconds given to the first placement
+
+
+def geometry_cost(size):
+    """Return the seconds and traced bytes to build the tables of a size."""
+    tracemalloc.start()
+    try:
+        start = timeit.default_timer()
+        geometry = BoardGeometry(size, size)
+        seconds = timeit.default_timer() - start
+        traced = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del geometry
+    return seconds, traced
+
+
+def copy_bytes(board):
+    """Return the bytes traced for one forecast_move() of a board."""
+    move = board.get_legal_moves()[0]
+    tracemalloc.start()
+    try:
+        traced = tracemalloc.get_traced_memory()[0]
+        child = board.forecast_move(move)
+        traced = tracemalloc.get_traced_memory()[0] - traced
+    finally:
+        tracemalloc.stop()
+    del child
+    return traced
+
+
+def search_rate(positions, depth):
+    """Return the nodes per second of fixed-depth searches of the positions."""
+    nodes = 0
+    seconds = 0.
+    for board in positions:
+        agent = CustomPlayer(search_depth=depth, score_fn=improved_score,
+                             iterative=False, method="alphabeta", timeout=None)
+        game = board.copy()
+        start = timeit.default_timer()
+        agent.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+        seconds += timeit.default_timer() - start
+        nodes += agent.nodes
+    return nodes / seconds
+
+
+def opening_time(size, time_limit=OPENING_TIME):
+    """Return the seconds CustomPlayer takes to place itself on an empty
+    board (at most about time_limit for a searched placement)."""
+    agent = CustomPlayer(score_fn=improved_score, method="alphabeta")
+    board = Board(agent, "player2", size, size)
+    deadline = timeit.default_timer() + time_limit / 1000.
+    start = timeit.default_timer()
+    agent.get_move(board, board.get_legal_moves(),
+                   lambda: 1000. * (deadline - timeit.default_timer()))
+    return timeit.default_timer() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS)
+    args = parser.parse_args()
+
+    print("\nBoard scaling at depth {} over {} positions per size:".format(
+        args.depth, args.positions))
+    print("----------")
+    print("  {:<8}{:>7}{:>12}{:>12}{:>10}{:>12}{:>12}".format(
+        "Size", "cells", "tables ms", "tables KB", "copy B", "nodes/s", "opening ms"))
+    for size in args.sizes:
+        positions = random_positions(args.positions, width=size, height=size)
+        seconds, traced = geometry_cost(size)
+        print("  {:<8}{:>7}{:>12.2f}{:>12.1f}{:>10}{:>12.0f}{:>12.1f}".format(
+            "{0}x{0}".format(size), size * size, 1000. * seconds, traced / 1024.,
+            copy_bytes(positions[0]), search_rate(positions, args.depth),
+            1000. * opening_time(size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure the per-node overhead of the search engines: the recursive alphabeta
+search (nested min_value/max_value closures over forecast_move copies) and the
+non-recursive negamax search (explicit stack over make/unmake on one board).
+
+Both engines visit exactly the same nodes, so the difference in time per node
+is the cost of recursion, closures and board copies. A constant evaluation
+function isolates that overhead from the cost of the heuristic.
+
+The board operations of every node (forecasts, applied moves, legal-move
+generations and evaluations) are counted in a separate run on instrumented
+boards (see `isolation.instrument`), so the counting does not affect the
+timings.
+"""
+
+import argparse
+import timeit
+
+from benchmarks.positions import random_positions
+from game_agent import CustomPlayer
+from isolation import BoardCounters
+from isolation import count_evaluations
+from isolation import instrumented_copy
+from sample_players import improved_score
+
+SEARCH_DEPTH = 5  # fixed depth of every search
+REPEAT = 3  # the best of REPEAT runs is reported for each engine
+
+SCORE_FNS = [("Const", lambda game, player: 0.),
+             ("Improved", improved_score)]
+
+
+def time_engine(method, score_fn, positions, depth):
+    """Return (nodes, seconds) to search every position to a fixed depth with
+    the given search method."""
+    agent = CustomPlayer(search_depth=depth, score_fn=score_fn,
+                         iterative=False, method=method)
+    agent.time_left = lambda: float("inf")
+    search = agent.alphabeta if method == 'alphabeta' else agent.negamax
+    nodes = 0
+    seconds = 0.
+    for board in positions:
+        board = board.copy()
+        agent.nodes = 0
+        start = timeit.default_timer()
+        search(board, depth)
+        seconds += timeit.default_timer() - start
+        nodes += agent.nodes
+    return nodes, seconds
+
+
+def count_operations(method, score_fn, positions, depth):
+    """Return the total `isolation.BoardCounters` of the searches of every
+    position to a fixed depth with the given search method."""
+    agent = CustomPlayer(search_depth=depth, score_fn=count_evaluations(score_fn),
+                         iterative=False, method=method)
+    agent.time_left = lambda: float("inf")
+    search = agent.alphabeta if method == 'alphabeta' else agent.negamax
+    totals = dict.fromkeys(BoardCounters().as_dict(), 0)
+    for board in positions:
+        board = instrumented_copy(board)
+        search(board, depth)
+        for name, count in board.counters.as_dict().items():
+            totals[name] += count
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--positions", type=int, default=20)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions)
+
+    print("\nPer-node cost at depth {} over {} positions:".format(args.depth, len(positions)))
+    print("----------")
+    for name, score_fn in SCORE_FNS:
+        baseline = None
+        for method in ['alphabeta', 'negamax']:
+            runs = [time_engine(method, score_fn, positions, args.depth) for _ in range(REPEAT)]
+            nodes, seconds = min(runs, key=lambda run: run[1])
+            usec = 1e6 * seconds / nodes
+            if baseline is None:
+                baseline = usec
+            operations = count_operations(method, score_fn, positions, args.depth)
+            print("  {:<10}{:<11}{:>9} nodes{:>9.2f} us/node{:>8.1f}%"
+                  "   per node: {:.2f} forecasts, {:.2f} applies, {:.2f} movegens,"
+                  " {:.2f} evals".format(
+                      name, method, nodes, usec, 100. * usec / baseline,
+                      operations["forecasts"] / nodes, operations["applies"] / nodes,
+                      operations["legal_moves"] / nodes, operations["evaluations"] / nodes))
+
+
+if __name__ == "__main__":
+    main()
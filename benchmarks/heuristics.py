@@ -0,0 +1,176 @@
+"""
+Measure the cost and the predictive power of every heuristic: the score
+functions of game_agent.py (`custom_score*`) and of sample_players.py.
+
+The corpus is every position of a set of seeded games between fixed-depth
+alpha-beta agents, so the positions look like the ones a search evaluates;
+each position is labelled with the result of its game for the player to
+move. For every heuristic the script reports:
+
+  * evaluations per second over the corpus (best of REPEAT runs);
+  * the transient memory of an evaluation, as the mean and maximum peak of
+    the memory traced by `tracemalloc` while it runs (CPython has no
+    counter of individual allocations, so bytes stand in for them);
+  * the correlation of the score with the outcome of the game (point
+    biserial, with infinite scores clamped just beyond the finite ones) and
+    the fraction of decisive scores (positive or negative) that predict the
+    winner;
+  * the correlation per microsecond of evaluation, a rough measure of
+    strength for the time spent.
+"""
+
+import argparse
+import inspect
+import math
+import random
+import timeit
+import tracemalloc
+
+import game_agent
+import sample_players
+
+from game_agent import CustomPlayer
+from isolation import Board
+
+NUM_GAMES = 50  # number of games played to build the corpus
+CORPUS_DEPTH = 3  # search depth of the agents playing the corpus games
+CORPUS_SEED = 2017  # seed of the random openings of the corpus games
+REPEAT = 3  # the best of REPEAT timing runs is reported for each heuristic
+
+
+def heuristics():
+    """Return the (name, score function) of every heuristic."""
+    functions = []
+    for module in [game_agent, sample_players]:
+        for name, score_fn in inspect.getmembers(module, inspect.isfunction):
+            if score_fn.__module__ == module.__name__ and \
+                    (name.startswith("custom_score") or name.endswith("_score")):
+                functions.append((name, score_fn))
+    return functions
+
+
+def play_corpus(num_games=NUM_GAMES, depth=CORPUS_DEPTH, seed=CORPUS_SEED):
+    """
+    Play seeded games between fixed-depth alpha-beta agents.
+
+    Returns
+    ----------
+    list<(`isolation.Board`, int)>
+        Every position of every game after the openings, between the players
+        "player1" and "player2", with +1 if the player to move won the game
+        and -1 if it lost.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(num_games):
+        agents = [CustomPlayer(search_depth=depth, score_fn=sample_players.improved_score,
+                               iterative=False, method="alphabeta", timeout=None)
+                  for _ in range(2)]
+        game = Board(agents[0], agents[1])
+        board = Board("player1", "player2")
+        positions = []
+        while True:
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            if game.move_count < 2:
+                move = rng.choice(legal_moves)
+            else:
+                move = game.active_player.get_move(game.copy(), legal_moves,
+                                                   lambda: float("inf"))
+            if game.move_count >= 2:
+                positions.append(board.copy())
+            if move not in legal_moves:
+                # an agent that sees every move lose returns (-1, -1)
+                break
+            game.apply_move(move)
+            board.apply_move(move)
+        # the player to move in the final position has lost
+        loser = game.move_count % 2
+        corpus.extend((position, 1 if position.move_count % 2 != loser else -1)
+                      for position in positions)
+    return corpus
+
+
+def evaluation_rate(score_fn, corpus):
+    """Return the evaluations per second of a heuristic over the corpus."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = timeit.default_timer()
+        for board, _ in corpus:
+            score_fn(board, board.active_player)
+        best = min(best, timeit.default_timer() - start)
+    return len(corpus) / best
+
+
+def _memory_peaks(score_fn, corpus):
+    peaks = []
+    tracemalloc.start()
+    try:
+        for board, _ in corpus:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            score_fn(board, board.active_player)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def transient_memory(score_fn, corpus):
+    """Return the mean and maximum peak of the memory (in bytes) traced while
+    a heuristic evaluates a position, net of the memory traced around a call
+    of a function that does nothing."""
+    overhead = min(_memory_peaks(lambda game, player: None, corpus))
+    peaks = [peak - overhead for peak in _memory_peaks(score_fn, corpus)]
+    return sum(peaks) / len(peaks), max(peaks)
+
+
+def outcome_correlation(score_fn, corpus):
+    """Return the correlation of the scores with the outcomes, and the
+    fraction of decisive scores that predict the outcome (None if the
+    heuristic has no decisive scores)."""
+    scores = [score_fn(board, board.active_player) for board, _ in corpus]
+    outcomes = [outcome for _, outcome in corpus]
+    finite = [abs(score) for score in scores if math.isfinite(score)]
+    bound = (max(finite) if finite else 0.) + 1.
+    scores = [max(-bound, min(bound, score)) for score in scores]
+
+    predicted = [(score > 0) == (outcome > 0) for score, outcome in zip(scores, outcomes)
+                 if score != 0]
+    accuracy = sum(predicted) / len(predicted) if predicted else None
+
+    n = len(scores)
+    mean_score = sum(scores) / n
+    mean_outcome = sum(outcomes) / n
+    covariance = sum((s - mean_score) * (o - mean_outcome) for s, o in zip(scores, outcomes))
+    spread = math.sqrt(sum((s - mean_score) ** 2 for s in scores) *
+                       sum((o - mean_outcome) ** 2 for o in outcomes))
+    return (covariance / spread if spread else 0.), accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=NUM_GAMES)
+    parser.add_argument("--depth", type=int, default=CORPUS_DEPTH)
+    args = parser.parse_args()
+
+    corpus = play_corpus(args.games, args.depth)
+
+    print("\nHeuristics over {} positions of {} games:".format(len(corpus), args.games))
+    print("----------")
+    print("  {:<34}{:>12}{:>10}{:>10}{:>9}{:>9}{:>10}".format(
+        "Heuristic", "evals/s", "mean B", "max B", "corr", "predict", "corr/us"))
+    for name, score_fn in heuristics():
+        rate = evaluation_rate(score_fn, corpus)
+        mean_bytes, max_bytes = transient_memory(score_fn, corpus)
+        correlation, accuracy = outcome_correlation(score_fn, corpus)
+        print("  {:<34}{:>12.0f}{:>10.0f}{:>10}{:>9.3f}{:>9}{:>10.3f}".format(
+            name, rate, mean_bytes, max_bytes, correlation,
+            "-" if accuracy is None else "{:.1%}".format(accuracy),
+            correlation * rate / 1e6))
+
+
+if __name__ == "__main__":
+    main()
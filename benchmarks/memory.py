@@ -0,0 +1,80 @@
+"""
+Measure the memory behaviour of the search hot path and the effect of the
+garbage collector policies of CustomPlayer (see memstats.py).
+
+Every policy runs a fixed-depth alpha-beta search with the improved
+heuristic and persistent tables from each position of the shared corpus,
+twice: once untraced to time the moves, and once with memory_stats=True.
+For every policy the script reports:
+
+  * the mean and maximum time per move (untraced);
+  * the bytes and memory blocks of a board copy (the board returned by
+    forecast_cell() at the root);
+  * the peak memory of a move per node searched, mostly the entries added
+    to the transposition table;
+  * the mean and maximum peak memory per move;
+  * the garbage collections per move, and the total and longest pause.
+
+    python -m benchmarks.memory --depth 5
+"""
+
+import argparse
+import timeit
+
+from benchmarks.positions import random_positions
+from game_agent import CustomPlayer
+from memstats import GC_POLICIES
+from sample_players import improved_score
+
+SEARCH_DEPTH = 5  # depth of the searches
+NUM_POSITIONS = 20  # number of positions of the corpus
+
+
+def run_policy(policy, positions, depth=SEARCH_DEPTH, memory_stats=False):
+    """Search every position with the given GC policy and return the
+    (seconds, search_info()) of every move."""
+    agent = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False,
+                         method="alphabeta", timeout=None, persistent=True,
+                         gc_policy=policy, memory_stats=memory_stats)
+    moves = []
+    for board in positions:
+        game = board.copy()
+        start = timeit.default_timer()
+        agent.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+        moves.append((timeit.default_timer() - start, agent.search_info()))
+    return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS)
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    args = parser.parse_args()
+
+    positions = random_positions(args.positions)
+
+    print("\nMemory at depth {} over {} positions:".format(args.depth, len(positions)))
+    print("----------")
+    print("  {:<10}{:>9}{:>9}{:>8}{:>8}{:>8}{:>10}{:>10}{:>8}{:>10}{:>10}".format(
+        "GC policy", "mean ms", "max ms", "copy B", "blocks", "B/node",
+        "mean KB", "max KB", "GCs", "pause ms", "max ms"))
+    for policy in GC_POLICIES:
+        times = [seconds for seconds, _ in run_policy(policy, positions, args.depth)]
+        infos = [info for _, info in run_policy(policy, positions, args.depth, True)]
+        nodes = sum(info["nodes"] for info in infos)
+        peaks = [info["peak_memory"] for info in infos]
+        print("  {:<10}{:>9.1f}{:>9.1f}{:>8.0f}{:>8.1f}{:>8.0f}{:>10.1f}{:>10.1f}"
+              "{:>8.2f}{:>10.2f}{:>10.2f}".format(
+                  str(policy), 1000. * sum(times) / len(times), 1000. * max(times),
+                  sum(info["copy_bytes"] for info in infos) / len(infos),
+                  sum(info["copy_blocks"] for info in infos) / len(infos),
+                  sum(peaks) / max(nodes, 1),
+                  sum(peaks) / len(peaks) / 1024., max(peaks) / 1024.,
+                  sum(info["gc_collections"] for info in infos) / len(infos),
+                  sum(info["gc_pause"] for info in infos),
+                  max(info["gc_max_pause"] for info in infos)))
+
+
+if __name__ == "__main__":
+    main()
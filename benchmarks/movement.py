@@ -0,0 +1,92 @@
+"""
+Compare the movement rules of `isolation.movement`: the knight of this
+project, the king, the queen of the original game, the rook and the bishop,
+and a custom leaper.
+
+For every rule the script generates the legal moves of seeded random
+positions played with that rule, and reports:
+
+  * legal-move generations per second from the precomputed tables (and the
+    bitboard rays of the sliding pieces);
+  * the same with a naive generator that steps through every offset (or
+    along every direction until blocked) with Board.move_is_legal(), as the
+    original Board did, checked to produce the same moves;
+  * leaves per second of a make/unmake perft (see benchmarks.perft).
+"""
+
+import argparse
+import timeit
+
+from benchmarks.perft import perft_unmake
+from benchmarks.positions import random_positions
+from isolation import Leaper
+from isolation import Slider
+from isolation.movement import MOVEMENTS
+
+NUM_POSITIONS = 50  # number of positions per rule
+PERFT_DEPTH = 3  # depth of the perft runs
+REPEAT = 3  # the best of REPEAT runs is reported
+
+RULES = list(MOVEMENTS.values()) + [Leaper("camel", [(dr * a, dc * b)
+                                                     for a, b in [(1, 3), (3, 1)]
+                                                     for dr in (-1, 1) for dc in (-1, 1)])]
+
+
+def naive_moves(board, rule):
+    """Return the legal moves of the active player by testing the cells one
+    step at a time."""
+    row, col = board.get_player_location(board.active_player)
+    moves = []
+    for dr, dc in rule.offsets:
+        r, c = row + dr, col + dc
+        while board.move_is_legal((r, c)):
+            moves.append((r, c))
+            if not isinstance(rule, Slider):
+                break
+            r, c = r + dr, c + dc
+    return moves
+
+
+def generation_rate(generate, positions):
+    """Return the move generations per second of a generator."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = timeit.default_timer()
+        for board in positions:
+            generate(board)
+        best = min(best, timeit.default_timer() - start)
+    return len(positions) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS)
+    parser.add_argument("--size", type=int, default=7)
+    parser.add_argument("--depth", type=int, default=PERFT_DEPTH)
+    args = parser.parse_args()
+
+    print("\nMovement rules on {0}x{0} boards over {1} positions:".format(
+        args.size, args.positions))
+    print("----------")
+    print("  {:<9}{:>8}{:>14}{:>14}{:>9}{:>14}".format(
+        "Rule", "moves", "tables gen/s", "naive gen/s", "speedup", "perft leaf/s"))
+    for rule in RULES:
+        positions = random_positions(args.positions, width=args.size, height=args.size,
+                                     movement=rule)
+        for board in positions:
+            if sorted(board.get_legal_moves()) != sorted(naive_moves(board, rule)):
+                raise AssertionError("{} moves differ from the naive generator at {}".format(
+                    rule.name, board.hash_key()))
+        tables = generation_rate(lambda board: board.get_legal_moves(), positions)
+        naive = generation_rate(lambda board: naive_moves(board, rule), positions)
+        start = timeit.default_timer()
+        leaves = sum(perft_unmake(board.copy(), args.depth) for board in positions)
+        seconds = timeit.default_timer() - start
+        print("  {:<9}{:>8.1f}{:>14.0f}{:>14.0f}{:>8.1f}x{:>14.0f}".format(
+            rule.name, sum(len(board.get_legal_moves()) for board in positions) /
+            len(positions), tables, naive, tables / naive, leaves / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Perft benchmark of move generation: count the move sequences of a fixed
+length (the leaves of the full game tree to that depth) from fixed positions
+on 5x5, 7x7 and 9x9 boards, check them against the reference counts in
+perft.json, and report the speed of every board backend in leaves per
+second.
+
+A backend is a function walking the tree with one way of generating and
+playing moves; they must all agree with the reference counts, so a faster
+backend (or an optimization of `isolation.Board`) is checked for correctness
+and speed at once:
+
+  * forecast -- `get_legal_moves()` and a `forecast_move()` copy per node,
+    as the recursive searches do;
+  * unmake -- `apply_move()` and `undo_move()` on a single board;
+  * cells -- the same on cell numbers, with `get_legal_cells()`,
+    `apply_cell()` and `undo_cell()`, as the negamax search does.
+
+Regenerate the reference counts with `python -m benchmarks.perft --update`
+only after checking that a change of the counts is intended.
+"""
+
+import argparse
+import json
+import os
+import random
+import timeit
+
+from isolation import Board
+
+REFERENCE = os.path.join(os.path.dirname(__file__), "perft.json")
+REFERENCE_SEED = 2017  # seed of the random playouts of the reference positions
+SIZES = [5, 7, 9]  # side of the square boards of the reference positions
+POSITIONS_PER_SIZE = 3  # reference positions per board size, the first one empty
+EMPTY_DEPTH = 3  # perft depth of the empty boards
+POSITION_DEPTH = 7  # perft depth of the midgame positions
+REPEAT = 3  # the best of REPEAT runs is reported for each backend
+
+
+def perft_forecast(board, depth):
+    """Count the leaves at `depth` plies by copying the board at every
+    node."""
+    if depth == 0:
+        return 1
+    moves = board.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft_forecast(board.forecast_move(move), depth - 1) for move in moves)
+
+
+def perft_unmake(board, depth):
+    """Count the leaves at `depth` plies by making and unmaking moves on
+    `board`."""
+    if depth == 0:
+        return 1
+    moves = board.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+    last_move = board.get_player_location(board.active_player)
+    leaves = 0
+    for move in moves:
+        board.apply_move(move)
+        leaves += perft_unmake(board, depth - 1)
+        board.undo_move(move, last_move)
+    return leaves
+
+
+def perft_cells(board, depth):
+    """Count the leaves at `depth` plies by making and unmaking moves given
+    as cell numbers on `board`."""
+    if depth == 0:
+        return 1
+    cells = board.get_legal_cells()
+    if depth == 1:
+        return len(cells)
+    last_cell = board.get_player_cell(board.active_player)
+    leaves = 0
+    for cell in cells:
+        board.apply_cell(cell)
+        leaves += perft_cells(board, depth - 1)
+        board.undo_cell(cell, last_cell)
+    return leaves
+
+
+BACKENDS = [("forecast", perft_forecast),
+            ("unmake", perft_unmake),
+            ("cells", perft_cells)]
+
+
+def reference_positions(seed=REFERENCE_SEED):
+    """Return the reference positions as dictionaries of a name, the board
+    size and the moves played from the empty board."""
+    rng = random.Random(seed)
+    positions = []
+    for size in SIZES:
+        positions.append({"name": "{0}x{0}-empty".format(size), "width": size,
+                          "height": size, "moves": [], "depth": EMPTY_DEPTH})
+        index = 1
+        while index < POSITIONS_PER_SIZE:
+            board = Board("player1", "player2", size, size)
+            target = rng.randint(size, 2 * size)
+            moves = []
+            while board.move_count < target and board.get_legal_moves():
+                moves.append(rng.choice(board.get_legal_moves()))
+                board.apply_move(moves[-1])
+            if board.move_count == target and len(board.get_legal_moves()) > 1:
+                positions.append({"name": "{0}x{0}-{1}".format(size, index),
+                                  "width": size, "height": size,
+                                  "moves": [list(move) for move in moves],
+                                  "depth": POSITION_DEPTH})
+                index += 1
+    return positions
+
+
+def build_position(position):
+    """Return the board of a reference position."""
+    board = Board("player1", "player2", position["width"], position["height"])
+    for move in position["moves"]:
+        board.apply_move(tuple(move))
+    return board
+
+
+def load_reference(path=REFERENCE):
+    """Return the reference positions with their "counts" (the leaf counts at
+    depths 1 to "depth")."""
+    with open(path) as reference:
+        return json.load(reference)
+
+
+def update_reference(path=REFERENCE):
+    """Count the leaves of the reference positions with the forecast backend
+    and write them to `path`."""
+    positions = reference_positions()
+    for position in positions:
+        board = build_position(position)
+        position["counts"] = [perft_forecast(board, depth)
+                              for depth in range(1, position["depth"] + 1)]
+    with open(path, "w") as reference:
+        json.dump(positions, reference, indent=1)
+        reference.write("\n")
+    return positions
+
+
+def check(backend, positions, max_depth=None):
+    """Return the (name, depth, expected, counted) mismatches of a backend
+    against the reference counts, up to max_depth plies."""
+    errors = []
+    for position in positions:
+        for depth, expected in enumerate(position["counts"][:max_depth], 1):
+            counted = backend(build_position(position), depth)
+            if counted != expected:
+                errors.append((position["name"], depth, expected, counted))
+    return errors
+
+
+def time_backend(backend, positions):
+    """Return (leaves, seconds) of the best of REPEAT runs of a backend at
+    the reference depth of every position."""
+    runs = []
+    for _ in range(REPEAT):
+        leaves = 0
+        seconds = 0.
+        for position in positions:
+            board = build_position(position)
+            start = timeit.default_timer()
+            leaves += backend(board, position["depth"])
+            seconds += timeit.default_timer() - start
+        runs.append((leaves, seconds))
+    return min(runs, key=lambda run: run[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true",
+                        help="regenerate the reference counts")
+    parser.add_argument("--backend", action="append", default=None,
+                        choices=[name for name, _ in BACKENDS],
+                        help="backends to run (all by default)")
+    args = parser.parse_args()
+
+    positions = update_reference() if args.update else load_reference()
+    backends = [(name, backend) for name, backend in BACKENDS
+                if args.backend is None or name in args.backend]
+
+    print("\nPerft over {} positions:".format(len(positions)))
+    print("----------")
+    for name, backend in backends:
+        errors = check(backend, positions)
+        for error in errors:
+            print("  {}: {} at depth {}: expected {}, counted {}".format(name, *error))
+        leaves, seconds = time_backend(backend, positions)
+        print("  {:<10}{:>10} leaves{:>10.2f} s{:>12.0f} leaves/s  {}".format(
+            name, leaves, seconds, leaves / seconds, "FAILED" if errors else "ok"))
+
+
+if __name__ == "__main__":
+    main()
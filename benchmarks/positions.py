@@ -0,0 +1,62 @@
+"""
+Fixed corpus of game positions shared by the benchmark scripts. Positions are
+generated by seeded random play so that every run (and every machine) sees
+exactly the same boards.
+"""
+
+import random
+
+from isolation import Board
+from isolation import KNIGHT
+
+CORPUS_SEED = 2017  # seed of the random playouts used to build the corpus
+CORPUS_SIZE = 20  # default number of positions in the corpus
+CORPUS_PLIES = (6, 16)  # range of plies played before a position is sampled
+
+
+def random_positions(num_positions=CORPUS_SIZE, plies=CORPUS_PLIES,
+                     width=7, height=7, seed=CORPUS_SEED, movement=KNIGHT):
+    """
+    Build a list of non-terminal positions by playing random moves from an
+    empty board.
+
+    Parameters
+    ----------
+    num_positions : int (optional)
+        The number of positions to generate.
+
+    plies : (int, int) (optional)
+        Inclusive range for the number of plies played before sampling.
+
+    width, height : int (optional)
+        Board dimensions.
+
+    seed : hashable (optional)
+        Seed of the random number generator driving the playouts.
+
+    movement : `isolation.movement.MovementRule` (optional)
+        How the players move.
+
+    Returns
+    ----------
+    list<`isolation.Board`>
+        Boards between the two placeholder players "player1" and "player2",
+        each with at least one legal move for the active player.
+    """
+    rng = random.Random(seed)
+    positions = []
+
+    while len(positions) < num_positions:
+        board = Board("player1", "player2", width, height, movement)
+        target = rng.randint(*plies)
+
+        while board.move_count < target:
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            board.apply_move(rng.choice(moves))
+
+        if board.move_count == target and board.get_legal_moves():
+            positions.append(board)
+
+    return positions
@@ -0,0 +1,103 @@
+"""
+Measure the binary game archive (isolation/records.py): bytes per game and
+the throughput of bulk writing, sequential decoding and random position
+reconstruction, compared with JSON lines records of the same games.
+
+Games are random playouts from the empty board, generated once and reused
+for every measurement.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import timeit
+
+from isolation import Board
+from isolation.records import RecordReader, RecordWriter
+
+NUM_GAMES = 20000  # number of games archived
+NUM_POSITIONS = 10000  # number of random positions reconstructed
+
+
+def random_games(num_games, seed=2017):
+    """Return (moves, winner, termination, width, height) tuples of random
+    playouts on 7x7 boards."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(num_games):
+        board = Board(1, 2)
+        moves = []
+        legal_moves = board.get_legal_moves()
+        while legal_moves:
+            move = rng.choice(legal_moves)
+            board.apply_move(move)
+            moves.append(move)
+            legal_moves = board.get_legal_moves()
+        games.append((moves, 2 - board.move_count % 2, "", 7, 7))
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=NUM_GAMES)
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS)
+    args = parser.parse_args()
+
+    games = random_games(args.games)
+    directory = tempfile.mkdtemp()
+    archive = os.path.join(directory, "games.rec")
+    jsonl = os.path.join(directory, "games.jsonl")
+
+    try:
+        start = timeit.default_timer()
+        with RecordWriter(archive) as writer:
+            writer.write_many(games)
+        write_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        with open(jsonl, "w") as records:
+            for game in games:
+                records.write(json.dumps(game) + "\n")
+        json_write_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        with RecordReader(archive) as reader:
+            num_moves = sum(len(record.moves) for record in reader)
+        read_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        with open(jsonl) as records:
+            json_moves = sum(len(json.loads(line)[0]) for line in records)
+        json_read_time = timeit.default_timer() - start
+        assert json_moves == num_moves
+
+        rng = random.Random(0)
+        start = timeit.default_timer()
+        with RecordReader(archive) as reader:
+            for _ in range(args.positions):
+                index = rng.randrange(len(reader))
+                reader.position(index, rng.randint(0, len(games[index][0])))
+        position_time = timeit.default_timer() - start
+
+        print("\n{} games, {} moves:".format(len(games), num_moves))
+        print("----------")
+        print("{:<8}{:>14}{:>16}{:>16}".format("Format", "bytes/game", "write games/s",
+                                               "read games/s"))
+        for name, path, write, read in [("binary", archive, write_time, read_time),
+                                        ("jsonl", jsonl, json_write_time, json_read_time)]:
+            print("{:<8}{:>14.1f}{:>16.0f}{:>16.0f}".format(
+                name, os.path.getsize(path) / len(games), len(games) / write,
+                len(games) / read))
+        print("\nRandom position reconstruction: {:.0f} positions/s".format(
+            args.positions / position_time))
+    finally:
+        for path in [archive, jsonl]:
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Search benchmark harness: run every search configuration on the shared
+position corpus and store the results in a JSON file, then compare two
+result files to catch regressions.
+
+Every configuration is run in two modes:
+
+  * depth -- a fixed-depth search (no clock): nodes, time and best move;
+  * time -- iterative deepening with a fixed time per move: nodes, depth
+    reached and best move.
+
+The configurations are plain minimax and alphabeta search with the improved
+heuristic, negamax, and alphabeta search with every `custom_score*` function
+of game_agent.py.
+
+    python -m benchmarks.search run --output baseline.json
+    (change the agent)
+    python -m benchmarks.search run --output current.json
+    python -m benchmarks.search compare baseline.json current.json
+
+`compare` prints the totals of every configuration side by side and exits
+with status 1 if a configuration regressed: more nodes or more time at fixed
+depth, or fewer nodes or a shallower average depth at fixed time, by more
+than the tolerance (and time by more than MIN_SECONDS). Changed best moves
+are reported but are not regressions.
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import sys
+import timeit
+
+import game_agent
+
+from benchmarks.positions import random_positions
+from game_agent import CustomPlayer
+from isolation import WallClock
+from sample_players import improved_score
+
+SEARCH_DEPTH = 5  # depth of the fixed-depth searches
+TIME_LIMIT = 100  # milliseconds per move of the fixed-time searches
+TOLERANCE = 0.1  # relative change of a total that is flagged as a regression
+MIN_SECONDS = 0.01  # smallest change of a total time that is flagged as a regression
+REPEAT = 3  # the best time of REPEAT runs is recorded for fixed-depth searches
+NUM_POSITIONS = 20  # number of positions of the corpus
+
+
+def configurations():
+    """Return the (name, CustomPlayer kwargs) of every search configuration."""
+    configs = [("MM_Improved", {"method": "minimax", "score_fn": improved_score}),
+               ("AB_Improved", {"method": "alphabeta", "score_fn": improved_score}),
+               ("NEG_Improved", {"method": "negamax", "score_fn": improved_score})]
+    for name, score_fn in inspect.getmembers(game_agent, inspect.isfunction):
+        if name.startswith("custom_score") and score_fn.__module__ == game_agent.__name__:
+            configs.append(("AB_" + name, {"method": "alphabeta", "score_fn": score_fn}))
+    return configs
+
+
+def search(kwargs, board, mode, depth, time_limit):
+    """Run one search and return its result record."""
+    seconds = float("inf")
+    for _ in range(REPEAT if mode == "depth" else 1):
+        if mode == "depth":
+            agent = CustomPlayer(search_depth=depth, iterative=False, timeout=None, **kwargs)
+            time_left = lambda: float("inf")
+        else:
+            agent = CustomPlayer(iterative=True, **kwargs)
+            time_left = WallClock().timer(time_limit)
+        game = board.copy()
+        start = timeit.default_timer()
+        move = agent.get_move(game, game.get_legal_moves(), time_left)
+        seconds = min(seconds, timeit.default_timer() - start)
+    info = agent.search_info()
+    return {"nodes": info["nodes"], "depth": info["depth"], "seconds": seconds,
+            "move": list(move)}
+
+
+def run(num_positions=NUM_POSITIONS, depth=SEARCH_DEPTH, time_limit=TIME_LIMIT,
+        configs=None):
+    """Run the benchmark and return the results as a dictionary."""
+    positions = random_positions(num_positions)
+    results = []
+    for name, kwargs in configurations():
+        if configs and name not in configs:
+            continue
+        for mode in ["depth", "time"]:
+            for index, board in enumerate(positions):
+                record = search(kwargs, board, mode, depth, time_limit)
+                record.update(config=name, mode=mode, position=index)
+                results.append(record)
+            print("  {:<40}{:<6} done".format(name, mode), file=sys.stderr)
+    return {"settings": {"positions": num_positions, "depth": depth,
+                         "time_limit": time_limit, "python": platform.python_version(),
+                         "machine": platform.machine()},
+            "results": results}
+
+
+def totals(results):
+    """Return {(config, mode): totals} with the node count, time, mean depth
+    and best moves of every configuration and mode."""
+    table = {}
+    for record in results["results"]:
+        key = record["config"], record["mode"]
+        total = table.setdefault(key, {"nodes": 0, "seconds": 0., "depth": 0.,
+                                       "searches": 0, "moves": {}})
+        total["nodes"] += record["nodes"]
+        total["seconds"] += record["seconds"]
+        total["depth"] += record["depth"]
+        total["searches"] += 1
+        total["moves"][record["position"]] = tuple(record["move"])
+    for total in table.values():
+        total["depth"] /= total["searches"]
+    return table
+
+
+def regressions(baseline, current, tolerance=TOLERANCE):
+    """Return the list of (config, mode, metric, baseline value, current
+    value) regressions of the current results against the baseline."""
+    flagged = []
+    old_totals = totals(baseline)
+    for key, new in sorted(totals(current).items()):
+        old = old_totals.get(key)
+        if old is None:
+            continue
+        if key[1] == "depth":
+            worse = [("nodes", old["nodes"] * (1 + tolerance) < new["nodes"]),
+                     ("seconds", old["seconds"] * (1 + tolerance) < new["seconds"] and
+                      new["seconds"] - old["seconds"] > MIN_SECONDS)]
+        else:
+            worse = [("nodes", new["nodes"] < old["nodes"] * (1 - tolerance)),
+                     ("depth", new["depth"] < old["depth"] * (1 - tolerance))]
+        flagged.extend(key + (metric, old[metric], new[metric])
+                       for metric, regressed in worse if regressed)
+    return flagged
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    """Print the totals of both result sets and return the regressions."""
+    old_totals = totals(baseline)
+    print("\n{:<40}{:<6}{:>12}{:>12}{:>10}{:>10}{:>8}{:>8}{:>7}".format(
+        "Config", "Mode", "nodes", "(base)", "s", "(base)", "depth", "(base)",
+        "moves"))
+    print("----------")
+    for key, new in sorted(totals(current).items()):
+        old = old_totals.get(key)
+        if old is None:
+            print("{:<40}{:<6}{:>12}{:>22.2f}{:>18.2f}   (new)".format(
+                key[0], key[1], new["nodes"], new["seconds"], new["depth"]))
+            continue
+        changed = sum(move != old["moves"].get(position)
+                      for position, move in new["moves"].items())
+        print("{:<40}{:<6}{:>12}{:>12}{:>10.2f}{:>10.2f}{:>8.2f}{:>8.2f}{:>7}".format(
+            key[0], key[1], new["nodes"], old["nodes"], new["seconds"], old["seconds"],
+            new["depth"], old["depth"], "{} chg".format(changed) if changed else "same"))
+
+    flagged = regressions(baseline, current, tolerance)
+    print("")
+    for config, mode, metric, old, new in flagged:
+        print("REGRESSION {} ({}): {} {:.6g} -> {:.6g}".format(config, mode, metric, old, new))
+    if not flagged:
+        print("No regressions (tolerance {:.0f}%)".format(100 * tolerance))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command")
+    run_parser = commands.add_parser("run", help="run the benchmark")
+    run_parser.add_argument("--output", required=True, help="result file to write")
+    run_parser.add_argument("--positions", type=int, default=NUM_POSITIONS)
+    run_parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    run_parser.add_argument("--time-limit", type=float, default=TIME_LIMIT)
+    run_parser.add_argument("--config", action="append", default=None,
+                            help="configurations to run (all by default)")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.positions, args.depth, args.time_limit, args.config)
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=1)
+    elif args.command == "compare":
+        with open(args.baseline) as baseline, open(args.current) as current:
+            flagged = compare(json.load(baseline), json.load(current), args.tolerance)
+        sys.exit(1 if flagged else 0)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
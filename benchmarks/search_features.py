@@ -0,0 +1,96 @@
+"""
+Compare late move reductions (LMR) and search extensions against plain
+alpha-beta search.
+
+The script measures two things for every configuration:
+
+  * node counts -- the number of nodes expanded by a fixed-depth alphabeta
+    search over the shared position corpus, together with the search time and
+    how often the chosen move agrees with plain alphabeta;
+  * match strength -- the result of time-limited iterative deepening matches
+    played with `tournament.play_match` against the plain alphabeta agent.
+"""
+
+import argparse
+import timeit
+
+from benchmarks.positions import random_positions
+from game_agent import CustomPlayer
+from sample_players import improved_score
+from tournament import play_match
+
+SEARCH_DEPTH = 5  # fixed depth used for the node count comparison
+NUM_MATCHES = 10  # number of fair matches played against plain alphabeta
+
+CONFIGS = [("AB", {}),
+           ("AB_LMR", {"lmr": True}),
+           ("AB_EXT", {"extensions": True}),
+           ("AB_LMR_EXT", {"lmr": True, "extensions": True})]
+
+
+def count_nodes(positions, depth, **kwargs):
+    """
+    Run a fixed-depth alphabeta search on each position and return a list of
+    (nodes, seconds, move) tuples.
+    """
+    results = []
+    for board in positions:
+        agent = CustomPlayer(search_depth=depth, score_fn=improved_score,
+                             iterative=False, method='alphabeta', **kwargs)
+        agent.time_left = lambda: float("inf")
+        start = timeit.default_timer()
+        _, move = agent.alphabeta(board.copy(), depth)
+        results.append((agent.nodes, timeit.default_timer() - start, move))
+    return results
+
+
+def compare_nodes(positions, depth):
+    """Print the node count and timing table for every configuration."""
+    print("\nNode counts at depth {} over {} positions:".format(depth, len(positions)))
+    print("----------")
+    baseline = None
+    for name, kwargs in CONFIGS:
+        results = count_nodes(positions, depth, **kwargs)
+        if baseline is None:
+            baseline = results
+        nodes = sum(r[0] for r in results)
+        seconds = sum(r[1] for r in results)
+        agree = sum(r[2] == b[2] for r, b in zip(results, baseline))
+        print("  {:<12}{:>10} nodes{:>9.2f} s{:>8.1f}% of AB nodes{:>5}/{} same move".format(
+            name, nodes, seconds, 100. * nodes / sum(b[0] for b in baseline),
+            agree, len(positions)))
+
+
+def compare_strength(num_matches):
+    """Print the match results of every configuration against plain
+    alphabeta using iterative deepening."""
+    print("\nMatch strength against AB ({} fair matches each):".format(num_matches))
+    print("----------")
+    plain = CustomPlayer(score_fn=improved_score, method='alphabeta', iterative=True)
+    for name, kwargs in CONFIGS[1:]:
+        agent = CustomPlayer(score_fn=improved_score, method='alphabeta',
+                             iterative=True, **kwargs)
+        wins = losses = 0
+        for _ in range(num_matches):
+            score_1, score_2 = play_match(agent, plain)
+            wins += score_1
+            losses += score_2
+        print("  {:<12}{:>4} to {:<4}{:>8.1f}%".format(
+            name, wins, losses, 100. * wins / max(1, wins + losses)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="fair matches per configuration (0 to skip)")
+    args = parser.parse_args()
+
+    compare_nodes(random_positions(args.positions), args.depth)
+    if args.matches:
+        compare_strength(args.matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Coordinator/worker protocol for playing tournament matches on several hosts.
+
+The coordinator listens on a TCP address ("host:port") or a Unix socket (a
+file path) and hands out match jobs to the workers connected to it; every
+worker plays one job at a time and sends the result back. Jobs are queued in
+schedule order and results are returned in the same order, so a distributed
+round reports exactly the results of a serial one. When a worker disconnects
+(or its host dies) while playing a job, the job is put back at the front of
+the queue for the next free worker; a job that loses MAX_ATTEMPTS workers
+fails instead of being retried forever. A job or result that cannot be
+pickled fails with the pickling error.
+
+A host that dies without closing its socket (power loss, network partition)
+never sends an end of file, so workers also send a heartbeat every
+HEARTBEAT_INTERVAL seconds while they play a job, and the coordinator drops a
+worker it has not heard from for `worker_timeout` seconds and queues its job
+again, as if the worker had disconnected.
+
+Messages are pickled objects sent over `multiprocessing.connection`, which
+authenticates both ends with a shared key. Pickles can execute code when they
+are loaded, so only run workers and coordinators on trusted networks.
+
+Example, with two workers on the local host:
+
+    python tournament.py --coordinator localhost:6000 --seed 1
+    python tournament.py --worker localhost:6000 --processes 2
+"""
+
+import threading
+import time
+
+from collections import deque
+from multiprocessing import Process
+from multiprocessing.connection import Client
+from multiprocessing.connection import Listener
+from multiprocessing.context import AuthenticationError
+
+AUTHKEY = b"isolation"  # default shared key of the coordinator and workers
+CONNECT_TIMEOUT = 30.  # seconds a worker keeps retrying to reach the coordinator
+CONNECT_RETRY = 0.1  # seconds between two connection attempts
+MAX_ATTEMPTS = 3  # workers a job may be handed to before it is failed
+HEARTBEAT = "heartbeat"  # message of a worker that is still playing its job
+HEARTBEAT_INTERVAL = 5.  # seconds between two heartbeats of a worker
+WORKER_TIMEOUT = 30.  # seconds of silence after which a worker is lost
+
+
+def parse_address(text):
+    """Return the `multiprocessing.connection` address of "host:port" (a TCP
+    socket) or of a file path (a Unix socket)."""
+    host, separator, port = text.rpartition(":")
+    if separator and port.isdigit() and "/" not in text:
+        return host, int(port)
+    return text
+
+
+class Coordinator(object):
+    """
+    Hand out jobs to remote workers, like the `imap` method of a process pool.
+
+    Parameters
+    ----------
+    address : (str, int) or str
+        The TCP (host, port) or the Unix socket path to listen on (see
+        `parse_address()`); port 0 picks a free port (see self.address).
+
+    authkey : bytes (optional)
+        The key shared with the workers.
+
+    worker_timeout : float (optional)
+        Seconds without a heartbeat or result after which a worker playing a
+        job is considered lost.
+    """
+
+    def __init__(self, address, authkey=AUTHKEY, worker_timeout=WORKER_TIMEOUT):
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.worker_timeout = worker_timeout
+        self.lock = threading.Condition()
+        # (batch, index, function, job, attempts) tasks waiting for a worker
+        self.tasks = deque()
+        # index -> (success, value) of the jobs of the current batch
+        self.results = {}
+        self.batch = 0
+        self.workers = 0
+        self.closed = False
+        acceptor = threading.Thread(target=self._accept)
+        acceptor.daemon = True
+        acceptor.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def imap(self, function, jobs):
+        """Queue function(job) for every job and return an iterator over the
+        results in job order. Exceptions raised by a job are re-raised."""
+        jobs = list(jobs)
+        with self.lock:
+            self.batch += 1
+            batch = self.batch
+            self.results = {}
+            self.tasks = deque((batch, index, function, job, 0)
+                               for index, job in enumerate(jobs))
+            self.lock.notify_all()
+        return self._results(batch, len(jobs))
+
+    def _results(self, batch, num_jobs):
+        for index in range(num_jobs):
+            with self.lock:
+                while index not in self.results:
+                    if self.batch != batch:
+                        return
+                    self.lock.wait()
+                success, value = self.results.pop(index)
+            if not success:
+                raise value
+            yield value
+
+    def terminate(self):
+        """Drop the jobs of the current batch that were not handed out yet;
+        results of the jobs in progress are discarded. Workers stay
+        connected for the next batch."""
+        with self.lock:
+            self.batch += 1
+            self.tasks.clear()
+            self.lock.notify_all()
+
+    def close(self):
+        """Stop the workers (they exit once they finish their current job) and
+        stop listening."""
+        with self.lock:
+            self.closed = True
+            self.tasks.clear()
+            self.lock.notify_all()
+        self.listener.close()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                # the listener was closed
+                return
+            worker = threading.Thread(target=self._serve, args=(connection,))
+            worker.daemon = True
+            worker.start()
+
+    def _finish(self, batch, index, result):
+        """Record the (success, value) result of a job of the given batch."""
+        with self.lock:
+            if batch == self.batch:
+                self.results[index] = result
+                self.lock.notify_all()
+
+    def _receive(self, connection):
+        """Return the result of the job played by a worker, skipping its
+        heartbeats; raise EOFError if the worker stays silent for
+        worker_timeout seconds."""
+        while True:
+            if not connection.poll(self.worker_timeout):
+                raise EOFError("no heartbeat for {} seconds".format(self.worker_timeout))
+            message = connection.recv()
+            if message != HEARTBEAT:
+                return message
+
+    def _serve(self, connection):
+        """Feed tasks to one worker until the coordinator is closed or the
+        worker is lost, in which case its current task is queued again."""
+        task = None
+        with self.lock:
+            self.workers += 1
+        try:
+            while True:
+                with self.lock:
+                    while not self.tasks and not self.closed:
+                        self.lock.wait()
+                    if self.closed:
+                        break
+                    task = self.tasks.popleft()
+                batch, index, function, job, _ = task
+                # messages are pickled before they are written, so a pickling
+                # error fails the job but leaves the connection usable
+                try:
+                    connection.send((function, job))
+                    result = self._receive(connection)
+                except (EOFError, OSError):
+                    raise
+                except Exception as error:
+                    result = False, error
+                self._finish(batch, index, result)
+                task = None
+            connection.send(None)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.lock:
+                self.workers -= 1
+                if task is not None and task[0] == self.batch:
+                    batch, index, function, job, attempts = task
+                    if attempts + 1 < MAX_ATTEMPTS:
+                        self.tasks.appendleft((batch, index, function, job, attempts + 1))
+                    else:
+                        self.results[index] = False, RuntimeError(
+                            "job {} lost {} workers".format(index, MAX_ATTEMPTS))
+                    self.lock.notify_all()
+            connection.close()
+
+
+def connect(address, authkey=AUTHKEY, timeout=CONNECT_TIMEOUT):
+    """Connect to a coordinator, retrying until it accepts or the timeout (in
+    seconds) expires."""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.time() > deadline:
+                raise
+            time.sleep(CONNECT_RETRY)
+
+
+def _heartbeat(connection, lock, done, interval):
+    """Send a heartbeat every `interval` seconds until `done` is set or the
+    connection fails."""
+    while not done.wait(interval):
+        try:
+            with lock:
+                connection.send(HEARTBEAT)
+        except (EOFError, OSError):
+            return
+
+
+def run_worker(address, authkey=AUTHKEY, timeout=CONNECT_TIMEOUT,
+               heartbeat=HEARTBEAT_INTERVAL):
+    """Play the jobs handed out by the coordinator at `address` until it
+    closes, sending a heartbeat every `heartbeat` seconds during a job."""
+    with connect(address, authkey, timeout) as connection:
+        # heartbeats and results are sent from different threads
+        lock = threading.Lock()
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            function, job = task
+            done = threading.Event()
+            beats = threading.Thread(target=_heartbeat,
+                                     args=(connection, lock, done, heartbeat))
+            beats.daemon = True
+            beats.start()
+            try:
+                result = True, function(job)
+            except Exception as error:
+                result = False, error
+            finally:
+                done.set()
+                beats.join()
+            try:
+                connection.send(result)
+            except (EOFError, OSError):
+                raise
+            except Exception as error:
+                # the result or the error cannot be pickled
+                connection.send((False, RuntimeError(repr(error))))
+
+
+def run_workers(address, processes=1, authkey=AUTHKEY, timeout=CONNECT_TIMEOUT):
+    """Run `processes` workers in separate processes and wait for them."""
+    workers = [Process(target=run_worker, args=(address, authkey, timeout))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
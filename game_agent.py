@@ -6,10 +6,26 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import math
 import random
+import threading
+import timeit
+
+from memstats import GCPolicy
+from memstats import MemoryMonitor
+from pn_search import ProofNumberSearch
 
 infinity = float('inf')
 
+# the searches represent a move by the number of its cell (row * width + col,
+# see `isolation.Board.to_cell`) and convert the chosen root move back to a
+# (row, col) tuple; NO_CELL stands for the (-1, -1) move
+NO_CELL = -1
+
+# transposition table entry flags: the stored score is exact, a lower bound
+# (the search failed high) or an upper bound (the search failed low)
+EXACT, LOWER, UPPER = 0, 1, 2
+
 
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
@@ -354,6 +370,216 @@ def custom_score(game, player):
     return custom_score_lookahead_both(game, player)
 
 
+def near_partition(game):
+    """Test whether the two players are close to being partitioned, i.e. the
+    cells each of them can reach within two moves do not overlap, so that
+    neither can block the other in the next few plies.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    Returns
+    ----------
+    bool
+        True if the two-move neighbourhoods of the players are disjoint.
+    """
+
+    def reach(player):
+        cells = set()
+        for cell in game.get_legal_cells(player):
+            cells.add(cell)
+            cells.update(game.cells_from(cell))
+        return cells
+
+    return not reach(game.active_player) & reach(game.inactive_player)
+
+
+def opening_move(game, legal_moves, candidates=16):
+    """Choose the first placement of a player on a large board without
+    searching: among the `candidates` open cells closest to the centre of
+    the board, the cell with the most legal moves, preferring cells the
+    opponent (if placed) cannot move to next, then the cell closest to the
+    centre.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        A game state where the active player has not moved yet.
+
+    legal_moves : list<(int, int)>
+        The open cells of the board.
+
+    candidates : int (optional)
+        The number of open cells considered.
+
+    Returns
+    ----------
+    (int, int)
+        The chosen cell.
+    """
+    opponent = game.get_player_location(game.inactive_player)
+    reachable = set(game.__get_moves__(opponent)) if opponent is not game.NOT_MOVED else ()
+    best_move, best_key = legal_moves[0], None
+    for move in game.__geometry__.center_order():
+        if not game.move_is_legal(move):
+            continue
+        key = (len(game.__get_moves__(move)), move not in reachable)
+        if best_key is None or key > best_key:
+            best_move, best_key = move, key
+        candidates -= 1
+        if not candidates:
+            break
+    return best_move
+
+
+class SearchState:
+    """Search knowledge that CustomPlayer retains between the turns of a
+    single game: the transposition table, the history table and the expected
+    principal variation.
+
+    Every turn starts with a call to begin(), which keeps the retained data
+    when the new root is a descendant of the previous root (the same game a
+    whole number of rounds later) and resets it otherwise.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, game=None):
+        """Discard all retained knowledge, e.g., when a new game begins."""
+        # `isolation.Board.hash_key()` -> (depth, flag, score, best move);
+        # like every move retained here, the best move is a cell number (see
+        # `isolation.Board.to_cell`)
+        self.tt = {}
+        # move -> accumulated weight of the cutoffs caused by that move
+        self.history = {}
+        # expected sequence of moves starting from the current root
+        self.pv = []
+        self.players = None
+        self.root = None
+        self.move_count = 0
+        if game is not None:
+            self.players = (game.__player_1__, game.__player_2__)
+            self.root = game.hash_key()[0]
+            self.move_count = game.move_count
+
+    def is_descendant(self, game, blocked):
+        """Test whether the game state is reachable from the previous root by
+        a whole number of rounds (so the same player holds the initiative).
+        """
+        plies = game.move_count - self.move_count
+        return self.root is not None and \
+            self.players == (game.__player_1__, game.__player_2__) and \
+            plies > 0 and plies % 2 == 0 and blocked & self.root == self.root
+
+    def begin(self, game):
+        """Prepare the retained knowledge for a search from a new root."""
+        blocked = game.hash_key()[0]
+        if not self.is_descendant(game, blocked):
+            self.reset(game)
+            return
+
+        # keep the rest of the expected PV if the game followed it
+        plies = game.move_count - self.move_count
+        expected = 0
+        for cell in self.pv[:plies]:
+            expected |= 1 << cell
+        if len(self.pv) >= plies and expected == blocked & ~self.root and \
+                self.pv[plies - 1] == game.get_player_cell(game.inactive_player):
+            self.pv = self.pv[plies:]
+        else:
+            self.pv = []
+
+        # positions that are not descendants of the new root are unreachable
+        self.tt = {key: entry for key, entry in self.tt.items()
+                   if key[0] & blocked == blocked}
+        # age the history so that recent cutoffs weigh more than old ones
+        self.history = {move: weight // 2 for move, weight in self.history.items()
+                        if weight > 1}
+        self.root = blocked
+        self.move_count = game.move_count
+
+    def probe(self, key, depth, alpha, beta):
+        """Look up a position in the transposition table.
+
+        Returns
+        ----------
+        (bool, float, int)
+            Whether the stored result is deep and tight enough to be returned
+            directly, the stored score, and the stored best move (None if the
+            position is not in the table).
+        """
+        entry = self.tt.get(key)
+        if entry is None:
+            return False, None, None
+        entry_depth, flag, score, move = entry
+        hit = entry_depth >= depth and (flag == EXACT or
+                                        (flag == LOWER and score >= beta) or
+                                        (flag == UPPER and score <= alpha))
+        return hit, score, move
+
+    def store(self, key, depth, score, move, alpha, beta):
+        """Record the result of searching a position with window (alpha, beta)."""
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt[key] = (depth, flag, score, move)
+
+    def record_cutoff(self, move, depth):
+        """Credit a move that caused a beta cutoff in the history table."""
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def update_pv(self, game, max_length):
+        """Rebuild the expected principal variation from the best moves stored
+        in the transposition table, starting at the root `game`."""
+        pv = []
+        board = game
+        for _ in range(max_length):
+            entry = self.tt.get(board.hash_key())
+            if entry is None or entry[3] not in board.get_legal_cells():
+                break
+            pv.append(entry[3])
+            board = board.forecast_cell(entry[3])
+        self.pv = pv
+
+
+class AnytimeResult:
+    """Best-so-far result of an anytime search, written by the worker thread
+    and read by get_move() at the deadline. The result is replaced by a single
+    attribute assignment, so readers always see a consistent triple. The
+    best move can come from an iteration the deadline interrupted, so the
+    deepest fully completed iteration is kept separately.
+
+    Parameters
+    ----------
+    move : (int, int)
+        The fallback move returned if the search publishes nothing.
+    """
+
+    def __init__(self, move):
+        self.best = (move, -infinity, 0)
+        self.completed = 0
+        self.error = None
+
+    @property
+    def move(self):
+        """The best root move published so far."""
+        return self.best[0]
+
+    def publish(self, move, score, depth):
+        """Record the best root move at the given search depth."""
+        self.best = (move, score, depth)
+
+    def complete(self, depth):
+        """Record that the iteration at the given depth finished."""
+        self.completed = depth
+
 
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
@@ -376,23 +602,135 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'negamax'} (optional)
+        The name of the search method to use in get_move(). 'negamax' is a
+        non-recursive alpha-beta search equivalent to 'alphabeta' (without the
+        lmr, extensions and persistent refinements).
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
-        timer expires.
+        timer expires. None ignores the clock entirely, so that the search is
+        only limited by depth or by node_budget.
+
+    lmr : boolean (optional)
+        Flag enabling late move reductions in alphabeta(): moves ordered after
+        the first LMR_FULL_DEPTH_MOVES are searched one ply shallower and only
+        re-searched at full depth when they fail high.
+
+    extensions : boolean (optional)
+        Flag enabling search extensions in alphabeta() for forced positions
+        (a single legal move, or a low-mobility near-partition), limited to
+        MAX_EXTENSIONS extra plies along any path.
+
+    persistent : boolean (optional)
+        Flag enabling a transposition table, history heuristic and principal
+        variation move ordering in alphabeta(). The tables are kept in a
+        `SearchState` and reused across the turns of a game.
+
+    anytime : boolean (optional)
+        Flag to run the search in a worker thread that continuously publishes
+        its best-so-far root move; get_move() returns that move at the
+        deadline instead of unwinding the search with a `Timeout`.
+
+    proof_search : boolean (optional)
+        Flag to run a proof-number solver (see `pn_search`) on a slice of the
+        turn in low-mobility positions; a proven forced win is played
+        immediately without running the heuristic search.
+
+    node_budget : int (optional)
+        Maximum number of nodes expanded per move, counting the nodes of the
+        proof-number solver and of the search. Iterative deepening stops
+        when the budget is spent and returns the move of the last completed
+        iteration. With timeout=None the agent's moves no longer depend on
+        the clock, so games are reproducible regardless of machine load.
+
+    gc_policy : {None, 'freeze', 'disable'} (optional)
+        Garbage collector policy applied during get_move() to avoid
+        collection pauses near the deadline (see `memstats`): freeze the
+        objects that exist when the search starts, or disable automatic
+        collection until the move is returned.
+
+    memory_stats : boolean (optional)
+        Flag to measure the size of a board copy, the peak memory and the
+        garbage collection pauses of every move with a `memstats.MemoryMonitor`
+        and report them in search_info(). Memory tracing slows the search
+        down, so this is a diagnostic mode.
     """
 
+    # number of moves at each node searched to full depth before reducing
+    LMR_FULL_DEPTH_MOVES = 3
+    # smallest remaining depth at which late moves are reduced
+    LMR_MIN_DEPTH = 3
+    # maximum number of extension plies added along a single search path
+    MAX_EXTENSIONS = 2
+    # mobility at or below which a node is tested for a near-partition
+    PARTITION_MOBILITY = 3
+    # interval (in milliseconds) at which an anytime search checks the clock
+    ANYTIME_POLL = 5.
+    # combined mobility of both players at or below which the solver runs
+    PROOF_MOBILITY = 6
+    # fraction of the remaining turn time (or of the node budget) given to
+    # the proof-number solver
+    PROOF_TIME_FRACTION = 0.3
+    # maximum number of positions kept in the proof-number table
+    PROOF_TABLE_SIZE = 200000
+    # nodes the proof-number solver may expand when the turn has no clock
+    # and no node budget to take its share from
+    PROOF_NODE_LIMIT = 20000
+    # number of open cells above which the first placement of the agent is
+    # chosen by opening_move() instead of a full-width search
+    OPENING_SEARCH_LIMIT = 64
+
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 lmr=False, extensions=False, persistent=False, anytime=False,
+                 proof_search=False, node_budget=None, gc_policy=None,
+                 memory_stats=False):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
-        self.TIMER_THRESHOLD = timeout
+        self.use_clock = timeout is not None
+        self.TIMER_THRESHOLD = timeout if self.use_clock else 0.
+        self.node_budget = node_budget
+        self.lmr = lmr
+        self.extensions = extensions
+        self.persistent = persistent
+        self.state = SearchState()
+        self.anytime = anytime
+        # worker thread, its stop flag, shared result and previous best root
+        # move of the current anytime search
+        self._worker = None
+        self._stop = None
+        self._result = None
+        self._root_move = None
+        self.proof_search = proof_search
+        # a node budget is checked after every solver node, so that the
+        # solver never overruns its share
+        self.solver = ProofNumberSearch(self.PROOF_TABLE_SIZE,
+                                        1 if node_budget is not None else 64) \
+            if proof_search else None
+        # number of nodes expanded since the start of the current move by the
+        # search and by the proof-number solver
+        self.nodes = 0
+        self.proof_nodes = 0
+        # deepest search depth completed for the current move, and the depth
+        # of an interrupted anytime iteration that found the move (or None)
+        self.depth = 0
+        self.partial_depth = None
+        self.gc_policy = GCPolicy(gc_policy)
+        self.memory_stats = memory_stats
+        # memory measurements of the last move (see `memstats.MemoryMonitor`)
+        self.memory = {}
+
+    def __getstate__(self):
+        """Drop the per-turn timer and the anytime worker when the agent is
+        pickled (e.g., to play matches in a worker process)."""
+        state = self.__dict__.copy()
+        state.update(time_left=None, _worker=None, _stop=None, _result=None)
+        return state
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -430,7 +768,31 @@ class CustomPlayer:
             (-1, -1) if there are no available legal moves.
         """
 
-        self.time_left = time_left
+        monitor = MemoryMonitor() if self.memory_stats else None
+        self.gc_policy.start()
+        try:
+            if monitor is not None:
+                monitor.start(game)
+            try:
+                return self._search_move(game, legal_moves, time_left)
+            finally:
+                if monitor is not None:
+                    self.memory = monitor.stop()
+        finally:
+            self.gc_policy.stop()
+
+    def _search_move(self, game, legal_moves, time_left):
+        """Body of get_move(), run under the garbage collector policy."""
+        # the worker of the previous anytime search shares the timer, node
+        # count and tables of the agent: stop it before they are reset
+        self._join_worker()
+        self.time_left = self._search_timer(time_left)
+        self.nodes = 0
+        self.proof_nodes = 0
+        self.depth = 0
+        self.partial_depth = None
+        if self.persistent:
+            self.state.begin(game)
 
         # TODO: finish this function!
 
@@ -440,6 +802,18 @@ class CustomPlayer:
         if len(legal_moves) == 0: 
             return (-1, -1)
 
+        if len(legal_moves) > self.OPENING_SEARCH_LIMIT and \
+                game.get_player_location(game.active_player) is game.NOT_MOVED:
+            return opening_move(game, legal_moves)
+
+        if self.proof_search:
+            move = self._prove_win(game, legal_moves)
+            if move is not None:
+                return move
+
+        if self.anytime:
+            return self._anytime_move(game, legal_moves)
+
         # initialize next move 
         move = legal_moves[0]
         TERMINAL_MOVE = [(-1, -1)]
@@ -449,12 +823,7 @@ class CustomPlayer:
             # here in order to avoid timeout. The try/except block will
             # automatically catch the exception raised by the search method
             # when the timer gets close to expiring
-            if self.method == 'minimax':
-                search_alg = self.minimax
-            elif self.method == 'alphabeta': 
-                search_alg = self.alphabeta
-            else: 
-                raise Exception
+            search_alg = self._search_method()
             if self.iterative: 
                 # if iterative deepening is activated, it starts from depth zero
                 # and work it's way toward deeper levels of the decision tree
@@ -466,7 +835,13 @@ class CustomPlayer:
             while self.iterative or depth <= self.search_depth and move not in TERMINAL_MOVE: 
                 # go one level deeper in the search tree
                 _, move = search_alg(game, depth)  
+                self.depth = depth
+                if self.persistent:
+                    self.state.update_pv(game, depth)
                 depth += 1 
+                # the search cannot go deeper than the number of open cells
+                if depth > game.count_blank_spaces():
+                    break
 
         except Timeout:
             # Handle any actions required at timeout, if necessary
@@ -474,6 +849,161 @@ class CustomPlayer:
         # Return the best move from the last completed search iteration
         return move
 
+    def search_info(self):
+        """Report the effort spent on the last move (see `isolation.gamelog`):
+        the deepest completed search depth (and the depth of the interrupted
+        anytime iteration the move comes from, if any), the number of nodes
+        expanded by the search and by the proof-number solver, and the
+        memory measurements of the move if memory_stats is set."""
+        info = {"depth": self.depth, "nodes": self.nodes}
+        if self.partial_depth is not None:
+            info["partial_depth"] = self.partial_depth
+        if self.proof_search:
+            info["proof_nodes"] = self.proof_nodes
+        if self.memory_stats:
+            info.update(self.memory)
+        return info
+
+    def _search_timer(self, time_left):
+        """Return the time_left function polled by the search, combining the
+        turn clock (unless the clock is ignored) with the node budget, which
+        the solver nodes of the move count against: once the budget is spent
+        it reports -infinity, which aborts the search
+        with a `Timeout` like an expired clock."""
+        if self.node_budget is None and self.use_clock:
+            return time_left
+
+        def search_time_left():
+            if self.node_budget is not None and \
+                    self.nodes + self.proof_nodes >= self.node_budget:
+                return -infinity
+            return time_left() if self.use_clock else infinity
+
+        return search_time_left
+
+    def _search_method(self):
+        """Return the bound search method selected by self.method."""
+        if self.method == 'minimax':
+            return self.minimax
+        elif self.method == 'alphabeta':
+            return self.alphabeta
+        elif self.method == 'negamax':
+            return self.negamax
+        raise ValueError("Unknown search method: {!r}".format(self.method))
+
+    def _anytime_move(self, game, legal_moves):
+        """Run the search in a worker thread and return its best-so-far root
+        move when the deadline (TIMER_THRESHOLD ms before the timer expires)
+        is reached, or as soon as the search finishes.
+
+        The worker publishes its result into an `AnytimeResult` whenever the
+        root move improves, including in the middle of an iteration, so the
+        caller never has to wait for a `Timeout` to unwind the recursion.
+
+        The timer is read once to set a wall-clock deadline, so the waiting
+        thread does not poll it: a node clock (see `isolation.clocks`)
+        charges every call, and calls racing with the worker would make the
+        search nondeterministic. A node-counted timer or node budget cannot
+        be converted to a wall-clock deadline at all, so then the worker,
+        which stops itself at the threshold, is awaited instead.
+        """
+        search_alg = self._search_method()
+        time_left = self.time_left
+
+        result = AnytimeResult(legal_moves[0])
+        stop = self._stop = threading.Event()
+        self._result = result
+        self._root_move = None
+        self.time_left = lambda: -infinity if stop.is_set() else time_left()
+        self._worker = threading.Thread(target=self._anytime_search,
+                                        args=(game, search_alg, result))
+        self._worker.daemon = True
+        self._worker.start()
+
+        if self.node_budget is not None or getattr(time_left, "counts_calls", False):
+            # wait for the worker to settle on the result for the full budget
+            self._worker.join()
+        else:
+            deadline = timeit.default_timer() + \
+                (time_left() - self.TIMER_THRESHOLD) / 1000.
+            while self._worker.is_alive():
+                remaining = deadline - timeit.default_timer()
+                if remaining <= 0:
+                    break
+                self._worker.join(min(remaining, self.ANYTIME_POLL / 1000.))
+        stop.set()
+
+        if result.error is not None:
+            raise result.error
+        # read the best result before the completed depth, which the worker
+        # may still advance, so that a finished iteration is never partial
+        move, _, best_depth = result.best
+        self.depth = result.completed
+        if best_depth > self.depth:
+            self.partial_depth = best_depth
+        return move
+
+    def _join_worker(self):
+        """Stop the worker of the previous anytime search and wait for it to
+        unwind, so that it no longer reads or writes the agent's state, and
+        forget its root move, which belongs to the previous position."""
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join()
+            self._worker = self._stop = self._root_move = None
+
+    def _anytime_search(self, game, search_alg, result):
+        """Worker thread body for _anytime_move(): iterative deepening (or a
+        single fixed-depth search) that records every completed iteration."""
+        depth = 1 if self.iterative else self.search_depth
+        # the search cannot go deeper than the number of open cells
+        max_depth = game.count_blank_spaces()
+        try:
+            while depth <= max_depth and (self.iterative or depth <= self.search_depth):
+                score, move = search_alg(game, depth)
+                if move != (-1, -1):
+                    result.publish(move, score, depth)
+                    self._root_move = game.to_cell(move)
+                result.complete(depth)
+                if self.persistent:
+                    self.state.update_pv(game, depth)
+                depth += 1
+        except Timeout:
+            pass
+        except Exception as error:
+            result.error = error
+
+    def _prove_win(self, game, legal_moves):
+        """Run the proof-number solver for PROOF_TIME_FRACTION of the time
+        left in the turn (or of the node budget, or for PROOF_NODE_LIMIT
+        nodes without either). Returns a winning move if the agent has a
+        proven forced win, or None."""
+        opponent_moves = game.get_legal_moves(game.inactive_player)
+        if len(legal_moves) + len(opponent_moves) > self.PROOF_MOBILITY:
+            return None
+
+        if self.node_budget is not None:
+            # a share of the node budget keeps the solver deterministic
+            limit = self.node_budget * self.PROOF_TIME_FRACTION
+            should_stop = lambda: self.solver.nodes >= limit
+        elif not math.isfinite(self.time_left()):
+            # an untimed turn would let the solver solve the whole game
+            should_stop = lambda: self.solver.nodes >= self.PROOF_NODE_LIMIT
+        else:
+            budget = (self.time_left() - self.TIMER_THRESHOLD) * self.PROOF_TIME_FRACTION
+            deadline = self.time_left() - budget
+            should_stop = lambda: self.time_left() < deadline
+        proven, move = self.solver.solve(game, should_stop)
+        self.proof_nodes = self.solver.nodes
+        if proven and move in legal_moves:
+            return move
+        return None
+
+    def _publish_root(self, move, score, depth):
+        """Report an improved root move found during an anytime search."""
+        if self.anytime and self._result is not None:
+            self._result.publish(move, score, depth)
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
 
@@ -504,13 +1034,14 @@ class CustomPlayer:
         def min_value(game, depth):
             if self.time_left() < self.TIMER_THRESHOLD:
                 raise Timeout()
+            self.nodes += 1
             # depth zero means we are at the leaf
-            next_move = (-1, -1)
-            if depth == 0 or len(game.get_legal_moves()) == 0: 
+            next_move = NO_CELL
+            if depth == 0 or len(game.get_legal_cells()) == 0: 
                 return self.score(game, player), next_move
             score = infinity
-            for move in game.get_legal_moves(): 
-                v, _ = max_value(game.forecast_move(move), depth - 1)
+            for move in game.get_legal_cells(): 
+                v, _ = max_value(game.forecast_cell(move), depth - 1)
                 # find the min(score, v) and the corresponding move
                 if score > v: 
                     score = v 
@@ -520,28 +1051,37 @@ class CustomPlayer:
         def max_value(game, depth):
             if self.time_left() < self.TIMER_THRESHOLD:
                 raise Timeout()
+            self.nodes += 1
             # depth zero means we are at the leaf
-            next_move = (-1, -1)
-            if depth == 0 or len(game.get_legal_moves()) == 0: 
+            next_move = NO_CELL
+            if depth == 0 or len(game.get_legal_cells()) == 0: 
                 return self.score(game, player), next_move
             score = -infinity
-            for move in game.get_legal_moves(): 
-                v, _ = min_value(game.forecast_move(move), depth - 1)
+            legal_moves = game.get_legal_cells()
+            if game is root and self._root_move in legal_moves:
+                # search the previous best root move first (anytime search)
+                legal_moves.remove(self._root_move)
+                legal_moves.insert(0, self._root_move)
+            for move in legal_moves: 
+                v, _ = min_value(game.forecast_cell(move), depth - 1)
                 # find the max(score, v) and the corresponding move
                 if score < v: 
                     score = v 
                     next_move = move
+                    if game is root:
+                        self._publish_root(game.to_move(move), score, depth)
             return score, next_move
             
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        root = game
         # Do a search with a bounded depth 
         if maximizing_player:
             score, next_move = max_value(game, depth) 
         else: 
             raise NotImplemented
 
-        return score, next_move   
+        return score, game.to_move(next_move)
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
         """Implement minimax search with alpha-beta pruning as described in the
@@ -576,58 +1116,256 @@ class CustomPlayer:
             The best move for the current branch; (-1, -1) for no legal moves
         """
         
-        def min_value(game, depth, alpha = -infinity, beta = infinity):
+        def min_value(game, depth, alpha=-infinity, beta=infinity, extensions_left=0):
             if self.time_left() < self.TIMER_THRESHOLD:
                 raise Timeout()
+            self.nodes += 1
             # initialize the next move
-            next_move = (-1, -1)
+            next_move = NO_CELL
+            legal_moves = game.get_legal_cells()
             # depth zero means we are at the leaf
-            if depth == 0 or len(game.get_legal_moves()) == 0: 
+            if depth == 0 or len(legal_moves) == 0: 
                 return self.score(game, player), next_move
+            key = first_move = None
+            if self.persistent:
+                key = game.hash_key()
+                hit, score, first_move = self.state.probe(key, depth, alpha, beta)
+                if hit:
+                    return score, first_move
+                if first_move is None and game is root and self.state.pv:
+                    first_move = self.state.pv[0]
+            window = alpha, beta
+            child_depth = depth - 1
+            if extensions_left and self._is_forced(game, legal_moves):
+                # forced positions are searched one ply deeper
+                child_depth += 1
+                extensions_left -= 1
+            if self.lmr or self.persistent:
+                legal_moves = self._order_moves(game, legal_moves, first_move)
             score = infinity
-            for move in game.get_legal_moves(): 
-                v, _  = max_value(game.forecast_move(move), depth - 1, alpha, beta)
+            for idx, move in enumerate(legal_moves): 
+                child = game.forecast_cell(move)
+                if lmr and self._reduce(idx, child_depth):
+                    v, _ = max_value(child, child_depth - 1, alpha, beta, extensions_left)
+                    # re-search at full depth if the reduced move fails high
+                    if v < beta:
+                        v, _ = max_value(child, child_depth, alpha, beta, extensions_left)
+                else:
+                    v, _ = max_value(child, child_depth, alpha, beta, extensions_left)
                 # compare and find hte maximium score and the corresponding move
                 if score > v: 
                     score = v 
                     next_move = move
                 # pruning                  
                 if score <= alpha: 
+                    if self.persistent:
+                        self.state.record_cutoff(move, depth)
                     break
                 # update the value for alpha
                 beta = min(beta, score) 
+            if key is not None:
+                self.state.store(key, depth, score, next_move, *window)
             return score, next_move 
 
-        def max_value(game, depth, alpha = -infinity, beta = infinity):
+        def max_value(game, depth, alpha=-infinity, beta=infinity, extensions_left=0):
             if self.time_left() < self.TIMER_THRESHOLD:
                 raise Timeout()
+            self.nodes += 1
             # initialize the next move
-            next_move = (-1, -1)
+            next_move = NO_CELL
+            legal_moves = game.get_legal_cells()
             # depth zero means we are at the leaf
-            if depth == 0 or len(game.get_legal_moves()) == 0: 
+            if depth == 0 or len(legal_moves) == 0: 
                 return self.score(game, player), next_move
+            key = first_move = None
+            if self.persistent:
+                key = game.hash_key()
+                hit, score, first_move = self.state.probe(key, depth, alpha, beta)
+                if hit:
+                    return score, first_move
+                if first_move is None and game is root and self.state.pv:
+                    first_move = self.state.pv[0]
+            if first_move is None and game is root:
+                # search the previous best root move first (anytime search)
+                first_move = self._root_move
+            window = alpha, beta
+            child_depth = depth - 1
+            if extensions_left and self._is_forced(game, legal_moves):
+                # forced positions are searched one ply deeper
+                child_depth += 1
+                extensions_left -= 1
+            if self.lmr or self.persistent or first_move is not None:
+                legal_moves = self._order_moves(game, legal_moves, first_move)
             score = -infinity
-            for move in game.get_legal_moves(): 
-                v, _  = min_value(game.forecast_move(move), depth - 1, alpha, beta)
+            for idx, move in enumerate(legal_moves): 
+                child = game.forecast_cell(move)
+                if lmr and self._reduce(idx, child_depth):
+                    v, _ = min_value(child, child_depth - 1, alpha, beta, extensions_left)
+                    # re-search at full depth if the reduced move fails high
+                    if v > alpha:
+                        v, _ = min_value(child, child_depth, alpha, beta, extensions_left)
+                else:
+                    v, _ = min_value(child, child_depth, alpha, beta, extensions_left)
                 # compare and find hte maximium score and the corresponding move
                 if score < v: 
                     score = v 
                     next_move = move
+                    if game is root:
+                        self._publish_root(game.to_move(move), score, depth)
                 # pruning                  
                 if score >= beta: 
+                    if self.persistent:
+                        self.state.record_cutoff(move, depth)
                     break
                 # update the value for alpha
                 alpha = max(alpha, score)
+            if key is not None:
+                self.state.store(key, depth, score, next_move, *window)
             return score, next_move
             
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
         player = game.active_player
+        root = game
+        extensions_left = self.MAX_EXTENSIONS if self.extensions else 0
+        # read once, so that the default search pays nothing for the option
+        lmr = self.lmr
 
         if maximizing_player: 
-            score, next_move = max_value(game, depth, alpha, beta)
+            score, next_move = max_value(game, depth, alpha, beta, extensions_left)
         else: 
             raise NotImplemented
 
-        return score, next_move   
+        return score, game.to_move(next_move)
+
+    def _order_moves(self, game, legal_moves, first_move=None):
+        """Order moves for alphabeta: the transposition table (or expected
+        principal variation) move first, then by history heuristic weight
+        when the persistent tables are enabled, and by the number of onward
+        moves from each destination when late move reductions are enabled.
+        Late move reductions rely on this ordering to put the least promising
+        moves at the end.
+        """
+        history = self.state.history if self.persistent else {}
+
+        def key(move):
+            mobility = len(game.cells_from(move)) if self.lmr else 0
+            return move != first_move, -history.get(move, 0), -mobility
+
+        return sorted(legal_moves, key=key)
+
+    def _reduce(self, idx, child_depth):
+        """Test whether the idx-th move of a node should be searched at a
+        reduced depth; only called when late move reductions are enabled.
+        """
+        return idx >= self.LMR_FULL_DEPTH_MOVES and child_depth >= self.LMR_MIN_DEPTH - 1
+
+    def _is_forced(self, game, legal_moves):
+        """Test whether the position is forced enough to be extended: the
+        active player has a single legal move, or few moves and the two
+        players can no longer interfere with each other (near-partition).
+        """
+        if len(legal_moves) == 1:
+            return True
+        return len(legal_moves) <= self.PARTITION_MOBILITY and near_partition(game)
+
+    def negamax(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+        """Alpha-beta search in negamax form, implemented with an explicit
+        stack instead of recursion. The search makes and unmakes moves on the
+        input board (see `isolation.Board.undo_move`) rather than copying it,
+        and visits exactly the same nodes in the same order as alphabeta().
+        The board is restored before returning, even on `Timeout`.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha : float
+            Alpha limits the lower bound of search on minimizing layers
+
+        beta : float
+            Beta limits the upper bound of search on maximizing layers
+
+        Returns
+        ----------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+        player = game.active_player
+        # one frame per interior node on the current path:
+        # [legal moves, index of the next move, alpha, beta, best score, best move, depth]
+        stack = []
+        # (move, previous cell of the moving player) for every applied move
+        undo = []
+        # the node to visit next: its depth and window, or None when returning
+        pending = (depth, alpha, beta)
+        value = None
+
+        try:
+            while True:
+                if pending is not None:
+                    node_depth, node_alpha, node_beta = pending
+                    pending = None
+                    if self.time_left() < self.TIMER_THRESHOLD:
+                        raise Timeout()
+                    self.nodes += 1
+                    legal_moves = game.get_legal_cells()
+                    if node_depth == 0 or len(legal_moves) == 0:
+                        # leaf: score from the point of view of the side to move
+                        value = self.score(game, player)
+                        if game.active_player != player:
+                            value = -value
+                        if not stack:
+                            return value, game.to_move(NO_CELL)
+                    else:
+                        if not stack and self._root_move in legal_moves:
+                            # search the previous best root move first (anytime search)
+                            legal_moves.remove(self._root_move)
+                            legal_moves.insert(0, self._root_move)
+                        stack.append([legal_moves, 0, node_alpha, node_beta,
+                                      -infinity, NO_CELL, node_depth])
+
+                frame = stack[-1]
+                if value is not None:
+                    # a child returned: take its move back and fold in its value
+                    game.undo_cell(*undo.pop())
+                    value = -value
+                    if value > frame[4]:
+                        frame[4] = value
+                        frame[5] = frame[0][frame[1] - 1]
+                        if len(stack) == 1:
+                            self._publish_root(game.to_move(frame[5]), value, depth)
+                    value = None
+                    if frame[4] >= frame[3]:
+                        # pruning
+                        frame[1] = len(frame[0])
+                    elif frame[4] > frame[2]:
+                        frame[2] = frame[4]
+
+                if frame[1] < len(frame[0]):
+                    move = frame[0][frame[1]]
+                    frame[1] += 1
+                    undo.append((move, game.get_player_cell(game.active_player)))
+                    game.apply_cell(move)
+                    pending = (frame[6] - 1, -frame[3], -frame[2])
+                else:
+                    stack.pop()
+                    if not stack:
+                        return frame[4], game.to_move(frame[5])
+                    value = frame[4]
+        finally:
+            while undo:
+                game.undo_cell(*undo.pop())
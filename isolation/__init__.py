@@ -10,10 +10,15 @@ legal moves loses, and the opponent is declared the winner.
 import io
 
 # Make the Board class available at the root of the module for imports
-from .isolation import Board
+from .isolation import Board, GameSession
+from .clocks import WallClock, CPUClock, NodeClock
+from .instrument import BoardCounters, InstrumentedBoard, count_evaluations
+from .instrument import instrumented, instrumented_copy
+from .movement import KNIGHT, KING, QUEEN, ROOK, BISHOP, Leaper, Slider
+from .records import RecordReader, RecordWriter
 
 
-def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
+def game_as_text(winner, move_history, termination="", board=None):
     """
     Generate a printable representation for a game of isolation.
 
@@ -35,9 +40,10 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         Valid reasons for termination include "" (none), "timeout", and
         "illegal move".
 
-    board : isolation.Board
+    board : isolation.Board (optional)
         An instance of `isolation.Board` encoding the game state (e.g., player
-        locations and blocked cells) for a game of isolation.
+        locations and blocked cells) for a game of isolation. The moves are
+        applied to it; a new empty board is used by default.
 
     Returns
     ----------
@@ -45,6 +51,9 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         A string representation of a game of isolation.
     """
 
+    if board is None:
+        board = Board(1, 2)
+
     ans = io.StringIO()
 
     for i, move in enumerate(move_history):
@@ -0,0 +1,86 @@
+"""
+Clocks used by `Board.play` to measure the time each player spends on a turn.
+
+A clock creates the `time_left` callable handed to `get_move()` at the start
+of every turn. The wall clock measures real time; the CPU clock measures the
+processor time used by the current process, so that games running in
+parallel on a loaded host are not penalized for time spent waiting for a
+core; the node clock replaces time with a fixed budget of `time_left()`
+calls, which makes games independent of the host entirely.
+"""
+
+import time
+import timeit
+
+
+class WallClock(object):
+    """Measure turn time with the wall clock."""
+
+    name = "wall"
+
+    def now(self):
+        """Return the current clock reading in milliseconds."""
+        return 1000 * timeit.default_timer()
+
+    def timer(self, time_limit):
+        """
+        Start timing a turn.
+
+        Parameters
+        ----------
+        time_limit : numeric
+            The number of milliseconds allowed for the turn.
+
+        Returns
+        ----------
+        callable
+            A function returning the number of milliseconds left in the turn.
+        """
+        start = self.now()
+        return lambda: time_limit - (self.now() - start)
+
+
+class CPUClock(WallClock):
+    """Measure turn time as CPU time used by the current process (all of its
+    threads), unaffected by other processes competing for the host."""
+
+    name = "cpu"
+
+    def now(self):
+        return 1000 * time.process_time()
+
+
+class NodeClock(WallClock):
+    """
+    Measure turn time in calls to `time_left()` instead of milliseconds.
+
+    Search agents poll `time_left()` once per node, so each call is charged as
+    one node of a fixed budget. The remaining budget is reported on the
+    millisecond scale of the turn, so an agent keeping a margin of
+    TIMER_THRESHOLD ms stops after the same fraction of the budget. The
+    timers it creates have a true `counts_calls` attribute, so agents can
+    tell that they must not poll them from a second thread.
+
+    Parameters
+    ----------
+    node_budget : int
+        The number of `time_left()` calls allowed in each turn.
+    """
+
+    name = "nodes"
+
+    def __init__(self, node_budget):
+        self.node_budget = node_budget
+
+    def timer(self, time_limit):
+        calls = [0]
+
+        def time_left():
+            calls[0] += 1
+            return time_limit * (1. - float(calls[0]) / self.node_budget)
+
+        time_left.counts_calls = True
+        return time_left
+
+
+CLOCKS = {clock.name: clock for clock in [WallClock, CPUClock, NodeClock]}
@@ -0,0 +1,344 @@
+"""
+Line-based engine protocol for playing agents in separate processes.
+
+An engine is a persistent subprocess wrapping any object with a `get_move()`
+function; `RemotePlayer` is the in-process adapter that `Board.play` calls.
+Each line is a command and its space-separated arguments; moves are written
+"row,col" ("-" for Board.NOT_MOVED).
+
+    controller                            engine
+    ----------                            ------
+    isolation 1                           ready <name>
+    newgame <width> <height>
+    position <move count> <p1> <p2> <blocked cells...>
+    moves <move> [<move>...]
+    go <milliseconds | inf>               move <row,col>
+    quit
+
+`newgame` starts a game, `position` sets up a position from scratch, and
+`moves` applies moves to the current position; `go` asks the engine to pick a
+move for the player to move. Only `isolation` and `go` are answered, so the
+controller sends the setup commands of a turn without waiting for the engine,
+and only the moves played since the previous turn (usually two) are sent
+within a game. Malformed commands are answered with `error <message>`.
+
+The controller enforces the time limit itself: an engine that does not answer
+in time forfeits the move and is killed, and an engine that crashes loses by
+an illegal move; either way it is restarted for the next move, so a bad agent
+cannot stall or kill the process playing the game.
+
+Run an engine with `python -m isolation.engine module:factory [kwargs]`, e.g.
+
+    python -m isolation.engine game_agent:CustomPlayer '{"method": "alphabeta"}'
+
+where kwargs is a JSON object of keyword arguments for the factory; string
+values of arguments whose name ends with "_fn" are imported as
+"module:attribute" (e.g. "score_fn": "sample_players:improved_score").
+"""
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from queue import Empty, Queue
+
+from .isolation import Board
+from .clocks import WallClock
+
+PROTOCOL_VERSION = 1
+HANDSHAKE_TIMEOUT = 10.  # seconds allowed for an engine to start
+LATENCY_MARGIN = 5.  # milliseconds of each turn reserved for the pipe round trip
+
+
+def format_move(move):
+    return "-" if move is Board.NOT_MOVED else "{},{}".format(*move)
+
+
+def parse_move(text):
+    if text == "-":
+        return Board.NOT_MOVED
+    row, col = text.split(",")
+    return int(row), int(col)
+
+
+def build_board(player_1, player_2, width, height, move_count, loc_1, loc_2, cells):
+    """
+    Set up a position from its state with public Board methods only.
+
+    Parameters
+    ----------
+    move_count : int
+        The number of moves played.
+
+    loc_1, loc_2 : (int, int)
+        The locations of the players (Board.NOT_MOVED before their first
+        move).
+
+    cells : list<(int, int)>
+        The blocked cells other than the player locations.
+    """
+    board = Board(player_1, player_2, width, height)
+    moves = list(cells)
+    # the last move of each player leaves it on its location
+    for ply in range(max(move_count - 2, 0), move_count):
+        moves.append(loc_1 if ply % 2 == 0 else loc_2)
+    for move in moves:
+        board.apply_move(move)
+    return board
+
+
+class EngineServer(object):
+    """
+    Engine side of the protocol: answer the commands read from `commands`
+    with the moves of `player`.
+
+    Parameters
+    ----------
+    player : object
+        An object with a get_move() function.
+
+    name : str (optional)
+        The name reported to the controller.
+    """
+
+    OPPONENT = "opponent"
+
+    def __init__(self, player, name="engine"):
+        self.player = player
+        self.name = name
+        self.width = self.height = 7
+        self.board = None
+
+    def serve(self, commands=sys.stdin, output=sys.stdout):
+        """Process commands until `quit` or the end of the input."""
+        for line in commands:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == "quit":
+                break
+            try:
+                reply = self.handle(words[0], words[1:])
+            except Exception as error:
+                reply = "error {}: {}".format(type(error).__name__, error)
+            if reply is not None:
+                output.write(reply + "\n")
+                output.flush()
+
+    def handle(self, command, args):
+        """Execute one command and return its reply (None if it has none)."""
+        if command == "isolation":
+            return "ready " + self.name
+        if command == "newgame":
+            self.width, self.height = int(args[0]), int(args[1])
+            self.board = Board(1, 2, self.width, self.height)
+        elif command == "position":
+            self.board = build_board(1, 2, self.width, self.height, int(args[0]),
+                                     parse_move(args[1]), parse_move(args[2]),
+                                     [parse_move(cell) for cell in args[3:]])
+        elif command == "moves":
+            for move in args:
+                self.board.apply_move(parse_move(move))
+        elif command == "go":
+            return "move " + format_move(self.go(float(args[0])))
+        else:
+            raise ValueError("unknown command " + command)
+        return None
+
+    def go(self, time_limit):
+        """Return the move of the player for the active side of the board."""
+        board = self.board
+        # seat the player on the active side of a copy of the position
+        if board.move_count % 2 == 0:
+            players = self.player, self.OPPONENT
+        else:
+            players = self.OPPONENT, self.player
+        blocked, cell_1, cell_2 = board.hash_key()
+        cells = [board.to_move(cell) for cell in range(board.width * board.height)
+                 if blocked >> cell & 1 and cell not in (cell_1, cell_2)]
+        game = build_board(players[0], players[1], board.width, board.height,
+                           board.move_count, board.to_move(cell_1), board.to_move(cell_2),
+                           cells)
+        if time_limit == float("inf"):
+            time_left = lambda: float("inf")
+        else:
+            time_left = WallClock().timer(time_limit)
+        return self.player.get_move(game, game.get_legal_moves(), time_left)
+
+
+class RemotePlayer(object):
+    """
+    Player adapter running an agent in an engine subprocess.
+
+    The engine is started on the first move and reused across moves and
+    games; it is restarted after a timeout or crash. Pickling the player (to
+    send it to a worker process) drops the running engine.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command line starting the engine.
+
+    affinity : set<int> (optional)
+        CPUs the engine is pinned to (where os.sched_setaffinity exists).
+
+    latency_margin : float (optional)
+        Milliseconds of each turn reserved for the pipe round trip; the
+        engine is given the rest.
+    """
+
+    def __init__(self, command, affinity=None, latency_margin=LATENCY_MARGIN):
+        self.command = list(command)
+        self.affinity = affinity
+        self.latency_margin = latency_margin
+        self._engine_name = None
+        self._process = None
+        self._lines = None
+        # (width, height, move count, blocked cells, p1 location, p2
+        # location) of the position the engine holds
+        self._synced = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_process=None, _lines=None, _synced=None)
+        return state
+
+    @property
+    def engine_name(self):
+        """The name reported by the engine (None until it is started)."""
+        return self._engine_name
+
+    def start(self):
+        """Start the engine and wait for its handshake."""
+        self.stop()
+        self._process = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, universal_newlines=True,
+                                         bufsize=1)
+        if self.affinity is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(self._process.pid, self.affinity)
+        self._lines = Queue()
+        reader = threading.Thread(target=self._read, args=(self._process.stdout, self._lines))
+        reader.daemon = True
+        reader.start()
+        self._send("isolation {}".format(PROTOCOL_VERSION))
+        reply = self._reply(HANDSHAKE_TIMEOUT)
+        if reply is None or not reply.startswith("ready"):
+            self.stop()
+            raise RuntimeError("engine {} did not start".format(self.command))
+        self._engine_name = reply[len("ready"):].strip()
+
+    def stop(self, kill=False):
+        """Ask the engine to quit (or kill it right away), killing it if it
+        does not quit within a second."""
+        process, self._process = self._process, None
+        self._synced = None
+        if process is None:
+            return
+        try:
+            if kill:
+                raise OSError("engine killed")
+            process.stdin.write("quit\n")
+            process.stdin.close()
+            process.wait(1.)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    @staticmethod
+    def _read(stream, lines):
+        for line in stream:
+            lines.put(line.strip())
+        lines.put(None)
+
+    def _send(self, line):
+        self._process.stdin.write(line + "\n")
+
+    def _reply(self, timeout=None):
+        """Return the next line of the engine, or None if it does not answer
+        within `timeout` seconds (forever if None) or exits."""
+        self._process.stdin.flush()
+        try:
+            return self._lines.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def _sync(self, game):
+        """Send the commands bringing the engine to the position of `game`."""
+        blocked, cell_1, cell_2 = game.hash_key()
+        loc_1, loc_2 = game.to_move(cell_1), game.to_move(cell_2)
+        state = (game.width, game.height, game.move_count, blocked, loc_1, loc_2)
+        synced = self._synced
+        self._synced = state
+
+        if synced is not None and synced[:2] == state[:2] and \
+                0 < game.move_count - synced[2] <= 2 and blocked & synced[3] == synced[3]:
+            # the plies since the last turn move each player to its location
+            moves = [loc_1 if ply % 2 == 0 else loc_2
+                     for ply in range(synced[2], game.move_count)]
+            added = 0
+            for row, col in moves:
+                added |= 1 << (row * game.width + col)
+            if len(set(moves)) == len(moves) and added == blocked ^ synced[3]:
+                self._send("moves " + " ".join(format_move(move) for move in moves))
+                return
+
+        self._send("newgame {} {}".format(game.width, game.height))
+        cells = [(row, col) for row in range(game.height) for col in range(game.width)
+                 if blocked >> (row * game.width + col) & 1 and (row, col) not in (loc_1, loc_2)]
+        self._send("position {} {} {} {}".format(
+            game.move_count, format_move(loc_1), format_move(loc_2),
+            " ".join(format_move(cell) for cell in cells)).rstrip())
+
+    def get_move(self, game, legal_moves, time_left):
+        """Ask the engine for a move; return None (losing the game) if the
+        engine fails or does not answer before the time runs out."""
+        if self._process is None or self._process.poll() is not None:
+            try:
+                self.start()
+            except (RuntimeError, OSError):
+                # the engine failed to start: forfeit like a crash
+                self.stop(kill=True)
+                return None
+
+        budget = time_left()
+        try:
+            self._sync(game)
+            if budget == float("inf"):
+                self._send("go inf")
+                reply = self._reply()
+            else:
+                self._send("go {:.1f}".format(max(budget - self.latency_margin, 0.)))
+                reply = self._reply(max(time_left(), 0.) / 1000.)
+        except OSError:
+            # the engine closed its input
+            reply = None
+
+        if reply is None or not reply.startswith("move "):
+            # timed out, crashed or out of sync
+            self.stop(kill=True)
+            return None
+        return parse_move(reply.split()[1])
+
+
+def load_object(spec):
+    """Import the object named by "module:attribute"."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("usage: python -m isolation.engine module:factory [kwargs]")
+    kwargs = json.loads(argv[1]) if len(argv) > 1 else {}
+    for key, value in kwargs.items():
+        if key.endswith("_fn") and isinstance(value, str):
+            kwargs[key] = load_object(value)
+    EngineServer(load_object(argv[0])(**kwargs), name=argv[0]).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Streaming JSON lines log of the moves played by `Board.play`.
+
+Every move is written as one JSON object on its own line:
+
+    {"game": "Student-MM_Open-17-0", "ply": 4, "player": 1,
+     "name": "Student", "move": [3, 2], "time_used": 12.5,
+     "time_left": 137.5, "depth": 6, "nodes": 5120}
+
+`player` is the number of the mover (1 or 2) and `name` its name in the
+game (see `Board.play`).
+
+`time_left` is what the turn timer reported when the move was returned and
+`time_used` is the part of the time limit consumed (both in milliseconds, or
+on the millisecond scale of a node clock); without a time limit, `time_left`
+is null and `time_used` is the time elapsed on the clock. Agents that
+define a `search_info()` method returning a dictionary (e.g., `CustomPlayer`
+reports its search depth and node count) have it merged into the record. The
+last line of a game records the winner (1 or 2) and the reason the game
+ended.
+
+Records are buffered in memory and written with a single `os.write` of whole
+lines to a file descriptor opened with O_APPEND, so any number of processes
+can log to the same file without interleaving partial lines, and each move
+costs a JSON encoding and a list append rather than a system call.
+"""
+
+import json
+import math
+import os
+
+BUFFER_SIZE = 1 << 16  # bytes of buffered records that trigger a write
+
+
+class GameLog(object):
+    """
+    Append-only JSON lines sink for game records.
+
+    Parameters
+    ----------
+    path : str
+        Location of the log; created if it does not exist.
+
+    buffer_size : int (optional)
+        Number of buffered bytes that triggers a write to the file. Records
+        are also written by flush() and close().
+    """
+
+    def __init__(self, path, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.buffer = []
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record):
+        """Buffer one record (a dictionary) as a line of the log."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self.buffer.append(line)
+        self.buffered += len(line)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def log_move(self, game_id, ply, player, move, time_used, time_left, info=None,
+                 name=None):
+        """Buffer the record of one move (see the module docstring)."""
+        record = {"game": game_id, "ply": ply, "player": player, "name": name,
+                  "move": list(move) if move is not None else None,
+                  "time_used": time_used,
+                  "time_left": time_left if math.isfinite(time_left) else None}
+        if info:
+            record.update(info)
+        self.write(record)
+
+    def log_result(self, game_id, ply, winner, termination):
+        """Buffer the record of the end of a game."""
+        self.write({"game": game_id, "ply": ply, "winner": winner,
+                    "termination": termination})
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        if self.buffer:
+            data = "".join(self.buffer).encode("utf-8")
+            self.buffer = []
+            self.buffered = 0
+            while data:
+                data = data[os.write(self.fd, data):]
+
+    def close(self):
+        """Flush the buffered records and close the file."""
+        if self.fd is not None:
+            self.flush()
+            os.close(self.fd)
+            self.fd = None
+
+
+def read_log(path):
+    """Return the records of a game log as a list of dictionaries."""
+    with open(path) as lines:
+        return [json.loads(line) for line in lines if line.strip()]
@@ -0,0 +1,63 @@
+"""
+Precomputed geometry of a board size, shared by every `Board` of that size.
+
+Cells are numbered in row-major order (`row * width + col`); the number
+of a cell is the move encoding used inside the engine and the bit of the
+cell in the bitboard of blocked cells (see `Board.hash_key`). The tables
+turn the per-move work of the board into list lookups and integer
+operations:
+
+  * `cells` -- the (row, col) move of every cell number, and `index` the
+    cell number of every (row, col) move on the board;
+  * `bits` -- the bitboard bit of every cell number;
+  * `column_cells` and `column_moves` -- the (cell number, bit) and the
+    ((row, col), bit) pairs of every cell in the column-major order in which
+    `Board.get_blank_spaces` lists them.
+
+Building the tables of a size is linear in its area and happens once per
+process, the first time a board of that size is created. The moves of
+every cell are tabulated by the movement rules (see `isolation.movement`).
+"""
+
+from functools import lru_cache
+
+
+class BoardGeometry(object):
+    """
+    Lookup tables of a board size (see the module docstring).
+
+    Parameters
+    ----------
+    width, height : int
+        The board dimensions.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.area = width * height
+        # bitboard with the bit of every cell set
+        self.full = (1 << self.area) - 1
+        self.cells = [(row, col) for row in range(height) for col in range(width)]
+        self.index = {move: cell for cell, move in enumerate(self.cells)}
+        self.bits = [1 << cell for cell in range(self.area)]
+        self.column_cells = [(row * width + col, self.bits[row * width + col])
+                             for col in range(width) for row in range(height)]
+        self.column_moves = [(self.cells[cell], bit) for cell, bit in self.column_cells]
+        self._center_order = None
+
+    def center_order(self):
+        """Return the cells sorted by their distance to the centre of the
+        board, ties in column-major order."""
+        if self._center_order is None:
+            center_row, center_col = (self.height - 1) / 2., (self.width - 1) / 2.
+            self._center_order = sorted((move for move, _ in self.column_moves),
+                                        key=lambda cell: (cell[0] - center_row) ** 2 +
+                                                         (cell[1] - center_col) ** 2)
+        return self._center_order
+
+
+@lru_cache(maxsize=None)
+def board_geometry(width, height):
+    """Return the shared `BoardGeometry` of a board size."""
+    return BoardGeometry(width, height)
@@ -0,0 +1,148 @@
+"""
+Instrumented boards that count the work of a search: forecasts, applied
+and undone moves, legal-move generations and heuristic evaluations.
+
+`Board` itself carries no instrumentation, so counting costs nothing when it
+is not used. `instrumented()` derives a subclass of a board class whose
+methods update a `BoardCounters` before delegating to the fast ones; boards
+copied from an instrumented board (forecast_move() and copy()) share its
+counters, so the counters of the root board cover the whole search tree:
+
+    board = instrumented_copy(game)  # or InstrumentedBoard(agent, opponent)
+    ...
+    agent.get_move(board, board.get_legal_moves(), time_left)
+    board.counters.forecasts  # Counter of the moves forecast by the search
+
+The counters sit on the cell-number methods the searches use
+(forecast_cell(), apply_cell(), undo_cell(), get_legal_cells()), which the
+(row, col) methods of the board delegate to, so every move is counted once
+whichever interface made it; the moves are counted as (row, col) tuples.
+
+Evaluations happen in the score function rather than in the board, so a
+score function is counted by wrapping it with `count_evaluations()`.
+"""
+
+from collections import Counter
+
+from .isolation import Board
+
+
+class BoardCounters(object):
+    """
+    Work counters shared by an instrumented board and its copies.
+
+    Attributes
+    ----------
+    forecasts : Counter
+        Number of forecast_move() / forecast_cell() calls per move.
+
+    applies : Counter
+        Number of apply_move() / apply_cell() calls per move, including the
+        move applied to the copy by every forecast.
+
+    undos : int
+        Number of undo_move() / undo_cell() calls.
+
+    legal_moves : int
+        Number of get_legal_moves() and get_legal_cells() calls (including
+        the ones made by is_winner(), is_loser() and utility()).
+
+    evaluations : int
+        Number of calls of the score functions wrapped with
+        `count_evaluations()`.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set every counter to zero."""
+        self.forecasts = Counter()
+        self.applies = Counter()
+        self.undos = 0
+        self.legal_moves = 0
+        self.evaluations = 0
+
+    def as_dict(self):
+        """Return the total of every counter by name."""
+        return {"forecasts": sum(self.forecasts.values()),
+                "applies": sum(self.applies.values()),
+                "undos": self.undos, "legal_moves": self.legal_moves,
+                "evaluations": self.evaluations}
+
+
+_instrumented_classes = {}
+
+
+def instrumented(board_class=Board):
+    """
+    Return the instrumented subclass of a board class (created once per
+    class). Its instances have a `counters` attribute holding the
+    `BoardCounters` they share with the boards copied from them.
+    """
+    if board_class in _instrumented_classes:
+        return _instrumented_classes[board_class]
+
+    class InstrumentedBoard(board_class):
+
+        def __init__(self, *args, **kwargs):
+            super(InstrumentedBoard, self).__init__(*args, **kwargs)
+            self.counters = BoardCounters()
+
+        def copy(self):
+            new_board = super(InstrumentedBoard, self).copy()
+            new_board.counters = self.counters
+            return new_board
+
+        def forecast_cell(self, cell):
+            self.counters.forecasts[self.to_move(cell)] += 1
+            return super(InstrumentedBoard, self).forecast_cell(cell)
+
+        def apply_cell(self, cell):
+            self.counters.applies[self.to_move(cell)] += 1
+            super(InstrumentedBoard, self).apply_cell(cell)
+
+        def undo_cell(self, cell, last_cell):
+            self.counters.undos += 1
+            super(InstrumentedBoard, self).undo_cell(cell, last_cell)
+
+        def get_legal_moves(self, player=None):
+            self.counters.legal_moves += 1
+            return super(InstrumentedBoard, self).get_legal_moves(player)
+
+        def get_legal_cells(self, player=None):
+            self.counters.legal_moves += 1
+            return super(InstrumentedBoard, self).get_legal_cells(player)
+
+    InstrumentedBoard.__name__ = "Instrumented" + board_class.__name__
+    InstrumentedBoard.__qualname__ = InstrumentedBoard.__name__
+    InstrumentedBoard.__doc__ = "{} that counts its work (see `isolation.instrument`).".format(
+        board_class.__name__)
+    _instrumented_classes[board_class] = InstrumentedBoard
+    return InstrumentedBoard
+
+
+InstrumentedBoard = instrumented(Board)
+
+
+def instrumented_copy(board):
+    """Return an instrumented copy of a board, with new counters."""
+    new_board = board.copy()
+    new_board.__class__ = instrumented(type(board))
+    new_board.counters = BoardCounters()
+    return new_board
+
+
+def count_evaluations(score_fn):
+    """Wrap a score function so that its calls on instrumented boards are
+    counted in `BoardCounters.evaluations`."""
+
+    def counted_score(game, player):
+        counters = getattr(game, "counters", None)
+        if counters is not None:
+            counters.evaluations += 1
+        return score_fn(game, player)
+
+    counted_score.__name__ = getattr(score_fn, "__name__", "counted_score")
+    counted_score.__doc__ = score_fn.__doc__
+    return counted_score
@@ -1,17 +1,17 @@
 """
 This file contains the `Board` class, which implements the rules for the
 game Isolation as described in lecture, modified so that the players move
-like knights in chess rather than queens.
+like knights in chess rather than queens (by default; see
+`isolation.movement` for the other movement rules).
 
 You MAY use and modify this class, however ALL function signatures must
 remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
-import timeit
-
-from copy import deepcopy
-from copy import copy
+from .clocks import WallClock
+from .geometry import board_geometry
+from .movement import KNIGHT
 
 
 TIME_LIMIT_MILLIS = 200
@@ -20,7 +20,7 @@ TIME_LIMIT_MILLIS = 200
 class Board(object):
     """
     Implement a model for the game Isolation assuming each player moves like
-    a knight in chess.
+    a knight in chess (unless another movement rule is given).
 
     Parameters
     ----------
@@ -37,11 +37,29 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    movement : `isolation.movement.MovementRule` (optional)
+        How the players move (e.g., `isolation.movement.QUEEN` for the
+        original game); knight moves by default.
+
+    The blocked cells are kept as a bitboard, an int with bit
+    `row * width + col` set for every occupied cell, and the moves of each
+    cell come from the precomputed tables of the board size (see
+    `isolation.geometry` and `isolation.movement`), so copies and move
+    generation cost the same on large boards as on small ones.
+
+    Inside the engine a move is the int number of its cell,
+    `row * width + col`. The `*_cell` methods (get_legal_cells(),
+    forecast_cell(), apply_cell(), ...) work on cell numbers and are the
+    ones searches use; the public methods taking and returning (row, col)
+    tuples are thin adapters over them, and to_cell() / to_move() convert
+    between the two.
     """
     BLANK = 0
     NOT_MOVED = None
+    NO_CELL = -1  # the cell number of the (-1, -1) "no move" of the players
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, movement=KNIGHT):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -49,8 +67,12 @@ class Board(object):
         self.__player_2__ = player_2
         self.__active_player__ = player_1
         self.__inactive_player__ = player_2
-        self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
-        self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
+        self.__geometry__ = board_geometry(width, height)
+        self.__movement__ = movement
+        self.__move_table__ = movement.table(width, height)
+        self.__blocked__ = 0
+        # player -> cell number of its location (None before its first move)
+        self.__player_cells__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
 
     @property
@@ -91,17 +113,48 @@ class Board(object):
             return self.__active_player__
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
+    def __getstate__(self):
+        """Leave the geometry tables out of pickles; they are rebuilt from the
+        board size."""
+        state = self.__dict__.copy()
+        del state["__geometry__"]
+        del state["__move_table__"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__geometry__ = board_geometry(self.width, self.height)
+        self.__move_table__ = self.__movement__.table(self.width, self.height)
+
     def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
-        new_board.move_count = self.move_count
-        new_board.__active_player__ = self.__active_player__
-        new_board.__inactive_player__ = self.__inactive_player__
-        new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
+        """ Return a deep copy of the current board (of the same class). """
+        new_board = self.__class__.__new__(self.__class__)
+        # every attribute but the player locations is immutable or shared
+        new_board.__dict__.update(self.__dict__)
+        new_board.__player_cells__ = self.__player_cells__.copy()
         return new_board
 
+    def to_cell(self, move):
+        """
+        Return the cell number of a (row, col) move: None for
+        Board.NOT_MOVED, and Board.NO_CELL for (-1, -1) or any move off the
+        board.
+        """
+        if move is None:
+            return None
+        return self.__geometry__.index.get(move, Board.NO_CELL)
+
+    def to_move(self, cell):
+        """
+        Return the (row, col) move of a cell number: None for
+        Board.NOT_MOVED and (-1, -1) for Board.NO_CELL.
+        """
+        if cell is None:
+            return None
+        if cell < 0:
+            return (-1, -1)
+        return self.__geometry__.cells[cell]
+
     def forecast_move(self, move):
         """
         Return a deep copy of the current game with an input move applied to
@@ -118,8 +171,15 @@ class Board(object):
         `isolation.Board`
             A deep copy of the board with the input move applied.
         """
+        return self.forecast_cell(self.__geometry__.index[move])
+
+    def forecast_cell(self, cell):
+        """
+        Return a copy of the current game with the move to a cell number
+        applied (see forecast_move()).
+        """
         new_board = self.copy()
-        new_board.apply_move(move)
+        new_board.apply_cell(cell)
         return new_board
 
     def move_is_legal(self, move):
@@ -137,17 +197,46 @@ class Board(object):
         bool
             Returns True if the move is legal, False otherwise
         """
-        row, col = move
-        return 0 <= row < self.height and \
-               0 <= col < self.width and \
-               self.__board_state__[row][col] == Board.BLANK
+        cell = self.__geometry__.index.get(move)
+        return cell is not None and not self.__blocked__ >> cell & 1
 
     def get_blank_spaces(self):
         """
         Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-            if self.__board_state__[i][j] == Board.BLANK]
+        blocked = self.__blocked__
+        return [move for move, bit in self.__geometry__.column_moves if not blocked & bit]
+
+    def get_blank_cells(self):
+        """
+        Return the cell numbers of the locations that are still available,
+        in the order of get_blank_spaces().
+        """
+        blocked = self.__blocked__
+        return [cell for cell, bit in self.__geometry__.column_cells if not blocked & bit]
+
+    def count_blank_spaces(self):
+        """
+        Return the number of locations that are still available on the board
+        (every move blocks one cell).
+        """
+        return self.__geometry__.area - self.move_count
+
+    def hash_key(self):
+        """
+        Return a hashable key identifying the current game state.
+
+        Returns
+        ----------
+        (int, int, int)
+            A bitmask of the blocked cells (bit `row * width + col` is set for
+            every occupied cell) followed by the cell numbers of the
+            locations of player 1 and player 2 (None before their first
+            move). The number of set bits equals `move_count`, so the key
+            also determines which player holds the initiative.
+        """
+        return (self.__blocked__, self.__player_cells__[self.__player_1__],
+                self.__player_cells__[self.__player_2__])
 
     def get_player_location(self, player):
         """
@@ -163,7 +252,14 @@ class Board(object):
         (int, int)
             The coordinate pair (row, column) of the input player.
         """
-        return self.__last_player_move__[player]
+        return self.to_move(self.__player_cells__[player])
+
+    def get_player_cell(self, player):
+        """
+        Return the cell number of the location of a player (None before its
+        first move).
+        """
+        return self.__player_cells__[player]
 
     def get_legal_moves(self, player=None):
         """
@@ -183,7 +279,28 @@ class Board(object):
         """
         if player is None:
             player = self.active_player
-        return self.__get_moves__(self.__last_player_move__[player])
+        cell = self.__player_cells__[player]
+        if cell is None:
+            return self.get_blank_spaces()
+        return self.__movement__.moves(self.__move_table__[cell], self.__blocked__)
+
+    def get_legal_cells(self, player=None):
+        """
+        Return the cell numbers of the legal moves of a player (the active
+        player by default), in the order of get_legal_moves().
+        """
+        if player is None:
+            player = self.__active_player__
+        return self.cells_from(self.__player_cells__[player])
+
+    def cells_from(self, cell):
+        """
+        Return the cell numbers of the moves from a cell under the movement
+        rule of the board (every blank cell for Board.NOT_MOVED).
+        """
+        if cell is None:
+            return self.get_blank_cells()
+        return self.__movement__.cells(self.__move_table__[cell], self.__blocked__)
 
     def apply_move(self, move):
         """
@@ -199,12 +316,48 @@ class Board(object):
         ----------
         None
         """
-        row, col = move
-        self.__last_player_move__[self.active_player] = move
-        self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
+        self.apply_cell(self.__geometry__.index[move])
+
+    def apply_cell(self, cell):
+        """ Move the active player to a cell number (see apply_move()). """
+        self.__player_cells__[self.__active_player__] = cell
+        self.__blocked__ |= 1 << cell
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def undo_move(self, move, last_move):
+        """
+        Take back the most recent move; the inverse of apply_move(). Together
+        they allow searching a single board in place (make/unmake) instead of
+        copying it with forecast_move().
+
+        Parameters
+        ----------
+        move : (int, int)
+            The coordinate pair (row, column) of the move being taken back,
+            i.e., the current location of the inactive player.
+
+        last_move : (int, int)
+            The location of that player before the move (Board.NOT_MOVED if
+            it was the player's first move).
+
+        Returns
+        ----------
+        None
+        """
+        self.undo_cell(self.__geometry__.index[move], self.to_cell(last_move))
+
+    def undo_cell(self, cell, last_cell):
+        """
+        Take back the move to a cell number; the inverse of apply_cell()
+        (see undo_move()). last_cell is the cell number of the player before
+        the move, or Board.NOT_MOVED.
+        """
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.__player_cells__[self.__active_player__] = last_cell
+        self.__blocked__ &= ~(1 << cell)
+        self.move_count -= 1
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -249,21 +402,16 @@ class Board(object):
 
     def __get_moves__(self, move):
         """
-        Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        Generate the list of possible moves from a cell under the movement
+        rule of the board (an L-shaped motion, like a knight in chess, by
+        default).
         """
 
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
-
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
-
-        return valid_moves
+        return self.__movement__.moves(self.__move_table__[self.__geometry__.index[move]],
+                                       self.__blocked__)
 
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
@@ -275,31 +423,31 @@ class Board(object):
         blocked, and which remain open.
         """
 
-        p1_loc = self.__last_player_move__[self.__player_1__]
-        p2_loc = self.__last_player_move__[self.__player_2__]
+        p1_loc = self.get_player_location(self.__player_1__)
+        p2_loc = self.get_player_location(self.__player_2__)
 
-        out = ''
+        lines = []
 
         for i in range(self.height):
-            out += ' | '
+            cells = []
 
             for j in range(self.width):
 
-                if not self.__board_state__[i][j]:
-                    out += ' '
+                if not self.__blocked__ >> (i * self.width + j) & 1:
+                    cells.append(' ')
                 elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
-                    out += '1'
+                    cells.append('1')
                 elif p2_loc and i == p2_loc[0] and j == p2_loc[1]:
-                    out += '2'
+                    cells.append('2')
                 else:
-                    out += '-'
+                    cells.append('-')
 
-                out += ' | '
-            out += '\n\r'
+            lines.append(' | ' + ' | '.join(cells) + ' | \n\r')
 
-        return out
+        return ''.join(lines)
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, clock=None, log=None, game_id=None,
+             names=None):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -308,7 +456,21 @@ class Board(object):
         ----------
         time_limit : numeric (optional)
             The maximum number of milliseconds to allow before timeout
-            during each turn.
+            during each turn, or None for no time limit.
+
+        clock : object (optional)
+            The clock measuring each turn (see `isolation.clocks`); the wall
+            clock is used by default.
+
+        log : `isolation.gamelog.GameLog` (optional)
+            Sink receiving a record for every move and for the result.
+
+        game_id : hashable (optional)
+            Identifier of the game in the log records.
+
+        names : (str, str) (optional)
+            Names of player 1 and player 2 in the log records;
+            ("player1", "player2") by default.
 
         Returns
         ----------
@@ -317,35 +479,137 @@ class Board(object):
             move history, and a string indicating the reason for losing
             (e.g., timeout or invalid move).
         """
-        move_history = []
+        session = GameSession(self, time_limit, clock, log, game_id, names)
+        while not session.done:
+            session.step()
+        return session.result()
 
-        curr_time_millis = lambda: 1000 * timeit.default_timer()
 
-        while True:
+class GameSession(object):
+    """
+    A game played one turn at a time, so that a scheduler can interleave many
+    games (see server.py). `Board.play` is a session stepped to the end.
 
-            legal_player_moves = self.get_legal_moves()
+    Each turn is split in two: begin_turn() returns what the active player
+    needs to choose a move, and end_turn() applies the chosen move (or ends
+    the game on a timeout or illegal move). step() runs a whole turn by
+    calling the player's get_move() with the clock of the session.
 
-            game_copy = self.copy()
+    Parameters
+    ----------
+    board : `isolation.Board`
+        The game to play; moves are applied to it in place.
 
-            move_start = curr_time_millis()
-            time_left = lambda : time_limit - (curr_time_millis() - move_start)
-            curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
-            move_end = time_left()
+    time_limit, clock, log, game_id, names : (optional)
+        See `Board.play`.
+    """
 
-            # print move_end
+    def __init__(self, board, time_limit=TIME_LIMIT_MILLIS, clock=None, log=None,
+                 game_id=None, names=None):
+        self.board = board
+        self.time_limit = time_limit
+        self.clock = clock if clock is not None else WallClock()
+        self.log = log
+        self.game_id = game_id
+        self.names = names if names is not None else ("player1", "player2")
+        self.move_history = []
+        self.winner = None
+        self.termination = None
+        self._legal_moves = None
 
-            if curr_move is None:
-                curr_move = Board.NOT_MOVED
+    @property
+    def done(self):
+        """True once the game is over."""
+        return self.termination is not None
+
+    def result(self):
+        """Return the winner, the move history and the reason the game ended
+        (see `Board.play`)."""
+        return self.winner, self.move_history, self.termination
+
+    def timer(self):
+        """Start the turn timer: return the time_left function of a turn."""
+        if self.time_limit is None:
+            return lambda: float("inf")
+        return self.clock.timer(self.time_limit)
+
+    def begin_turn(self):
+        """
+        Start the turn of the active player.
 
-            if self.active_player == self.__player_1__:
-                move_history.append([curr_move])
-            else:
-                move_history[-1].append(curr_move)
+        Returns
+        ----------
+        (object, `isolation.Board`, list<(int, int)>)
+            The active player, a copy of the game for it to search and its
+            legal moves.
+        """
+        self._legal_moves = self.board.get_legal_moves()
+        return self.board.active_player, self.board.copy(), self._legal_moves
 
-            if move_end < 0:
-                return self.__inactive_player__, move_history, "timeout"
+    def end_turn(self, move, time_left, time_used=None, search_info=None):
+        """
+        Finish the turn started by begin_turn().
 
-            if curr_move not in legal_player_moves:
-                return self.__inactive_player__, move_history, "illegal move"
+        Parameters
+        ----------
+        move : (int, int)
+            The move chosen by the active player (None if it chose none).
+
+        time_left : float
+            The time left on the turn timer when the move was returned; the
+            player loses on time if it is negative.
 
-            self.apply_move(curr_move)
+        time_used : float (optional)
+            The time used for the log; by default the part of the time limit
+            that was consumed.
+
+        search_info : dict (optional)
+            The search telemetry for the log; by default the result of the
+            active player's search_info() method, if it has one.
+        """
+        board = self.board
+        if move is None:
+            move = Board.NOT_MOVED
+
+        if self.log is not None:
+            if time_used is None and self.time_limit is not None:
+                time_used = self.time_limit - time_left
+            if search_info is None and hasattr(board.active_player, "search_info"):
+                search_info = board.active_player.search_info()
+            symbol = board.__player_symbols__[board.active_player]
+            self.log.log_move(self.game_id, board.move_count, symbol,
+                              move, time_used, time_left, search_info,
+                              self.names[symbol - 1])
+
+        if board.active_player == board.__player_1__:
+            self.move_history.append([move])
+        else:
+            self.move_history[-1].append(move)
+
+        if time_left < 0:
+            self.termination = "timeout"
+        elif move not in self._legal_moves:
+            self.termination = "illegal move"
+        else:
+            board.apply_move(move)
+            return
+
+        self.winner = board.__inactive_player__
+        if self.log is not None:
+            self.log.log_result(self.game_id, board.move_count,
+                                board.__player_symbols__[self.winner], self.termination)
+
+    def step(self):
+        """Play one turn: ask the active player for a move and apply it."""
+        player, game_copy, legal_moves = self.begin_turn()
+
+        time_used = None
+        if self.log is not None:
+            move_start = self.clock.now()
+        time_left = self.timer()
+        move = player.get_move(game_copy, legal_moves, time_left)
+        move_end = time_left()
+        if self.log is not None and self.time_limit is None:
+            time_used = self.clock.now() - move_start
+
+        self.end_turn(move, move_end, time_used)
@@ -0,0 +1,163 @@
+"""
+Movement rules of the pieces: how a player moves from its cell.
+
+A rule builds a table of the moves from every cell of a board size once
+(cached per size, like `isolation.geometry`), and then generates the legal
+moves of a cell from its table entry and the bitboard of blocked cells,
+either as cell numbers (cells(), used by the engine) or as (row, col)
+tuples (moves(), used by the public Board methods):
+
+  * `Leaper` -- jumps to fixed offsets over any cell in between (knight,
+    king, or any custom set of offsets); an entry lists the (cell, bit,
+    move) targets on the board, and a move is legal when its bit is clear;
+  * `Slider` -- moves any number of cells along fixed directions until the
+    edge of the board or a blocked cell (queen, rook, bishop); an entry
+    holds one ray per direction, with the bitboard mask of the ray. The
+    nearest blocked cell of a ray is found with a single AND of the mask
+    and the blocked cells and a bit scan, and every cell before it is a
+    move, instead of testing the cells one step at a time.
+
+The moves are generated in the order of the offsets (or directions, then
+distance), like the knight moves of the original Board.
+"""
+
+from .geometry import board_geometry
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                  (1, -2), (1, 2), (2, -1), (2, 1)]
+ORTHOGONAL = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+DIAGONAL = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+KING_OFFSETS = sorted(ORTHOGONAL + DIAGONAL)
+
+
+class MovementRule(object):
+    """
+    Base class of the movement rules; subclasses define build(), cells()
+    and moves().
+
+    Parameters
+    ----------
+    name : str
+        The name of the rule.
+
+    offsets : list<(int, int)>
+        The (row, col) offsets of the jumps or directions of the rule.
+    """
+
+    def __init__(self, name, offsets):
+        self.name = name
+        self.offsets = list(offsets)
+        # (width, height) -> table of the moves from every cell
+        self._tables = {}
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(type(self).__name__, self.name, self.offsets)
+
+    def __reduce__(self):
+        """Pickle the predefined rules by name and the others by their
+        offsets, without the tables."""
+        if MOVEMENTS.get(self.name) is self:
+            return self.name.upper()
+        return type(self), (self.name, self.offsets)
+
+    def table(self, width, height):
+        """Return the move table (the entry of every cell number) of a board
+        size."""
+        key = (width, height)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = self.build(board_geometry(width, height))
+        return table
+
+    def build(self, geometry):
+        """Return the list of the table entries of the cells of a
+        `BoardGeometry`."""
+        raise NotImplementedError
+
+    def cells(self, entry, blocked):
+        """Return the cell numbers of the legal moves from a cell, given its
+        table entry and the bitboard of blocked cells."""
+        raise NotImplementedError
+
+    def moves(self, entry, blocked):
+        """Return the legal moves from a cell as (row, col) tuples."""
+        raise NotImplementedError
+
+
+class Leaper(MovementRule):
+    """A piece jumping to fixed (row, col) offsets."""
+
+    def build(self, geometry):
+        table = []
+        for row, col in geometry.cells:
+            targets = [geometry.index[(row + dr, col + dc)] for dr, dc in self.offsets
+                       if 0 <= row + dr < geometry.height and 0 <= col + dc < geometry.width]
+            table.append([(cell, geometry.bits[cell], geometry.cells[cell])
+                          for cell in targets])
+        return table
+
+    def cells(self, entry, blocked):
+        return [cell for cell, bit, _ in entry if not blocked & bit]
+
+    def moves(self, entry, blocked):
+        return [move for _, bit, move in entry if not blocked & bit]
+
+
+class Slider(MovementRule):
+    """A piece sliding along fixed (row, col) directions until blocked."""
+
+    def build(self, geometry):
+        table = []
+        for row, col in geometry.cells:
+            rays = []
+            for dr, dc in self.offsets:
+                cells = []
+                mask = 0
+                # bit -> number of cells of the ray before that bit
+                positions = {}
+                r, c = row + dr, col + dc
+                while 0 <= r < geometry.height and 0 <= c < geometry.width:
+                    cell = geometry.index[(r, c)]
+                    positions[geometry.bits[cell]] = len(cells)
+                    cells.append(cell)
+                    mask |= geometry.bits[cell]
+                    r, c = r + dr, c + dc
+                if cells:
+                    # rays towards higher cell numbers meet their nearest
+                    # blocked cell at the lowest set bit, the others at the
+                    # highest
+                    rays.append((mask, cells, [geometry.cells[cell] for cell in cells],
+                                 positions, (dr, dc) > (0, 0)))
+            table.append(rays)
+        return table
+
+    @staticmethod
+    def _slide(entry, blocked, targets):
+        """Return the targets (index 1 for cell numbers or 2 for moves of a
+        ray) that are legal from a cell."""
+        legal = []
+        for ray in entry:
+            mask, positions, ascending = ray[0], ray[3], ray[4]
+            hits = mask & blocked
+            if not hits:
+                legal.extend(ray[targets])
+            elif ascending:
+                legal.extend(ray[targets][:positions[hits & -hits]])
+            else:
+                legal.extend(ray[targets][:positions[1 << (hits.bit_length() - 1)]])
+        return legal
+
+    def cells(self, entry, blocked):
+        return self._slide(entry, blocked, 1)
+
+    def moves(self, entry, blocked):
+        return self._slide(entry, blocked, 2)
+
+
+KNIGHT = Leaper("knight", KNIGHT_OFFSETS)
+KING = Leaper("king", KING_OFFSETS)
+QUEEN = Slider("queen", KING_OFFSETS)
+ROOK = Slider("rook", ORTHOGONAL)
+BISHOP = Slider("bishop", DIAGONAL)
+
+MOVEMENTS = {rule.name: rule for rule in [KNIGHT, KING, QUEEN, ROOK, BISHOP]}
@@ -0,0 +1,246 @@
+"""
+Compact binary archive of complete games of Isolation.
+
+A game is stored as a fixed-size header followed by its moves, each encoded
+as the uint16 cell index `row * width + col` counted from the empty board
+(opening moves included). An illegal move off the board (which ends a game)
+is stored as the OFF_BOARD code followed by its row and column as int16. A
+file holds any number of games followed by an index of their offsets, so the
+reader can open an archive of millions of games with `mmap`, decode only the
+games it touches, and jump to any game or position without parsing the rest
+of the file.
+
+Layout (all integers little-endian):
+
+    file header    MAGIC
+    game record    width (u8), height (u8), winner (u8: 1 or 2, 0 if
+                   unknown), termination (u8, see TERMINATIONS), number of
+                   move words (u16), moves (u16 words)
+    ...
+    index          offset of every game record (u64 each)
+    footer         number of games (u64), offset of the index (u64), MAGIC
+"""
+
+import mmap
+import struct
+import sys
+
+from array import array
+from collections import namedtuple
+
+from .isolation import Board
+
+MAGIC = b"ISOREC01"
+TERMINATIONS = ["", "timeout", "illegal move"]  # termination codes
+NO_MOVE = 0xFFFF  # code of the (-1, -1) move returned without legal moves
+NOT_MOVED = 0xFFFE  # code of Board.NOT_MOVED (a None move)
+OFF_BOARD = 0xFFFD  # code of a move off the board, followed by its row and column
+WRITE_BUFFER = 1 << 20  # bytes buffered by the writer between system calls
+
+GAME_HEADER = struct.Struct("<BBBBH")
+FOOTER = struct.Struct("<QQ8s")
+
+# the fields follow the arguments of RecordWriter.write()
+GameRecord = namedtuple("GameRecord", ["moves", "winner", "termination", "width", "height"])
+
+
+def flatten(move_history, opening=()):
+    """Return the moves of a game in play order from the opening moves and
+    the move history returned by `Board.play`."""
+    moves = list(opening)
+    for turn in move_history:
+        moves.extend(turn)
+    return moves
+
+
+def encode_moves(moves, width, height):
+    """Return the array of uint16 words encoding a sequence of moves."""
+    codes = array("H")
+    for move in moves:
+        if move is Board.NOT_MOVED:
+            codes.append(NOT_MOVED)
+        elif move == (-1, -1):
+            codes.append(NO_MOVE)
+        else:
+            try:
+                row, col = move
+                on_board = 0 <= row < height and 0 <= col < width
+            except (TypeError, ValueError):
+                raise ValueError("cannot encode move {!r}".format(move))
+            if on_board:
+                codes.append(row * width + col)
+            elif -0x8000 <= row < 0x8000 and -0x8000 <= col < 0x8000:
+                codes.extend([OFF_BOARD, row & 0xFFFF, col & 0xFFFF])
+            else:
+                raise ValueError("cannot encode move {!r}".format(move))
+    return codes
+
+
+def decode_moves(codes, width):
+    """Return the list of (row, col) moves encoded by an array of words."""
+    moves = []
+    words = iter(codes)
+    for code in words:
+        if code == NOT_MOVED:
+            moves.append(Board.NOT_MOVED)
+        elif code == NO_MOVE:
+            moves.append((-1, -1))
+        elif code == OFF_BOARD:
+            row, col = next(words), next(words)
+            moves.append((row - ((row & 0x8000) << 1), col - ((col & 0x8000) << 1)))
+        else:
+            moves.append(divmod(code, width))
+    return moves
+
+
+class RecordWriter(object):
+    """
+    Write games to a new archive. The index is written by close(), so an
+    archive is only readable once its writer has been closed.
+
+    Parameters
+    ----------
+    path : str
+        Location of the archive; an existing file is replaced.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "wb", buffering=WRITE_BUFFER)
+        self.file.write(MAGIC)
+        self.offsets = array("Q")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, moves, winner=0, termination="", width=7, height=7):
+        """
+        Append one game.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            Every move of the game in play order, starting from the empty
+            board (see `flatten()`).
+
+        winner : int (optional)
+            1 or 2 for the winning player, 0 if unknown.
+
+        termination : str (optional)
+            The reason the game ended, one of TERMINATIONS.
+
+        width, height : int (optional)
+            Board dimensions.
+        """
+        codes = encode_moves(moves, width, height)
+        if sys.byteorder == "big":
+            codes.byteswap()
+        self.offsets.append(self.file.tell())
+        self.file.write(GAME_HEADER.pack(width, height, winner,
+                                         TERMINATIONS.index(termination), len(codes)))
+        self.file.write(codes.tobytes())
+
+    def write_many(self, games):
+        """Append (moves, winner, termination, width, height) tuples."""
+        for game in games:
+            self.write(*game)
+
+    def close(self):
+        """Write the index and footer and close the file."""
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        offsets = self.offsets
+        if sys.byteorder == "big":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        self.file.write(offsets.tobytes())
+        self.file.write(FOOTER.pack(len(self.offsets), index_offset, MAGIC))
+        self.file.close()
+
+
+class RecordReader(object):
+    """
+    Random-access reader of an archive, backed by a read-only memory map.
+
+    Parameters
+    ----------
+    path : str
+        Location of an archive written by `RecordWriter`.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as archive:
+            self.map = mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < len(MAGIC) + FOOTER.size or self.map[:len(MAGIC)] != MAGIC:
+            self.map.close()
+            raise ValueError("{} is not a game record archive".format(path))
+        count, index_offset, magic = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError("{} is incomplete (the writer was not closed)".format(path))
+        self.count = count
+        self.index_offset = index_offset
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """Return the `GameRecord` of a game, with decoded (row, col) moves."""
+        width, height, winner, termination, codes = self._game(index)
+        return GameRecord(decode_moves(codes, width), winner,
+                          TERMINATIONS[termination], width, height)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def _offset(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError("game index out of range")
+        return struct.unpack_from("<Q", self.map, self.index_offset + 8 * index)[0]
+
+    def _game(self, index):
+        """Return the header fields and the array of move codes of a game."""
+        offset = self._offset(index)
+        width, height, winner, termination, num_moves = GAME_HEADER.unpack_from(self.map, offset)
+        start = offset + GAME_HEADER.size
+        codes = array("H", self.map[start:start + 2 * num_moves])
+        if sys.byteorder == "big":
+            codes.byteswap()
+        return width, height, winner, termination, codes
+
+    def position(self, index, ply, player_1=1, player_2=2):
+        """
+        Reconstruct the board of a game after `ply` moves.
+
+        Returns
+        ----------
+        `isolation.Board`
+            A board between player_1 and player_2 with the first `ply` moves
+            of the game applied (a final move that ended the game on a timeout
+            or an illegal move is not applied).
+        """
+        width, height, _, termination, codes = self._game(index)
+        moves = decode_moves(codes, width)
+        if not 0 <= ply <= len(moves):
+            raise IndexError("ply out of range")
+        if termination:
+            # the move ending the game on a timeout or illegal move is
+            # recorded but was never applied
+            ply = min(ply, len(moves) - 1)
+        board = Board(player_1, player_2, width, height)
+        for move in moves[:ply]:
+            board.apply_move(move)
+        return board
+
+    def close(self):
+        self.map.close()
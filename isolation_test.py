@@ -0,0 +1,343 @@
+"""
+This file contains test cases for the isolation package: move generation
+against the perft reference counts, the steppable game API (GameSession), the
+binary game archive (isolation.records), the engine protocol for
+out-of-process agents (isolation.engine), the instrumented boards
+(isolation.instrument), large boards and movement rules
+(isolation.movement).
+"""
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+import unittest
+
+import isolation
+import game_agent
+
+from benchmarks import perft
+from isolation.engine import RemotePlayer
+from isolation.records import RecordReader, RecordWriter, flatten
+from sample_players import RandomPlayer
+from tournament_test import timeout
+
+
+class GameRecordsTest(unittest.TestCase):
+    """Test the binary game record archive and game replay."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "games.rec")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play_games(self, num_games):
+        random.seed(5)
+        games = []
+        for size in range(num_games):
+            player1, player2 = RandomPlayer(), RandomPlayer()
+            board = isolation.Board(player1, player2, 5 + size % 3, 5 + size % 2)
+            opening = [(0, 0), (1, 1)]
+            for move in opening:
+                board.apply_move(move)
+            winner, history, termination = board.play(time_limit=None)
+            games.append((flatten(history, opening), 1 if winner == player1 else 2,
+                          termination, board.width, board.height))
+        return games
+
+    @timeout(20)
+    def test_round_trip(self):
+        """ Test that archived games and positions are reproduced exactly """
+        games = self.play_games(10)
+        with RecordWriter(self.path) as writer:
+            writer.write_many(games)
+
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), len(games))
+            self.assertEqual([tuple(record) for record in reader], games)
+            for index in reversed(range(len(games))):
+                moves, _, _, width, height = games[index]
+                board = isolation.Board(1, 2, width, height)
+                for ply, move in enumerate(moves[:-1]):
+                    self.assertEqual(reader.position(index, ply).hash_key(),
+                                     board.hash_key())
+                    board.apply_move(move)
+                # the illegal (-1, -1) move ending the game is not applied
+                self.assertEqual(reader.position(index, len(moves)).hash_key(),
+                                 board.hash_key())
+
+    def test_incomplete_archive(self):
+        """ Test that an archive without its index is rejected """
+        writer = RecordWriter(self.path)
+        writer.write_many(self.play_games(1))
+        writer.file.flush()
+        with self.assertRaises(ValueError):
+            RecordReader(self.path)
+        writer.close()
+
+    def test_game_as_text(self):
+        """ Test that game_as_text does not share its default board """
+        history = [[(0, 0), (1, 1)], [(2, 1)]]
+        text = isolation.game_as_text(1, history, "illegal move")
+        self.assertEqual(isolation.game_as_text(1, history, "illegal move"), text)
+
+    def test_off_board_moves(self):
+        """ Test that illegal moves off the board are stored exactly """
+        games = [[(0, 0), (1, 1), (0, 7)], [(0, 0), (1, 1), (2, 2), (-3, 2)]]
+        with RecordWriter(self.path) as writer:
+            for moves in games:
+                writer.write(moves, 2 - len(moves) % 2, "illegal move")
+        with RecordReader(self.path) as reader:
+            for index, moves in enumerate(games):
+                self.assertEqual(reader[index].moves, moves)
+                self.assertEqual(reader.position(index, len(moves)).hash_key(),
+                                 reader.position(index, len(moves) - 1).hash_key())
+
+    def test_invalid_moves(self):
+        """ Test that moves that cannot be encoded are rejected """
+        with RecordWriter(self.path) as writer:
+            for move in [(0, 1 << 20), "e4", (1, 2, 3)]:
+                with self.assertRaises(ValueError):
+                    writer.write([move])
+
+
+class PerftTest(unittest.TestCase):
+    """Test move generation against the reference counts of benchmarks/perft.json."""
+
+    def test_perft(self):
+        """ Test that every perft backend reproduces the reference counts """
+        positions = perft.load_reference()
+        for name, backend in perft.BACKENDS:
+            self.assertEqual(perft.check(backend, positions, max_depth=4), [], name)
+
+    def test_reference_positions(self):
+        """ Test that the reference positions are the committed ones """
+        committed = [{key: value for key, value in position.items() if key != "counts"}
+                     for position in perft.load_reference()]
+        self.assertEqual(perft.reference_positions(), committed)
+
+
+class InstrumentedBoardTest(unittest.TestCase):
+    """Test the work counters of the instrumented boards."""
+
+    def test_perft_counts(self):
+        """ Test that forecasts, moves and generations of a search are counted """
+        board = isolation.InstrumentedBoard("player1", "player2", 5, 5)
+        board.apply_move((0, 0))
+        board.apply_move((4, 4))
+        board.counters.reset()
+
+        leaves = perft.perft_forecast(board, 3)
+        counters = board.counters.as_dict()
+        self.assertEqual(counters["forecasts"], counters["applies"])
+        self.assertEqual(counters["legal_moves"], 1 + counters["forecasts"])
+        board.counters.reset()
+        self.assertEqual(perft.perft_unmake(board, 3), leaves)
+        self.assertEqual(board.counters.undos, sum(board.counters.applies.values()))
+        self.assertEqual(board.counters.as_dict()["forecasts"], 0)
+        self.assertFalse(hasattr(isolation.Board("player1", "player2"), "counters"))
+
+    def test_search_counts(self):
+        """ Test that the evaluations of a search are counted """
+        agent = game_agent.CustomPlayer(2, isolation.count_evaluations(lambda game, player: 0.),
+                                        False, "minimax")
+        board = isolation.InstrumentedBoard(agent, "player2", 5, 5)
+        board.apply_move((2, 2))
+        board.apply_move((0, 0))
+        agent.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        counters = board.counters
+        self.assertEqual(counters.evaluations, sum(counters.forecasts.values()) -
+                         len(board.get_legal_moves()))
+        self.assertEqual(agent.nodes, 1 + sum(counters.forecasts.values()))
+        self.assertIs(isolation.instrumented(isolation.Board), isolation.InstrumentedBoard)
+
+
+class LargeBoardTest(unittest.TestCase):
+    """Test the bitboard representation on boards larger than 7x7."""
+
+    def test_random_play(self):
+        """ Test move generation against the rules during random games """
+        rng = random.Random(3)
+        for width, height in [(15, 15), (31, 17)]:
+            board = isolation.Board("player1", "player2", width, height)
+            while True:
+                self.assertEqual(len(board.get_blank_spaces()), board.count_blank_spaces())
+                self.assertEqual([board.to_move(cell) for cell in board.get_blank_cells()],
+                                 board.get_blank_spaces())
+                location = board.get_player_location(board.active_player)
+                moves = board.get_legal_moves()
+                if location is not None:
+                    row, col = location
+                    expected = [(row + dr, col + dc)
+                                for dr, dc in isolation.movement.KNIGHT_OFFSETS
+                                if 0 <= row + dr < height and 0 <= col + dc < width and
+                                (row + dr, col + dc) in board.get_blank_spaces()]
+                    self.assertEqual(moves, expected)
+                if not moves:
+                    break
+                board.apply_move(rng.choice(moves))
+            self.assertEqual(pickle.loads(pickle.dumps(board)).hash_key(), board.hash_key())
+            self.assertGreater(board.move_count, 20)
+
+    def test_cell_numbers(self):
+        """ Test the conversions between moves and cell numbers """
+        board = isolation.Board("player1", "player2", 15, 9)
+        self.assertEqual(board.to_cell((2, 3)), 2 * 15 + 3)
+        self.assertEqual(board.to_move(2 * 15 + 3), (2, 3))
+        self.assertEqual(board.to_cell((9, 0)), isolation.Board.NO_CELL)
+        self.assertEqual(board.to_move(board.to_cell((-1, -1))), (-1, -1))
+        self.assertIsNone(board.to_move(board.to_cell(isolation.Board.NOT_MOVED)))
+        board.apply_move((2, 3))
+        board.apply_cell(board.to_cell((8, 14)))
+        self.assertEqual(board.hash_key(), (1 << 33 | 1 << 134, 33, 134))
+        self.assertEqual(board.get_player_location("player2"), (8, 14))
+        board.undo_move((8, 14), isolation.Board.NOT_MOVED)
+        self.assertIsNone(board.get_player_cell("player2"))
+        self.assertEqual(board.hash_key(), (1 << 33, 33, None))
+
+
+class MovementTest(unittest.TestCase):
+    """Test the movement rules of isolation.movement."""
+
+    def test_rules(self):
+        """ Test table and ray move generation against stepping every cell """
+        camel = isolation.Leaper("camel", [(1, 3), (3, 1), (-1, 3), (3, -1)])
+        for rule in [isolation.KNIGHT, isolation.KING, isolation.QUEEN, isolation.ROOK,
+                     isolation.BISHOP, camel]:
+            rng = random.Random(rule.name)
+            board = isolation.Board("player1", "player2", 9, 6, rule)
+            board.apply_move((2, 3))
+            board.apply_move((4, 4))
+            while True:
+                row, col = board.get_player_location(board.active_player)
+                expected = []
+                for dr, dc in rule.offsets:
+                    r, c = row + dr, col + dc
+                    while board.move_is_legal((r, c)):
+                        expected.append((r, c))
+                        if isinstance(rule, isolation.Leaper):
+                            break
+                        r, c = r + dr, c + dc
+                moves = board.get_legal_moves()
+                self.assertEqual(moves, expected)
+                self.assertEqual([board.to_move(cell) for cell in board.get_legal_cells()],
+                                 moves)
+                if not moves:
+                    break
+                board.apply_cell(board.to_cell(rng.choice(moves)))
+
+            copy = pickle.loads(pickle.dumps(board))
+            self.assertEqual(copy.get_legal_moves(copy.inactive_player),
+                             board.get_legal_moves(board.inactive_player))
+        self.assertIs(pickle.loads(pickle.dumps(isolation.QUEEN)), isolation.QUEEN)
+
+    @timeout(20)
+    def test_queen_game(self):
+        """ Test that CustomPlayer plays the queen-move game unchanged """
+        players = [game_agent.CustomPlayer(score_fn=game_agent.custom_score_improved,
+                                           method="alphabeta") for _ in range(2)]
+        board = isolation.Board(players[0], players[1], 7, 7, isolation.QUEEN)
+        winner, history, termination = board.play(time_limit=50, clock=isolation.NodeClock(300))
+        self.assertIn(winner, players)
+        self.assertNotEqual(termination, "timeout")
+        # an agent that sees every move lose gives up with (-1, -1)
+        self.assertEqual(history[-1][-1], (-1, -1))
+
+
+class GameSessionTest(unittest.TestCase):
+    """Test the steppable game API behind Board.play."""
+
+    def test_stepped_game(self):
+        """ Test that a session played turn by turn matches Board.play """
+        random.seed(3)
+        board = isolation.Board(RandomPlayer(), RandomPlayer())
+        expected = board.copy().play(time_limit=None)
+
+        random.seed(3)
+        session = isolation.GameSession(board, time_limit=None)
+        turns = 0
+        while not session.done:
+            player, game, legal_moves = session.begin_turn()
+            self.assertIs(player, board.active_player)
+            self.assertEqual(game.hash_key(), board.hash_key())
+            session.end_turn(player.get_move(game, legal_moves, lambda: 1.), 1.)
+            turns += 1
+        winner, move_history, termination = session.result()
+        self.assertEqual((move_history, termination), expected[1:])
+        self.assertEqual(turns, sum(len(turn) for turn in move_history))
+
+    def test_forfeits(self):
+        """ Test that end_turn ends the game on a timeout or illegal move """
+        for move, time_left, termination in [((0, 0), -1., "timeout"),
+                                             ((9, 9), 1., "illegal move"),
+                                             (None, 1., "illegal move")]:
+            board = isolation.Board("player1", "player2")
+            session = isolation.GameSession(board)
+            session.begin_turn()
+            session.end_turn(move, time_left)
+            self.assertEqual(session.result(),
+                             ("player2", [[move or isolation.Board.NOT_MOVED]], termination))
+            self.assertEqual(board.move_count, 0)
+
+
+ENGINE_ARGS = '{"search_depth": 2, "iterative": false, "method": "alphabeta"}'
+
+# engines that handshake and then hang or exit when asked for a move
+HUNG_ENGINE = """
+import sys, time
+sys.stdin.readline()
+print("ready hung", flush=True)
+for line in sys.stdin:
+    if line.startswith("go"):
+        time.sleep(60)
+"""
+CRASHING_ENGINE = HUNG_ENGINE.replace("time.sleep(60)", "sys.exit(1)")
+BROKEN_ENGINE = "import sys; sys.exit(1)"  # exits before the handshake
+
+
+class RemotePlayerTest(unittest.TestCase):
+    """Test agents playing through the engine protocol."""
+
+    def play(self, player, seed, time_limit=None):
+        random.seed(seed)
+        board = isolation.Board(player, RandomPlayer())
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        return board.play(time_limit=time_limit)
+
+    @timeout(30)
+    def test_remote_games(self):
+        """ Test that a remote agent plays the moves of the local agent """
+        remote = RemotePlayer([sys.executable, "-m", "isolation.engine",
+                               "game_agent:CustomPlayer", ENGINE_ARGS])
+        local = game_agent.CustomPlayer(2, game_agent.custom_score, False, "alphabeta")
+        try:
+            for seed in range(2):
+                _, remote_history, _ = self.play(remote, seed)
+                _, local_history, _ = self.play(local, seed)
+                self.assertEqual(remote_history, local_history)
+            self.assertEqual(remote.engine_name, "game_agent:CustomPlayer")
+        finally:
+            remote.stop()
+
+    @timeout(30)
+    def test_engine_failures(self):
+        """ Test that hung, crashing and broken engines lose without stalling """
+        for code, termination in [(HUNG_ENGINE, "timeout"),
+                                  (CRASHING_ENGINE, "illegal move"),
+                                  (BROKEN_ENGINE, "illegal move")]:
+            remote = RemotePlayer([sys.executable, "-c", code])
+            start = timeit.default_timer()
+            winner, _, reason = self.play(remote, 0, time_limit=100)
+            self.assertLess(timeit.default_timer() - start, 10.)
+            self.assertNotEqual(winner, remote)
+            self.assertEqual(reason, termination)
+            self.assertIsNone(remote._process)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Memory instrumentation of the search of CustomPlayer, and the garbage
+collector policies it can apply while it searches.
+
+A `MemoryMonitor` runs around one get_move call and measures:
+
+  * the size of a board copy, i.e. the bytes (traced by `tracemalloc`)
+    and the memory blocks (`sys.getallocatedblocks()`) retained by the
+    board that forecast_cell() returns for the first legal move at the
+    root (on a plain `Board` copy of the root, so the counters of an
+    instrumented game are left alone). This is what every node of a
+    copying search holds while it is on the search path, not the memory
+    allocated per node over the search (`tracemalloc` keeps no running
+    total of allocations);
+  * the peak of the traced memory during the move, above the memory traced
+    when it started;
+  * the number of garbage collections and their pause times, recorded by a
+    `gc.callbacks` hook (in milliseconds).
+
+Tracing with `tracemalloc` slows every allocation down, so a monitor only
+traces during the move it measures, unless tracing was already on.
+
+The garbage collector policies are:
+
+  * None -- leave the garbage collector alone;
+  * 'freeze' -- move every object that exists when the search starts (game
+    history, transposition table) to the permanent generation with
+    `gc.freeze()`, so that the collections triggered by the search only
+    scan the objects it creates. `gc.unfreeze()` thaws the whole permanent
+    generation, so the policy does nothing when the host process already
+    froze objects itself;
+  * 'disable' -- turn automatic collection off during the search. Boards
+    hold no reference cycles, so the nodes of the search are still freed by
+    reference counting; the cycles of other code wait for the next
+    collection after the move.
+"""
+
+import gc
+import sys
+import timeit
+import tracemalloc
+
+from isolation import Board
+
+GC_POLICIES = (None, 'freeze', 'disable')
+
+
+class GCPolicy(object):
+    """
+    Apply a garbage collector policy (see the module docstring) between
+    start() and stop(), or in a with statement.
+
+    Parameters
+    ----------
+    policy : {None, 'freeze', 'disable'}
+        The garbage collector policy.
+    """
+
+    def __init__(self, policy):
+        if policy not in GC_POLICIES:
+            raise ValueError("Unknown GC policy: {!r}".format(policy))
+        self.policy = policy
+        self._enabled = None
+        self._frozen = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Apply the policy."""
+        if self.policy == 'freeze':
+            # only freeze when every frozen object will be ours to unfreeze
+            self._frozen = gc.get_freeze_count() == 0
+            if self._frozen:
+                gc.freeze()
+        elif self.policy == 'disable':
+            self._enabled = gc.isenabled()
+            gc.disable()
+
+    def stop(self):
+        """Restore the garbage collector."""
+        if self.policy == 'freeze' and self._frozen:
+            gc.unfreeze()
+            self._frozen = False
+        elif self.policy == 'disable' and self._enabled:
+            gc.enable()
+
+
+class MemoryMonitor(object):
+    """Measure the memory used by the search of one move (see the module
+    docstring) between start() and stop()."""
+
+    def __init__(self):
+        self.copy_bytes = None
+        self.copy_blocks = None
+        self.collections = 0
+        self.gc_pause = 0.
+        self.max_gc_pause = 0.
+        self._traced = 0
+        self._tracing = False
+        self._collection_start = None
+
+    def start(self, game):
+        """Measure the size of a board copy of `game` and start monitoring."""
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+        # measure on a plain Board, so that the work of an instrumented game
+        # (see `isolation.instrument`) is not counted
+        board = game.copy()
+        board.__class__ = Board
+        legal_moves = board.get_legal_cells()
+        if legal_moves:
+            blocks = sys.getallocatedblocks()
+            traced = tracemalloc.get_traced_memory()[0]
+            child = board.forecast_cell(legal_moves[0])
+            self.copy_bytes = tracemalloc.get_traced_memory()[0] - traced
+            self.copy_blocks = sys.getallocatedblocks() - blocks
+            del child
+        del board
+
+        self._traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        gc.callbacks.append(self._on_collection)
+
+    def stop(self):
+        """
+        Stop monitoring.
+
+        Returns
+        ----------
+        dict
+            The size of a board copy ("copy_bytes" and "copy_blocks", None
+            without legal moves), the peak memory of the move in bytes
+            ("peak_memory"), and the number ("gc_collections"), total pause
+            ("gc_pause") and longest pause ("gc_max_pause") of the garbage
+            collections in milliseconds.
+        """
+        gc.callbacks.remove(self._on_collection)
+        peak = tracemalloc.get_traced_memory()[1] - self._traced
+        if self._tracing:
+            tracemalloc.stop()
+        return {"copy_bytes": self.copy_bytes, "copy_blocks": self.copy_blocks,
+                "peak_memory": peak, "gc_collections": self.collections,
+                "gc_pause": self.gc_pause, "gc_max_pause": self.max_gc_pause}
+
+    def _on_collection(self, phase, info):
+        if phase == "start":
+            self._collection_start = timeit.default_timer()
+        elif self._collection_start is not None:
+            pause = 1000. * (timeit.default_timer() - self._collection_start)
+            self._collection_start = None
+            self.collections += 1
+            self.gc_pause += pause
+            self.max_gc_pause = max(self.max_gc_pause, pause)
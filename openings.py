@@ -0,0 +1,142 @@
+"""
+Fixed opening suite for tournament play.
+
+Random two-ply starts give every pairing different positions, which adds
+variance to the results. Instead, the suite enumerates every two-ply opening
+(a placement for each player), keeps one representative of each class of
+positions equivalent under the symmetries of the board, and discards the
+openings that a shallow search judges lopsided. Every pairing plays the same
+openings in the same order, so agents are compared on equal terms.
+
+The suite is stored in a text file with one opening per line, e.g.
+"3,2 1,4" for player 1 at (3, 2) and player 2 at (1, 4); blank lines and
+lines starting with "#" are ignored. Run `python openings.py` to regenerate
+the default suite.
+"""
+
+import argparse
+import os
+import random
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+SUITE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openings.txt")
+BALANCE_DEPTH = 5  # depth of the alpha-beta search judging each opening
+MAX_IMBALANCE = 0.  # largest |improved_score| of the search kept in the suite
+SUITE_SEED = 2017  # seed of the shuffle spreading similar openings over the suite
+
+
+def symmetries(width, height):
+    """Return the functions mapping a cell (row, col) to its image under each
+    symmetry of a width x height board (8 on square boards, 4 otherwise)."""
+    transforms = [lambda r, c: (r, c),
+                  lambda r, c: (height - 1 - r, c),
+                  lambda r, c: (r, width - 1 - c),
+                  lambda r, c: (height - 1 - r, width - 1 - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r),
+                       lambda r, c: (width - 1 - c, r),
+                       lambda r, c: (c, height - 1 - r),
+                       lambda r, c: (width - 1 - c, height - 1 - r)]
+    return [lambda move, f=f: f(*move) for f in transforms]
+
+
+def canonical(opening, width=7, height=7):
+    """Return the smallest image of an opening under the board symmetries."""
+    return min(tuple(transform(move) for move in opening)
+               for transform in symmetries(width, height))
+
+
+def balance(opening, width=7, height=7, depth=BALANCE_DEPTH):
+    """Return the alpha-beta value of an opening for player 1 (who moves
+    next) with the improved heuristic at a fixed depth."""
+    agent = CustomPlayer(search_depth=depth, score_fn=improved_score,
+                         iterative=False, method='alphabeta', timeout=None)
+    agent.time_left = lambda: float("inf")
+    game = Board(agent, "opponent", width, height)
+    game.apply_move(opening[0])
+    game.apply_move(opening[1])
+    score, _ = agent.alphabeta(game, depth)
+    return score
+
+
+def generate_suite(width=7, height=7, depth=BALANCE_DEPTH, max_imbalance=MAX_IMBALANCE):
+    """
+    Build the opening suite of a board.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        Board dimensions.
+
+    depth : int (optional)
+        Depth of the search judging the balance of each opening.
+
+    max_imbalance : float (optional)
+        Openings whose value for the side to move exceeds this bound in
+        absolute value are discarded.
+
+    Returns
+    ----------
+    list<[(int, int), (int, int)]>
+        The canonical balanced openings, most balanced first; openings of
+        equal balance are shuffled so that any prefix of the suite covers
+        the whole board.
+    """
+    cells = [(r, c) for r in range(height) for c in range(width)]
+    unique = {canonical((first, second), width, height)
+              for first in cells for second in cells if first != second}
+
+    suite = []
+    for opening in sorted(unique):
+        score = balance(opening, width, height, depth)
+        if abs(score) <= max_imbalance:
+            suite.append((abs(score), list(opening)))
+    random.Random(SUITE_SEED).shuffle(suite)
+    suite.sort(key=lambda entry: entry[0])
+    return [opening for _, opening in suite]
+
+
+def load_suite(path=SUITE_FILE):
+    """Read an opening suite file (see the module docstring)."""
+    suite = []
+    with open(path) as lines:
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            suite.append([tuple(int(x) for x in cell.split(",")) for cell in line.split()])
+    return suite
+
+
+def save_suite(suite, path=SUITE_FILE, comment=""):
+    """Write an opening suite file (see the module docstring)."""
+    with open(path, "w") as lines:
+        for text in comment.splitlines():
+            lines.write("# {}\n".format(text))
+        for opening in suite:
+            lines.write(" ".join("{},{}".format(*move) for move in opening) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=SUITE_FILE)
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--depth", type=int, default=BALANCE_DEPTH)
+    parser.add_argument("--max-imbalance", type=float, default=MAX_IMBALANCE)
+    args = parser.parse_args()
+
+    suite = generate_suite(args.width, args.height, args.depth, args.max_imbalance)
+    comment = ("Isolation opening suite: {}x{} board, symmetry-deduplicated two-ply\n"
+               "openings with |improved_score| <= {:g} at alpha-beta depth {}.\n"
+               "Regenerate with `python openings.py`.").format(
+        args.width, args.height, args.max_imbalance, args.depth)
+    save_suite(suite, args.output, comment)
+    print("{} openings written to {}".format(len(suite), args.output))
+
+
+if __name__ == "__main__":
+    main()
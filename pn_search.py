@@ -0,0 +1,172 @@
+"""This file contains a depth-first proof-number (df-pn) solver used by
+CustomPlayer to detect forced wins beyond the reach of its heuristic search.
+
+The solver works on the exact game tree: a node is proven when the attacker
+(the player to move at the root) can force a win from it, and disproven when
+the defender can. Proof and disproof numbers estimate how many more leaves
+must be solved to prove or disprove a node, and the search always expands the
+most-proving node. Results are kept in a memory-bounded table keyed by the
+board state, so work is reused across calls (and transpositions). Moves
+are cell numbers inside the solver (see `isolation.Board.to_cell`); only the
+winning move returned by solve() is a (row, col) tuple.
+"""
+
+PN_INFINITY = 10 ** 9  # proof/disproof number of a solved node
+
+
+class SearchAborted(Exception):
+    """Raised internally when the solver runs out of its time slice."""
+    pass
+
+
+class ProofNumberSearch:
+    """Depth-first proof-number search over `isolation.Board` positions.
+
+    Parameters
+    ----------
+    max_entries : int (optional)
+        Maximum number of positions kept in the table. When the table is
+        full, the half of the entries that cost the least work to compute
+        are discarded.
+
+    check_interval : int (optional)
+        Number of expanded nodes between two calls to the stop function.
+    """
+
+    def __init__(self, max_entries=200000, check_interval=64):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        # board key -> (proof number, disproof number, work)
+        self.table = {}
+        self.nodes = 0
+        self.attacker_parity = None
+
+    def solve(self, game, should_stop=lambda: False):
+        """Try to prove or disprove a forced win for the active player.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The root position. The board is searched in place with
+            apply_cell()/undo_cell() and restored before returning.
+
+        should_stop : callable (optional)
+            Function returning True when the solver must give up.
+
+        Returns
+        ----------
+        (bool, (int, int))
+            True and a winning move if the active player has a forced win,
+            False and None if the opponent has a forced win, or None and None
+            if the result could not be established before stopping.
+        """
+        parity = game.move_count % 2
+        if parity != self.attacker_parity:
+            # stored results are relative to the attacker
+            self.table = {}
+            self.attacker_parity = parity
+
+        self.should_stop = should_stop
+        self.nodes = 0
+        key = game.hash_key()
+        try:
+            self._mid(game, key, PN_INFINITY, PN_INFINITY)
+        except SearchAborted:
+            pass
+
+        pn, dn, _ = self.table.get(key, (1, 1, 0))
+        if pn == 0:
+            return True, game.to_move(self._winning_move(game, key))
+        if dn == 0:
+            return False, None
+        return None, None
+
+    def _winning_move(self, game, key):
+        """Return a move from a proven root to a proven child."""
+        for move in game.get_legal_cells():
+            child = self.table.get(self._child_key(game, key, move))
+            if child is not None and child[0] == 0:
+                return move
+        return None
+
+    def _child_key(self, game, key, move):
+        """Compute the key of the position after `move` from its parent key,
+        without applying the move (see `isolation.Board.hash_key`)."""
+        blocked, loc_1, loc_2 = key
+        blocked |= 1 << move
+        if game.move_count % 2 == 0:
+            return blocked, move, loc_2
+        return blocked, loc_1, move
+
+    def _store(self, key, pn, dn, work):
+        if len(self.table) >= self.max_entries:
+            # keep the half of the table that was most expensive to compute
+            entries = sorted(self.table.items(), key=lambda item: item[1][2])
+            self.table = dict(entries[len(entries) // 2:])
+        self.table[key] = (pn, dn, work)
+
+    def _mid(self, game, key, pn_threshold, dn_threshold):
+        """Expand the node at `key` until its proof number reaches
+        pn_threshold or its disproof number reaches dn_threshold, and return
+        the amount of work (expanded nodes) spent."""
+        self.nodes += 1
+        if self.nodes % self.check_interval == 0 and self.should_stop():
+            raise SearchAborted()
+
+        or_node = game.move_count % 2 == self.attacker_parity
+        legal_moves = game.get_legal_cells()
+        if not legal_moves:
+            # the side to move has lost
+            if or_node:
+                self._store(key, PN_INFINITY, 0, 1)
+            else:
+                self._store(key, 0, PN_INFINITY, 1)
+            return 1
+
+        children = [(move, self._child_key(game, key, move)) for move in legal_moves]
+        work = 1
+        while True:
+            best = None
+            best_number = second_number = PN_INFINITY
+            best_other = 0
+            min_number = PN_INFINITY
+            sum_number = 0
+            for move, child_key in children:
+                pn, dn, _ = self.table.get(child_key, (1, 1, 0))
+                # at OR nodes we minimize proof numbers, at AND nodes disproof
+                number, other = (pn, dn) if or_node else (dn, pn)
+                sum_number = min(PN_INFINITY, sum_number + other)
+                min_number = min(min_number, number)
+                if number < best_number:
+                    second_number = best_number
+                    best_number, best_other = number, other
+                    best = move, child_key
+                elif number < second_number:
+                    second_number = number
+
+            if or_node:
+                pn, dn = min_number, sum_number
+            else:
+                pn, dn = sum_number, min_number
+            if pn >= pn_threshold or dn >= dn_threshold or best is None:
+                break
+
+            # thresholds for the most-proving child
+            number_threshold = min(pn_threshold if or_node else dn_threshold,
+                                   second_number + 1)
+            other_threshold = (dn_threshold if or_node else pn_threshold) - sum_number + best_other
+            if or_node:
+                child_thresholds = number_threshold, other_threshold
+            else:
+                child_thresholds = other_threshold, number_threshold
+
+            move, child_key = best
+            last_move = game.get_player_cell(game.active_player)
+            game.apply_cell(move)
+            try:
+                work += self._mid(game, child_key, *child_thresholds)
+            finally:
+                game.undo_cell(move, last_move)
+
+        self._store(key, pn, dn, work)
+        return work
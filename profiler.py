@@ -0,0 +1,216 @@
+"""
+Sampling profiler for the get_move calls of tournament agents.
+
+A `SamplingProfiler` interrupts the process every SAMPLE_INTERVAL seconds of
+CPU time (SIGPROF) and records the stack of the agent whose get_move is
+running, together with the stacks of the threads it started (e.g., the
+worker of an anytime search). While such a thread runs, the agent's own
+thread is only waiting for it, so that stack is left out rather than counted
+as a second sample of the same CPU time. Time spent outside of a registered agent's
+get_move (the game loop, other processes) is not sampled. Each sample costs
+a stack walk, so the overhead stays at a few percent of the search time.
+
+Samples are appended as collapsed stacks, one line per distinct stack:
+
+    ID_Improved;game_agent.py:get_move;game_agent.py:alphabeta;... 42
+
+which is the input format of flame graph tools. Every process playing games
+writes its own file to the profile directory, and `merge_profiles()` later
+aggregates them into one file per agent and a top-N report of the functions
+with the most samples.
+
+Sampling relies on `signal.setitimer`, which is not available on Windows.
+"""
+
+import glob
+import os
+import signal
+import sys
+import threading
+
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.002  # seconds of CPU time between two samples
+TOP_N = 20  # number of functions listed per agent in the report
+SAMPLES_PATTERN = "samples-*.folded"  # per-process sample files of a profile directory
+
+
+def frame_label(frame):
+    """Return the "file:function" label of a frame in a collapsed stack."""
+    code = frame.f_code
+    return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler of the get_move calls of named players.
+
+    Parameters
+    ----------
+    interval : float (optional)
+        Seconds of CPU time between two samples.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        # id(player) -> name of the players to profile
+        self.names = {}
+        # (name, stack) -> number of samples
+        self.samples = Counter()
+        self._handler = None
+
+    def add_player(self, player, name):
+        """Profile the get_move calls of `player` under `name`."""
+        self.names[id(player)] = name
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start sampling (from the main thread)."""
+        self._handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """Stop sampling."""
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        if self._handler is not None:
+            signal.signal(signal.SIGPROF, self._handler)
+            self._handler = None
+
+    def _sample(self, signum, frame):
+        owner, stack = self._owner_stack(frame)
+        if owner is None:
+            return
+        name = self.names[id(owner)]
+
+        main = threading.main_thread().ident
+        workers = [self._thread_stack(thread_frame, owner)
+                   for ident, thread_frame in sys._current_frames().items()
+                   if ident != main]
+        workers = [thread_stack for thread_stack in workers if thread_stack]
+        # get_move waits for the threads of the agent while they search
+        for thread_stack in workers or [stack]:
+            self.samples[(name, ";".join(reversed(thread_stack)))] += 1
+
+    def _owner_stack(self, frame):
+        """Return the player running the outermost registered get_move call
+        on the stack of `frame` and the labels of the frames from that call
+        to `frame` (innermost first), or (None, None)."""
+        labels = []
+        owner = None
+        length = 0
+        while frame is not None:
+            labels.append(frame_label(frame))
+            if frame.f_code.co_name == "get_move" and \
+                    id(frame.f_locals.get("self")) in self.names:
+                owner = frame.f_locals["self"]
+                length = len(labels)
+            frame = frame.f_back
+        if owner is None:
+            return None, None
+        return owner, labels[:length]
+
+    @staticmethod
+    def _thread_stack(frame, owner):
+        """Return the labels of a thread's stack (innermost first) from the
+        outermost frame of a method of `owner`, or None if it has none."""
+        labels = []
+        length = 0
+        while frame is not None:
+            labels.append(frame_label(frame))
+            code = frame.f_code
+            if code.co_argcount and code.co_varnames[0] == "self" and \
+                    frame.f_locals.get("self") is owner:
+                length = len(labels)
+            frame = frame.f_back
+        return labels[:length] if length else None
+
+    def dump(self, directory):
+        """Append the samples to this process's file in `directory` and
+        clear them."""
+        if not self.samples:
+            return
+        path = os.path.join(directory, SAMPLES_PATTERN.replace("*", str(os.getpid())))
+        with open(path, "a") as output:
+            for (name, stack), count in self.samples.items():
+                output.write("{};{} {}\n".format(name, stack, count))
+        self.samples.clear()
+
+
+def read_collapsed(path):
+    """Return a Counter of the stacks (with the agent name as their root) of
+    a collapsed stack file."""
+    stacks = Counter()
+    with open(path) as lines:
+        for line in lines:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def top_functions(stacks, top_n=TOP_N):
+    """Return the total number of samples of a Counter of collapsed stacks
+    and the top_n (label, self samples, total samples) functions, by self
+    samples (the function was running) then total samples (the function was
+    on the stack)."""
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for label in set(frames):
+            total[label] += count
+    ranked = sorted(total, key=lambda label: (-own[label], -total[label], label))
+    return sum(stacks.values()), [(label, own[label], total[label])
+                                  for label in ranked[:top_n]]
+
+
+def merge_profiles(directory, top_n=TOP_N):
+    """
+    Aggregate the per-process sample files of a profile directory into one
+    collapsed stack file per agent ("<agent>.folded", which accumulates the
+    samples of every merge; the sample files are removed) and a top-N report
+    ("report.txt").
+
+    Returns
+    ----------
+    str
+        The text of the report.
+    """
+    agents = {}
+    paths = glob.glob(os.path.join(directory, SAMPLES_PATTERN))
+    for path in paths:
+        for stack, count in read_collapsed(path).items():
+            agents.setdefault(stack.split(";", 1)[0], Counter())[stack] += count
+
+    lines = []
+    for name, stacks in sorted(agents.items()):
+        path = os.path.join(directory, name + ".folded")
+        if os.path.exists(path):
+            # add the samples merged before
+            stacks.update(read_collapsed(path))
+        with open(path, "w") as output:
+            for stack, count in sorted(stacks.items()):
+                output.write("{} {}\n".format(stack, count))
+        samples, functions = top_functions(stacks, top_n)
+        lines.append("{}: {} samples".format(name, samples))
+        lines.append("  {:>7}{:>7}  {}".format("self%", "total%", "function"))
+        for label, own, total in functions:
+            lines.append("  {:>6.1f}%{:>6.1f}%  {}".format(
+                100. * own / samples, 100. * total / samples, label))
+        lines.append("")
+    for path in paths:
+        os.remove(path)
+
+    report = "\n".join(lines)
+    with open(os.path.join(directory, "report.txt"), "w") as output:
+        output.write(report)
+    return report
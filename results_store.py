@@ -0,0 +1,134 @@
+"""
+Append-only store of tournament game results, so that reruns of a tournament
+skip the games that were already played and interrupted runs resume where
+they stopped.
+
+Every game is keyed by the configuration hashes of the two agents (in move
+order), the opening, the match seed, the index of the game within the match
+and the time control. The store is a JSON lines file with one record per
+game; records are only ever appended, and a partially written last line
+(e.g., after a crash) is ignored when the file is loaded.
+
+The configuration hash covers the class of the agent and its public settings
+(e.g., search depth, method and score function), not its code: clear the
+store after changing the implementation of an agent.
+"""
+
+import hashlib
+import json
+import os
+
+# attributes that change while an agent plays and do not configure it
+RUNTIME_ATTRIBUTES = {"time_left", "nodes", "depth", "state", "solver"}
+
+
+def _config_value(value):
+    """Return a JSON-serializable description of a configuration value, or
+    None if the value is not part of the configuration."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if callable(value) and hasattr(value, "__qualname__"):
+        return "{}.{}".format(value.__module__, value.__qualname__)
+    if isinstance(value, (list, tuple)):
+        return [_config_value(item) for item in value]
+    return None
+
+
+def agent_config(player):
+    """Return a dictionary describing the configuration of an agent."""
+    cls = type(player)
+    config = {"class": "{}.{}".format(cls.__module__, cls.__qualname__)}
+    for name, value in sorted(vars(player).items()):
+        if name.startswith("_") or name in RUNTIME_ATTRIBUTES:
+            continue
+        config[name] = _config_value(value)
+    return config
+
+
+def agent_hash(player):
+    """Return a short stable hash of the configuration of an agent."""
+    text = json.dumps(agent_config(player), sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def time_control(clock, time_limit):
+    """Return a JSON-serializable description of the conditions a game is
+    played under (see `isolation.clocks`)."""
+    clock_config = {}
+    if clock is not None:
+        clock_config = {name: _config_value(value) for name, value in vars(clock).items()}
+        clock_config["name"] = clock.name
+    return {"time_limit": time_limit, "clock": clock_config}
+
+
+def game_key(first, second, opening, seed, game_index, conditions):
+    """
+    Return the key identifying one game in the store.
+
+    Parameters
+    ----------
+    first, second : object
+        The agents moving first and second in the game.
+
+    opening : list<(int, int)>
+        The opening moves applied before the agents take over.
+
+    seed : int
+        The seed of the match.
+
+    game_index : int
+        The index of the game within the match.
+
+    conditions : dict
+        The time control (see `time_control()`).
+    """
+    return json.dumps([agent_hash(first), agent_hash(second),
+                       [list(move) for move in opening], seed, game_index,
+                       conditions], sort_keys=True)
+
+
+class ResultsStore:
+    """
+    Append-only JSON lines file of game results.
+
+    Parameters
+    ----------
+    path : str
+        Location of the store; created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path) as records:
+                for line in records:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # interrupted while writing this line
+                        continue
+                    self.results[record["key"]] = record["result"]
+        self.file = open(path, "a")
+        if self.file.tell() > 0:
+            # terminate a partially written last line
+            with open(path, "rb") as records:
+                records.seek(-1, os.SEEK_END)
+                if records.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        """Return the recorded result of a game, or None."""
+        return self.results.get(key)
+
+    def record(self, key, result):
+        """Append the result of a game and flush it to disk."""
+        self.results[key] = result
+        self.file.write(json.dumps({"key": key, "result": result}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,328 @@
+"""
+Asyncio server hosting many concurrent games of Isolation.
+
+Every game is a `GameSession` (see isolation/isolation.py) stepped by its own
+asyncio task, so thousands of games cost a few coroutines rather than a
+thread each. The CPU-bound `get_move()` calls are offloaded to a pool of
+worker processes; at most one move per worker is in flight, so a move starts
+as soon as it is submitted and the time it waits for a result is the time the
+agent used.
+
+The scheduler enforces the clocks: every move has a deadline of the time
+limit (plus MOVE_SLACK ms for the round trip to the worker) on the monotonic
+clock of the event loop, and a move that misses it is forfeited on time
+without waiting for the worker. The agent is timed in the worker as well, so
+a well-behaved agent returns before the deadline; a worker still busy with a
+forfeited move is only handed a new move once it is done.
+
+Players are pickled to the workers for every move, so they must be
+picklable, and state they keep between moves (e.g., a persistent
+transposition table) does not survive. The search telemetry of
+`search_info()` is sent back with the move for the game log.
+
+Games per second, moves and timeouts, and the latency of moves (p50, p95
+and max, in milliseconds) are reported by `GameServer.metrics()` and can be
+served as JSON over HTTP with `GameServer.serve_metrics()`.
+
+Example load test of 1000 random games with 4 worker processes:
+
+    python server.py --games 1000 --processes 4 --metrics-port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board, GameSession
+from isolation.clocks import WallClock
+from isolation.gamelog import GameLog
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer, improved_score
+
+TIME_LIMIT = 150  # number of milliseconds of each turn
+MOVE_SLACK = 50.  # milliseconds allowed beyond the time limit for the worker round trip
+NUM_PROCESSES = 1  # number of worker processes playing moves
+MAX_GAMES = 1000  # number of games played at once
+LATENCY_WINDOW = 10000  # number of recent moves kept for the latency percentiles
+METRICS_INTERVAL = 1.  # seconds between two metrics reports of the load test
+
+
+def _get_move(player, game, legal_moves, time_limit):
+    """Worker process body: return the move of `player`, the time left on its
+    turn timer when it returned and its search_info() (None if it has
+    none)."""
+    if time_limit is None:
+        time_left = lambda: float("inf")
+    else:
+        time_left = WallClock().timer(time_limit)
+    move = player.get_move(game, legal_moves, time_left)
+    move_end = time_left()
+    search_info = getattr(player, "search_info", None)
+    return move, move_end, search_info() if search_info is not None else None
+
+
+def percentile(values, fraction):
+    """Return the value at `fraction` (0 to 1) of the sorted values."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class ServerMetrics(object):
+    """Counters of the games and moves played by a `GameServer`."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.start = time.monotonic()
+        self.games_started = 0
+        self.games_finished = 0
+        self.moves = 0
+        self.timeouts = 0
+        # milliseconds from submitting each recent move to its result
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        """Return the metrics as a dictionary."""
+        elapsed = time.monotonic() - self.start
+        latencies = list(self.latencies)
+        return {"games_started": self.games_started,
+                "games_finished": self.games_finished,
+                "games_active": self.games_started - self.games_finished,
+                "games_per_s": self.games_finished / elapsed if elapsed > 0 else 0.,
+                "moves": self.moves,
+                "timeouts": self.timeouts,
+                "latency_p50": percentile(latencies, .5),
+                "latency_p95": percentile(latencies, .95),
+                "latency_max": max(latencies) if latencies else None,
+                "uptime": elapsed}
+
+
+class GameServer(object):
+    """
+    Play concurrent games on an asyncio event loop, with the moves computed
+    in a pool of worker processes.
+
+    Parameters
+    ----------
+    processes : int (optional)
+        The number of worker processes, which is also the number of moves in
+        flight.
+
+    time_limit : numeric (optional)
+        The number of milliseconds of each turn; None for no limit.
+
+    slack : float (optional)
+        Milliseconds allowed beyond the time limit before a move is forfeited.
+
+    max_games : int (optional)
+        The number of games played at once; more games wait for a slot.
+
+    log : `isolation.gamelog.GameLog` (optional)
+        A log receiving every move and result.
+
+    executor : `concurrent.futures.Executor` (optional)
+        The pool running the moves, with `processes` workers; a process pool
+        of `processes` workers is created (and shut down by close()) by
+        default.
+    """
+
+    def __init__(self, processes=NUM_PROCESSES, time_limit=TIME_LIMIT, slack=MOVE_SLACK,
+                 max_games=MAX_GAMES, log=None, executor=None):
+        self.time_limit = time_limit
+        self.slack = slack
+        self.log = log
+        self.owns_executor = executor is None
+        self.executor = executor if executor is not None else ProcessPoolExecutor(processes)
+        self.processes = processes
+        self.max_games = max_games
+        self.stats = ServerMetrics()
+        # created on first use, on the running event loop
+        self._workers = None
+        self._games = None
+        self._count = 0
+
+    def metrics(self):
+        """Return the current metrics (see `ServerMetrics.snapshot()`)."""
+        return self.stats.snapshot()
+
+    def close(self):
+        """Shut down the worker processes of the server's own pool."""
+        if self.owns_executor:
+            self.executor.shutdown(wait=True)
+
+    async def play(self, board, game_id=None):
+        """
+        Play a game to the end.
+
+        Parameters
+        ----------
+        board : `isolation.Board`
+            The game to play, with any opening moves already applied.
+
+        game_id : str (optional)
+            The id of the game in the log; numbered in order by default.
+
+        Returns
+        ----------
+        (player, list<[(int, int),]>, str)
+            The winner, the move history and the reason the game ended (see
+            `Board.play`).
+        """
+        if self._games is None:
+            self._workers = asyncio.Semaphore(self.processes)
+            self._games = asyncio.Semaphore(self.max_games)
+        if game_id is None:
+            game_id = str(self._count)
+        self._count += 1
+
+        async with self._games:
+            self.stats.games_started += 1
+            session = GameSession(board, self.time_limit, log=self.log, game_id=game_id)
+            while not session.done:
+                await self._turn(session)
+            self.stats.games_finished += 1
+        return session.result()
+
+    async def play_many(self, boards):
+        """Play games concurrently and return their results in order."""
+        return await asyncio.gather(*(self.play(board) for board in boards))
+
+    async def _turn(self, session):
+        """Play one turn of a session in a worker, enforcing its deadline."""
+        loop = asyncio.get_running_loop()
+        player, game, legal_moves = session.begin_turn()
+
+        await self._workers.acquire()
+        start = loop.time()
+        future = loop.run_in_executor(self.executor, _get_move, player, game,
+                                      legal_moves, self.time_limit)
+        # the worker is free again once the move returns, even if it is late
+        future.add_done_callback(lambda _: self._workers.release())
+
+        if self.time_limit is None:
+            move, time_left, search_info = await future
+        else:
+            try:
+                # the move is judged by the agent's timer in the worker, and
+                # forfeited if it misses the deadline of the scheduler
+                move, time_left, search_info = await asyncio.wait_for(
+                    asyncio.shield(future), (self.time_limit + self.slack) / 1000.)
+            except asyncio.TimeoutError:
+                future.add_done_callback(_discard)
+                move, search_info = None, None
+                time_left = self.time_limit - 1000 * (loop.time() - start)
+        elapsed = 1000 * (loop.time() - start)
+
+        self.stats.moves += 1
+        self.stats.latencies.append(elapsed)
+        if time_left < 0:
+            self.stats.timeouts += 1
+        session.end_turn(move, time_left, elapsed if self.time_limit is None else None,
+                         search_info)
+
+    async def serve_metrics(self, host="127.0.0.1", port=0):
+        """Start serving the metrics as JSON over HTTP and return the
+        `asyncio.Server` (port 0 picks a free port)."""
+        async def handle(reader, writer):
+            await reader.readline()
+            body = json.dumps(self.metrics()).encode("utf-8")
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(body)).encode("ascii") +
+                         b"\r\n\r\n" + body)
+            await writer.drain()
+            writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+def _discard(future):
+    """Consume the result or error of a forfeited move."""
+    if not future.cancelled():
+        future.exception()
+
+
+def random_opening(board, rng):
+    """Apply a random first move for each player, as `tournament.py` does."""
+    for _ in range(2):
+        board.apply_move(rng.choice(board.get_legal_moves()))
+    return board
+
+
+def format_metrics(metrics):
+    """Format a metrics snapshot as one line of the load test report."""
+    def ms(value):
+        return "-" if value is None else "{:.1f}".format(value)
+    return ("{games_finished:>7} games {games_active:>6} active {games_per_s:>8.1f} games/s "
+            "{moves:>9} moves {timeouts:>5} timeouts ".format(**metrics) +
+            "latency p50 {} p95 {} max {} ms".format(ms(metrics["latency_p50"]),
+                                                     ms(metrics["latency_p95"]),
+                                                     ms(metrics["latency_max"])))
+
+
+async def load_test(server, players, num_games, seed=None, metrics_port=None):
+    """Play num_games games between the two players, printing the metrics
+    every METRICS_INTERVAL seconds."""
+    rng = random.Random(seed)
+    metrics_server = None
+    if metrics_port is not None:
+        metrics_server = await server.serve_metrics(port=metrics_port)
+        print("Serving metrics on port {}".format(
+            metrics_server.sockets[0].getsockname()[1]))
+
+    games = asyncio.ensure_future(server.play_many(
+        random_opening(Board(*players), rng) for _ in range(num_games)))
+    while not games.done():
+        await asyncio.wait([games], timeout=METRICS_INTERVAL)
+        print(format_metrics(server.metrics()))
+
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+    return games.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the asyncio game server")
+    parser.add_argument("--games", type=int, default=100, help="number of games played")
+    parser.add_argument("--max-games", type=int, default=MAX_GAMES,
+                        help="number of games played at once")
+    parser.add_argument("--processes", type=int, default=NUM_PROCESSES,
+                        help="number of worker processes playing moves")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT,
+                        help="milliseconds of each turn")
+    parser.add_argument("--players", choices=["random", "search"], default="random",
+                        help="random players, or iterative deepening agents that use the "
+                             "whole time limit")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the openings")
+    parser.add_argument("--log", default=None, help="append every move to this game log")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the metrics as JSON over HTTP on this port")
+    args = parser.parse_args()
+
+    if args.players == "random":
+        players = RandomPlayer(), RandomPlayer()
+    else:
+        players = (CustomPlayer(score_fn=improved_score, method="alphabeta"),
+                   CustomPlayer(score_fn=improved_score, method="alphabeta"))
+
+    log = GameLog(args.log) if args.log else None
+    server = GameServer(args.processes, args.time_limit, max_games=args.max_games, log=log)
+    try:
+        asyncio.run(load_test(server, players, args.games, args.seed, args.metrics_port))
+    finally:
+        server.close()
+        if log is not None:
+            log.close()
+
+    print("\nResults:")
+    print("----------")
+    print(json.dumps(server.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
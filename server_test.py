@@ -0,0 +1,112 @@
+"""
+This file contains test cases for the asyncio game server in server.py.
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import isolation
+import server
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation.gamelog import GameLog, read_log
+from sample_players import RandomPlayer
+from tournament_test import timeout
+
+
+class SlowPlayer(RandomPlayer):
+    """A random player that sleeps past the time limit on its second move."""
+
+    def get_move(self, game, legal_moves, time_left):
+        if game.move_count >= 2:
+            time.sleep(0.5)
+        return RandomPlayer.get_move(self, game, legal_moves, time_left)
+
+
+class GameServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ProcessPoolExecutor(1)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.directory)
+
+    @timeout(60)
+    def test_concurrent_games(self):
+        """ Test that concurrent games all finish and are counted """
+        path = os.path.join(self.directory, "games.jsonl")
+        with GameLog(path) as log:
+            game_server = server.GameServer(time_limit=None, max_games=8, log=log,
+                                            executor=self.executor)
+            players = RandomPlayer(), RandomPlayer()
+            boards = [isolation.Board(*players) for _ in range(20)]
+            results = asyncio.run(game_server.play_many(boards))
+
+        self.assertEqual(len(results), 20)
+        for board, (winner, move_history, termination) in zip(boards, results):
+            # a player without legal moves loses by returning (-1, -1)
+            self.assertEqual(termination, "illegal move")
+            self.assertIn(winner, players)
+            # the moves were applied to the boards of the server
+            self.assertTrue(board.is_winner(winner))
+
+        metrics = game_server.metrics()
+        self.assertEqual(metrics["games_finished"], 20)
+        self.assertEqual(metrics["games_active"], 0)
+        self.assertEqual(metrics["timeouts"], 0)
+        # every game ends with a move that is not applied
+        self.assertEqual(metrics["moves"], sum(board.move_count + 1 for board in boards))
+        self.assertLessEqual(metrics["latency_p50"], metrics["latency_max"])
+        records = read_log(path)
+        self.assertEqual(len(records), metrics["moves"] + 20)
+        self.assertEqual(len({record["game"] for record in records}), 20)
+
+    @timeout(60)
+    def test_deadline(self):
+        """ Test that the scheduler forfeits a move that misses its deadline """
+        game_server = server.GameServer(time_limit=50, slack=20, executor=self.executor)
+        slow, fast = SlowPlayer(), RandomPlayer()
+
+        async def play():
+            start = time.monotonic()
+            result = await game_server.play(isolation.Board(slow, fast))
+            return result, time.monotonic() - start
+
+        (winner, move_history, termination), elapsed = asyncio.run(play())
+        self.assertEqual((winner, termination), (fast, "timeout"))
+        self.assertEqual(len(move_history), 2)
+        # the game ended at the deadline, without waiting for the worker
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(game_server.metrics()["timeouts"], 1)
+
+    @timeout(60)
+    def test_metrics_endpoint(self):
+        """ Test that the metrics are served as JSON over HTTP """
+        game_server = server.GameServer(time_limit=None, executor=self.executor)
+
+        async def fetch():
+            await game_server.play(isolation.Board(RandomPlayer(), RandomPlayer()))
+            metrics_server = await game_server.serve_metrics()
+            port = metrics_server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            metrics_server.close()
+            await metrics_server.wait_closed()
+            return response
+
+        header, _, body = asyncio.run(fetch()).partition(b"\r\n\r\n")
+        self.assertTrue(header.startswith(b"HTTP/1.0 200"))
+        self.assertEqual(json.loads(body.decode("utf-8"))["games_finished"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Elo estimates and a sequential probability ratio test (SPRT) for deciding
+whether one agent is stronger than another from a stream of game results.
+
+Isolation has no draws, so every game is a Bernoulli trial whose success
+probability is the expected score of agent A against agent B. The SPRT
+compares the hypotheses H0: elo(A) - elo(B) = elo0 and H1: elo(A) - elo(B) =
+elo1, and stops as soon as the log-likelihood ratio leaves the interval given
+by the error rates alpha (accepting H1 when H0 holds) and beta (accepting H0
+when H1 holds).
+"""
+
+import math
+
+Z_95 = 1.96  # normal quantile of the 95% confidence interval
+
+
+def expected_score(elo):
+    """Return the expected score of a player rated `elo` points above its
+    opponent."""
+    return 1. / (1. + 10 ** (-elo / 400.))
+
+
+def elo_from_score(score):
+    """Return the Elo difference corresponding to an expected score in the
+    open interval (0, 1)."""
+    return -400. * math.log10(1. / score - 1.) + 0.
+
+
+def elo_estimate(wins, losses, z=Z_95):
+    """
+    Estimate the Elo difference between two players from their results.
+
+    Parameters
+    ----------
+    wins, losses : int
+        Number of games won and lost by the first player.
+
+    z : float (optional)
+        Normal quantile of the confidence interval.
+
+    Returns
+    ----------
+    (float, float, float)
+        The Elo estimate and the lower and upper bounds of its confidence
+        interval. Scores of 0 or 1 are clamped half a game away from the edge
+        so that the bounds stay finite.
+    """
+    games = wins + losses
+    if games == 0:
+        return 0., -float("inf"), float("inf")
+    score = min(max(wins, .5), games - .5) / games
+    margin = z * math.sqrt(score * (1. - score) / games)
+    low = max(score - margin, .5 / games)
+    high = min(score + margin, 1. - .5 / games)
+    return elo_from_score(score), elo_from_score(low), elo_from_score(high)
+
+
+def format_elo(wins, losses):
+    """Format the Elo estimate with its error bars, e.g. '+35 (-12/+81)'."""
+    elo, low, high = elo_estimate(wins, losses)
+    return "{:+.0f} ({:+.0f}/{:+.0f})".format(elo, low - elo, high - elo)
+
+
+class SPRT:
+    """
+    Sequential probability ratio test on a stream of game results.
+
+    Parameters
+    ----------
+    elo0 : float (optional)
+        Elo difference of the null hypothesis (A is not stronger).
+
+    elo1 : float (optional)
+        Elo difference of the alternative hypothesis (A is stronger by at
+        least this much).
+
+    alpha, beta : float (optional)
+        Probabilities of accepting H1 when H0 is true, and H0 when H1 is true.
+    """
+
+    def __init__(self, elo0=0., elo1=50., alpha=.05, beta=.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1. - alpha))
+        self.upper = math.log((1. - beta) / alpha)
+        p0 = expected_score(elo0)
+        p1 = expected_score(elo1)
+        self.win_llr = math.log(p1 / p0)
+        self.loss_llr = math.log((1. - p1) / (1. - p0))
+        self.wins = 0
+        self.losses = 0
+        self.llr = 0.
+
+    def update(self, win):
+        """Add the result of one game (True if agent A won)."""
+        if win:
+            self.wins += 1
+            self.llr += self.win_llr
+        else:
+            self.losses += 1
+            self.llr += self.loss_llr
+
+    @property
+    def games(self):
+        return self.wins + self.losses
+
+    @property
+    def status(self):
+        """'H1' if A is stronger by elo1, 'H0' if it is not stronger than
+        elo0, or None while the test is undecided."""
+        if self.llr >= self.upper:
+            return "H1"
+        if self.llr <= self.lower:
+            return "H0"
+        return None
+
+    def summary(self):
+        """Return a one-line report of the current state of the test."""
+        return "{} games, {} to {}, Elo {}, LLR {:.2f} [{:.2f}, {:.2f}]".format(
+            self.games, self.wins, self.losses, format_elo(self.wins, self.losses),
+            self.llr, self.lower, self.upper)
@@ -17,24 +17,47 @@ For example, if the random moves chosen for initialization are (5, 2) and
 agentB at (1, 3) as player 2 then play to conclusion; the agents swap
 initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
+
+With `--openings FILE`, the openings come from a fixed suite (see
+openings.py) shared by every pairing instead of being drawn at random.
 """
 
+import argparse
 import itertools
+import os
 import random
 import warnings
 
 from collections import namedtuple
+from multiprocessing import Pool
 
 from isolation import Board
+from isolation.clocks import CLOCKS
+from isolation.gamelog import GameLog
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
 from game_agent import custom_score
+from sprt import SPRT
+from sprt import format_elo
+from distributed import AUTHKEY
+from distributed import Coordinator
+from distributed import parse_address
+from distributed import run_workers
+from openings import load_suite
+from profiler import SamplingProfiler
+from profiler import merge_profiles
+from results_store import ResultsStore
+from results_store import game_key
+from results_store import time_control
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+NUM_PROCESSES = 1  # number of worker processes used to play matches
+SPRT_MAX_GAMES = 2000  # maximum number of games played in SPRT mode
+SPRT_REPORT_INTERVAL = 20  # number of games between SPRT progress reports
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
@@ -57,92 +80,372 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def match_opening(seed=None):
     """
-    Play a "fair" set of matches between two agents by playing two games
-    between the players, forcing each agent to play from randomly selected
-    positions. This should control for differences in outcome resulting from
-    advantage due to starting position on the board.
+    Return the opening of a match: a random move and response chosen by a
+    random number generator seeded with `seed`.
     """
-    num_wins = {player1: 0, player2: 0}
-    num_timeouts = {player1: 0, player2: 0}
-    num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
-
-    # initialize both games with a random move and response
+    rng = random.Random(seed)
+    board = Board("player1", "player2")
     for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
-        games[0].apply_move(move)
-        games[1].apply_move(move)
-
-    # play both games and tally the results
-    for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
-
-        if player1 == winner:
-            num_wins[player1] += 1
+        board.apply_move(rng.choice(board.get_legal_moves()))
+    return [board.get_player_location("player1"), board.get_player_location("player2")]
 
-            if termination == "timeout":
-                num_timeouts[player2] += 1
-            else:
-                num_invalid_moves[player2] += 1
 
-        elif player2 == winner:
-
-            num_wins[player2] += 1
-
-            if termination == "timeout":
-                num_timeouts[player1] += 1
-            else:
-                num_invalid_moves[player1] += 1
-
-    if sum(num_timeouts.values()) != 0:
+def play_games(player1, player2, seed=None, clock=None, time_limit=TIME_LIMIT,
+               opening=None, known=(None, None), log=None, profile=None, names=None):
+    """
+    Play the two games of a "fair" match from the given opening (by default a
+    random opening drawn from the match seed): player1 moves first in the
+    first game and player2 in the second.
+
+    Returns
+    ----------
+    list<[int, str]>
+        A [winner, termination] pair for each game, where winner is 0 if the
+        player moving first in that game won and 1 otherwise. Games with a
+        result in `known` are not played again. The moves of the games that
+        are played are appended to the game log at path `log` (see
+        `isolation.gamelog`), with game ids "<first>-<second>-<seed>-<game
+        index>" built from the `names` of the players in move order, so the
+        games of different pairings never share an id, and every move
+        record names its mover. When a profile directory is given, the
+        get_move calls of the players are sampled under their `names` and
+        appended to it (see profiler.py).
+    """
+    if opening is None:
+        opening = match_opening(seed)
+    results = []
+    game_log = GameLog(log) if log is not None else None
+    if names is None:
+        names = ("player1", "player2")
+    profiler = None
+    if profile is not None:
+        profiler = SamplingProfiler()
+        for player, name in zip((player1, player2), names):
+            profiler.add_player(player, name)
+
+    for index, (first, second) in enumerate([(player1, player2), (player2, player1)]):
+        if known[index] is not None:
+            results.append(known[index])
+            continue
+
+        if seed is not None:
+            # every game gets its own stream so it can be replayed alone
+            random.seed(2 * seed + index)
+        game = Board(first, second)
+        for move in opening:
+            game.apply_move(move)
+        if profiler is not None:
+            profiler.start()
+        game_names = names if index == 0 else names[::-1]
+        try:
+            winner, _, termination = game.play(
+                time_limit=time_limit, clock=clock, log=game_log,
+                game_id="{}-{}-{}-{}".format(game_names[0], game_names[1], seed, index),
+                names=game_names)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        results.append([0 if winner == first else 1, termination])
+
+    if game_log is not None:
+        game_log.close()
+    if profiler is not None:
+        profiler.dump(profile)
+    return results
+
+
+def tally(results):
+    """Return the number of wins of player1 and player2 from the game
+    results of a match (see `play_games()`), warning about timeouts."""
+    wins = [0, 0]
+    for index, (winner, termination) in enumerate(results):
+        # player1 moves first in the first game and second in the other
+        wins[winner ^ index] += 1
+
+    if any(termination == "timeout" for _, termination in results):
         warnings.warn(TIMEOUT_WARNING)
 
-    return num_wins[player1], num_wins[player2]
+    return wins[0], wins[1]
+
 
+def play_match(player1, player2, seed=None, clock=None, time_limit=TIME_LIMIT):
+    """
+    Play a "fair" set of matches between two agents by playing two games
+    between the players, forcing each agent to play from randomly selected
+    positions. This should control for differences in outcome resulting from
+    advantage due to starting position on the board.
 
-def play_round(agents, num_matches):
+    If a seed is given, the opening and the random number generator of each
+    game are derived from it, so the match (including any randomized agent)
+    is reproducible. The clock (see `isolation.clocks`) measures each turn;
+    when many matches share a host, a CPU or node clock keeps them from
+    losing on time; a time_limit of None disables the turn time limit.
+    """
+    return tally(play_games(player1, player2, seed, clock, time_limit))
+
+
+def _match_keys(player1, player2, seed, clock, time_limit, opening=None):
+    """Return the results store keys of the two games of a match."""
+    if opening is None:
+        opening = match_opening(seed)
+    conditions = time_control(clock, time_limit)
+    return [game_key(player1, player2, opening, seed, 0, conditions),
+            game_key(player2, player1, opening, seed, 1, conditions)]
+
+
+def _match_job(player1, player2, seed, clock, time_limit, opening=None, store=None,
+               log=None, profile=None, names=None):
+    """Build the (player1, player2, seed, clock, time_limit, opening, known,
+    log, profile, names) job of a match, where known holds the results of
+    its games found in the store."""
+    known = (None, None)
+    if store is not None:
+        known = tuple(store.get(key) for key in
+                      _match_keys(player1, player2, seed, clock, time_limit, opening))
+    return player1, player2, seed, clock, time_limit, opening, known, log, profile, names
+
+
+def _record_match(store, job, results):
+    """Append the results of the newly played games of a match job to the
+    store."""
+    if store is None:
+        return
+    for key, known, result in zip(_match_keys(*job[:6]), job[6], results):
+        if known is None:
+            store.record(key, result)
+
+
+def _play_match_job(job):
+    """Play the games of a match job that are not known yet; used as the
+    task function of the worker pool."""
+    return play_games(*job)
+
+
+def _run_jobs(jobs, processes, coordinator=None):
+    """Start playing a sequence of match jobs and return the worker pool
+    (None when playing serially) and an iterator over the results of the
+    jobs in order. Jobs are handed out to remote workers when a coordinator
+    (see `distributed.Coordinator`) is given."""
+    if coordinator is not None:
+        return coordinator, coordinator.imap(_play_match_job, jobs)
+    if processes > 1:
+        pool = Pool(processes)
+        return pool, pool.imap(_play_match_job, jobs)
+    return None, map(_play_match_job, jobs)
+
+
+def play_round(agents, num_matches, processes=NUM_PROCESSES, seed=None, clock=None,
+               time_limit=TIME_LIMIT, store=None, openings=None, log=None,
+               coordinator=None, profile=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    Matches are played in a pool of `processes` worker processes when
+    processes > 1. Every match gets its own seed drawn from `seed`, and the
+    results are aggregated in schedule order, so the serial and parallel
+    paths report identical totals for the same seed. Games found in the
+    results store (see `results_store.ResultsStore`) are not played again,
+    and the results of new games are appended to it. Given an opening suite
+    (see `openings.load_suite()`), every pairing plays the same openings in
+    the same order instead of random ones. Every move is appended to the
+    game log at path `log` when one is given. With a coordinator, matches
+    are played by the workers connected to it instead of local processes.
+    Given a profile directory, the get_move calls of every agent are
+    sampled into it (see profiler.py).
+
+    Returns
+    ----------
+    (int, int)
+        The number of games won by the last agent and the number of games
+        played.
     """
     agent_1 = agents[-1]
-    wins = 0.
-    total = 0.
+    wins = 0
+    total = 0
+
+    seeds = random.Random(seed)
+    jobs = []
+    for agent_2 in agents[:-1]:
+        pairing = itertools.permutations((agent_1, agent_2))
+        for match, (a1, a2) in enumerate(itertools.chain.from_iterable(
+                itertools.repeat(players, num_matches) for players in pairing)):
+            opening = openings[match % len(openings)] if openings else None
+            jobs.append(_match_job(a1.player, a2.player, seeds.getrandbits(32), clock,
+                                   time_limit, opening, store, log, profile,
+                                   (a1.name, a2.name)))
+
+    pool, results = _run_jobs(jobs, processes, coordinator)
+    schedule = zip(jobs, results)
 
     print("\nPlaying Matches:")
     print("----------")
 
-    for idx, agent_2 in enumerate(agents[:-1]):
+    try:
+        for idx, agent_2 in enumerate(agents[:-1]):
 
-        counts = {agent_1.player: 0., agent_2.player: 0.}
-        names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
+            counts = {agent_1.player: 0, agent_2.player: 0}
+            names = [agent_1.name, agent_2.name]
+            print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
 
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
+            # Each player takes a turn going first
+            for _ in range(2 * num_matches):
+                job, match_results = next(schedule)
+                _record_match(store, job, match_results)
+                p1, p2 = job[:2]
+                score_1, score_2 = tally(match_results)
                 counts[p1] += score_1
                 counts[p2] += score_2
                 total += score_1 + score_2
 
-        wins += counts[agent_1.player]
+            wins += counts[agent_1.player]
 
-        print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+            print("\tResult: {} to {}".format(counts[agent_1.player],
+                                              counts[agent_2.player]))
+    finally:
+        if pool is not None:
+            pool.terminate()
 
-    return 100. * wins / total
+    return wins, total
+
+
+def play_sprt(agent_a, agent_b, test, max_games=SPRT_MAX_GAMES,
+              processes=NUM_PROCESSES, seed=None, clock=None, time_limit=TIME_LIMIT,
+              store=None, openings=None, log=None, coordinator=None, profile=None):
+    """
+    Play fair matches between two agents, streaming every game result into
+    the sequential probability ratio test `test` (see `sprt.SPRT`) until it
+    accepts a hypothesis or max_games have been played. Matches cycle
+    through the opening suite when one is given.
+
+    Returns
+    ----------
+    str
+        'H1' if agent_a is stronger than agent_b by test.elo1 Elo, 'H0' if it
+        is not stronger than test.elo0, or None if the test is undecided.
+    """
+    seeds = random.Random(seed)
+    jobs = [_match_job(agent_a.player, agent_b.player, seeds.getrandbits(32), clock,
+                       time_limit, openings[match % len(openings)] if openings else None,
+                       store, log, profile, (agent_a.name, agent_b.name))
+            for match in range(max_games // 2)]
+    pool, results = _run_jobs(jobs, processes, coordinator)
+
+    print("\nSPRT: {} vs {}, H0: elo <= {:+g}, H1: elo >= {:+g}".format(
+        agent_a.name, agent_b.name, test.elo0, test.elo1))
+    print("----------")
+
+    try:
+        for job, match_results in zip(jobs, results):
+            _record_match(store, job, match_results)
+            score_a, score_b = tally(match_results)
+            for _ in range(score_a):
+                test.update(True)
+            for _ in range(score_b):
+                test.update(False)
+            if test.status or test.games % SPRT_REPORT_INTERVAL == 0:
+                print("  " + test.summary())
+            if test.status:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    return test.status
 
 
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--processes", type=int, default=NUM_PROCESSES,
+                        help="number of worker processes playing matches in parallel")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for the per-match random seeds")
+    parser.add_argument("--clock", choices=sorted(CLOCKS), default="wall",
+                        help="clock measuring each turn; use 'cpu' or 'nodes' when "
+                             "running several processes on one host")
+    parser.add_argument("--node-budget", type=int, default=20000,
+                        help="time_left() calls allowed per turn with --clock nodes")
+    parser.add_argument("--search-nodes", type=int, default=None,
+                        help="search a fixed number of nodes per move with the ID "
+                             "agents and disable the time limit (reproducible games)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="play Student against ID_Improved until a sequential "
+                             "probability ratio test decides which is stronger")
+    parser.add_argument("--elo0", type=float, default=0.,
+                        help="SPRT null hypothesis: Student is at most elo0 stronger")
+    parser.add_argument("--elo1", type=float, default=50.,
+                        help="SPRT alternative: Student is at least elo1 stronger")
+    parser.add_argument("--alpha", type=float, default=.05,
+                        help="SPRT probability of a false positive")
+    parser.add_argument("--beta", type=float, default=.05,
+                        help="SPRT probability of a false negative")
+    parser.add_argument("--max-games", type=int, default=SPRT_MAX_GAMES,
+                        help="maximum number of games played in SPRT mode")
+    parser.add_argument("--store", default=None,
+                        help="JSON lines file caching game results; games already "
+                             "in it are skipped, so an interrupted run resumes")
+    parser.add_argument("--openings", default=None, metavar="FILE",
+                        help="play the openings of a suite file (e.g. openings.txt) "
+                             "instead of random ones")
+    parser.add_argument("--log", default=None, metavar="FILE",
+                        help="append a JSON line per move (time used, time left, "
+                             "search depth and nodes) to FILE")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="sample the get_move calls of every agent and write "
+                             "collapsed stacks and a top-N report to DIR")
+    parser.add_argument("--coordinator", default=None, metavar="ADDRESS",
+                        help="hand out matches to workers connecting to ADDRESS "
+                             "(host:port, or a Unix socket path)")
+    parser.add_argument("--worker", default=None, metavar="ADDRESS",
+                        help="play matches for the coordinator at ADDRESS with "
+                             "--processes worker processes")
+    parser.add_argument("--authkey", default=AUTHKEY.decode(),
+                        help="key shared by the coordinator and its workers")
+    args = parser.parse_args()
+
+    authkey = args.authkey.encode()
+    if args.worker is not None:
+        run_workers(parse_address(args.worker), args.processes, authkey)
+        return
+
+    coordinator = None
+    if args.coordinator is not None:
+        coordinator = Coordinator(parse_address(args.coordinator), authkey)
+
+    profile = None
+    if args.profile is not None:
+        # workers on other hosts need the same path on a shared file system
+        profile = os.path.abspath(args.profile)
+        os.makedirs(profile, exist_ok=True)
+
+    suite = None
+    if args.openings is not None:
+        suite = load_suite(args.openings)
+
+    store = None
+    if args.store is not None:
+        store = ResultsStore(args.store)
+        if args.seed is None:
+            # games are only found again when their seeds are reproducible
+            args.seed = 0
+
+    if args.clock == "nodes":
+        clock = CLOCKS[args.clock](args.node_budget)
+    else:
+        clock = CLOCKS[args.clock]()
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
     CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    time_limit = TIME_LIMIT
+    if args.search_nodes is not None:
+        CUSTOM_ARGS.update(node_budget=args.search_nodes, timeout=None)
+        time_limit = None
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -164,18 +467,43 @@ def main():
                    Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
 
     print(DESCRIPTION)
-    for agentUT in test_agents:
-        print("")
-        print("*************************")
-        print("{:^25}".format("Evaluating: " + agentUT.name))
-        print("*************************")
-
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
 
+    if args.sprt:
+        test = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+        status = play_sprt(test_agents[1], test_agents[0], test, args.max_games,
+                           args.processes, args.seed, clock, time_limit,
+                           store, suite, args.log, coordinator, profile)
+        verdicts = {"H1": "{} is stronger than {} by at least {:+g} Elo",
+                    "H0": "{} is not stronger than {} by more than {:+g} Elo",
+                    None: "No decision between {} and {} within the game limit"}
         print("\n\nResults:")
         print("----------")
-        print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+        print(verdicts[status].format(test_agents[1].name, test_agents[0].name,
+                                      test.elo1 if status == "H1" else test.elo0))
+    else:
+        for agentUT in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agentUT.name))
+            print("*************************")
+
+            agents = random_agents + mm_agents + ab_agents + [agentUT]
+            wins, games = play_round(agents, NUM_MATCHES, args.processes, args.seed, clock,
+                                     time_limit, store, suite, args.log, coordinator,
+                                     profile)
+
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%   Elo vs field {}".format(
+                agentUT.name, 100. * wins / games, format_elo(wins, games - wins)))
+
+    if coordinator is not None:
+        coordinator.close()
+
+    if profile is not None:
+        print("\n\nProfile:")
+        print("----------")
+        print(merge_profiles(profile))
 
 
 if __name__ == "__main__":
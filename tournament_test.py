@@ -0,0 +1,371 @@
+"""
+This file contains test cases for the tournament infrastructure in
+tournament.py. Agents with fixed-depth search and a cheap heuristic are used
+so that the results only depend on the random seeds, not on the hardware.
+"""
+import glob
+import os
+import pickle
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+import distributed
+import game_agent
+import openings
+import profiler
+import sprt
+import tournament
+
+from multiprocessing import Process
+from multiprocessing.connection import Client
+
+from isolation import Board
+from isolation import NodeClock
+from isolation import WallClock
+from isolation.gamelog import read_log
+from results_store import ResultsStore
+
+from sample_players import RandomPlayer
+from sample_players import open_move_score
+
+
+def make_agents():
+    """Create a small deterministic round: Random and AB_Open against a
+    fixed-depth agent under test. The agent class is looked up when the
+    agents are made, since agent_test reloads game_agent and instances of
+    a stale class cannot be pickled for the worker processes."""
+    args = {"score_fn": open_move_score, "search_depth": 1, "method": 'alphabeta',
+            "iterative": False}
+    return [tournament.Agent(RandomPlayer(), "Random"),
+            tournament.Agent(game_agent.CustomPlayer(**args), "AB_Open"),
+            tournament.Agent(game_agent.CustomPlayer(**args), "Agent")]
+
+
+def timeout(seconds):
+    """Fail a test that runs longer than `seconds` instead of hanging."""
+    def decorator(test):
+        def wrapper(*args, **kwargs):
+            def expire(signum, frame):
+                raise AssertionError("test timed out after {}s".format(seconds))
+            handler = signal.signal(signal.SIGALRM, expire)
+            signal.alarm(seconds)
+            try:
+                return test(*args, **kwargs)
+            finally:
+                signal.alarm(0)
+                signal.signal(signal.SIGALRM, handler)
+        wrapper.__doc__ = test.__doc__
+        return wrapper
+    return decorator
+
+
+class TournamentTest(unittest.TestCase):
+
+    def test_seeded_match(self):
+        """ Test that a seeded match is reproducible """
+        agents = make_agents()
+        results = [tournament.play_match(agents[0].player, agents[2].player, seed=7)
+                   for _ in range(3)]
+        self.assertEqual(len(set(results)), 1)
+
+    def test_parallel_round(self):
+        """ Test that the parallel round reports the serial results """
+        serial = tournament.play_round(make_agents(), 2, processes=1, seed=11)
+        parallel = tournament.play_round(make_agents(), 2, processes=2, seed=11)
+        self.assertEqual(serial, parallel)
+        # 2 matches of 2 games with each player going first, per opponent
+        wins, games = serial
+        self.assertEqual(games, 4 * 2 * (len(make_agents()) - 1))
+        self.assertTrue(0 <= wins <= games)
+
+    def test_node_clock_round(self):
+        """ Test that time-limited agents are reproducible with a node clock """
+        agents = make_agents()
+        agents[-1] = tournament.Agent(game_agent.CustomPlayer(score_fn=open_move_score,
+                                                              method='alphabeta'), "ID_Open")
+        serial = tournament.play_round(agents, 1, processes=1, seed=3,
+                                       clock=NodeClock(300))
+        parallel = tournament.play_round(agents, 1, processes=2, seed=3,
+                                         clock=NodeClock(300))
+        self.assertEqual(serial, parallel)
+
+
+class ResultsStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "results.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self):
+        store = ResultsStore(self.path)
+        try:
+            return tournament.play_round(make_agents(), 2, seed=5, store=store), len(store)
+        finally:
+            store.close()
+
+    def test_cached_round(self):
+        """ Test that a rerun reports the stored results without new games """
+        result, games = self.play()
+        self.assertEqual(games, 16)
+        self.assertEqual(self.play(), (result, games))
+        with open(self.path) as records:
+            self.assertEqual(len(records.readlines()), games)
+
+    def test_resume_round(self):
+        """ Test that an interrupted round resumes from the stored games """
+        result, games = self.play()
+        with open(self.path) as records:
+            lines = records.readlines()
+        with open(self.path, "w") as records:
+            records.writelines(lines[:3])
+            records.write(lines[3][:10])  # crashed while writing a record
+        self.assertEqual(self.play(), (result, games))
+
+
+class GameLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "games.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_match_log(self):
+        """ Test that every move and result of a match is logged """
+        agents = make_agents()
+        names = (agents[0].name, agents[2].name)
+        results = tournament.play_games(agents[0].player, agents[2].player, seed=9,
+                                        clock=NodeClock(300), log=self.path, names=names)
+        records = read_log(self.path)
+        for index, (winner, termination) in enumerate(results):
+            order = names if index == 0 else names[::-1]
+            game_id = "{}-{}-9-{}".format(order[0], order[1], index)
+            game = [record for record in records if record["game"] == game_id]
+            moves, result = game[:-1], game[-1]
+            self.assertEqual([record["name"] for record in moves],
+                             [order[record["player"] - 1] for record in moves])
+            self.assertEqual([record["ply"] for record in moves], list(range(2, 2 + len(moves))))
+            self.assertEqual(result["termination"], termination)
+            self.assertEqual(result["winner"], winner + 1)
+            # only the search agent reports its effort
+            searched = [record for record in moves if "nodes" in record]
+            self.assertEqual(len(searched), (len(moves) + (index == 1)) // 2)
+            self.assertTrue(all(record["depth"] == 1 for record in searched[:-1]))
+            self.assertTrue(all(0 <= record["time_used"] <= 150 for record in moves))
+
+    def test_parallel_log(self):
+        """ Test that matches played in parallel log whole lines """
+        tournament.play_round(make_agents(), 2, processes=2, seed=4, log=self.path)
+        records = read_log(self.path)
+        self.assertEqual(sum("winner" in record for record in records), 16)
+
+    def test_round_ids(self):
+        """ Test that two rounds with the same seed log distinct game ids """
+        agents = make_agents()
+        for agent in agents[1:]:
+            tournament.play_round([agents[0], agent], 1, processes=1, seed=4, log=self.path)
+        records = read_log(self.path)
+        results = [record["game"] for record in records if "winner" in record]
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(set(results)), 8)
+        names = {agent.name for agent in agents}
+        self.assertTrue(all(record["name"] in names for record in records
+                            if "winner" not in record))
+
+
+class DistributedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.coordinator = distributed.Coordinator(os.path.join(self.directory, "socket"))
+        self.workers = []
+
+    def tearDown(self):
+        self.coordinator.close()
+        for worker in self.workers:
+            worker.join(10)
+        shutil.rmtree(self.directory)
+
+    def start_workers(self, num_workers):
+        for _ in range(num_workers):
+            worker = Process(target=distributed.run_worker, args=(self.coordinator.address,))
+            worker.start()
+            self.workers.append(worker)
+
+    @timeout(60)
+    def test_distributed_round(self):
+        """ Test that a round played by workers reports the serial results """
+        self.start_workers(2)
+        serial = tournament.play_round(make_agents(), 2, processes=1, seed=11)
+        distributed_round = tournament.play_round(make_agents(), 2, seed=11,
+                                                  coordinator=self.coordinator)
+        self.assertEqual(serial, distributed_round)
+
+    @timeout(30)
+    def test_worker_loss(self):
+        """ Test that the job of a lost worker is played by another worker """
+        results = self.coordinator.imap(abs, [-1, -2, -3])
+        lost = Client(self.coordinator.address, authkey=distributed.AUTHKEY)
+        self.assertEqual(lost.recv(), (abs, -1))
+        lost.close()
+        self.start_workers(1)
+        self.assertEqual(list(results), [1, 2, 3])
+
+    @timeout(30)
+    def test_silent_worker(self):
+        """ Test that the job of a worker that stops answering is played again """
+        self.coordinator.worker_timeout = 0.5
+        results = self.coordinator.imap(time.sleep, [0.8, 0])
+        # a host that dies without closing its socket never sends EOF
+        silent = Client(self.coordinator.address, authkey=distributed.AUTHKEY)
+        self.assertEqual(silent.recv(), (time.sleep, 0.8))
+        worker = Process(target=distributed.run_worker,
+                         args=(self.coordinator.address,),
+                         kwargs={"heartbeat": 0.1})
+        worker.start()
+        self.workers.append(worker)
+        # the worker outlives the timeout on the slow job thanks to its heartbeats
+        self.assertEqual(list(results), [None, None])
+        silent.close()
+
+    @timeout(30)
+    def test_failing_jobs(self):
+        """ Test that jobs killing workers and unpicklable jobs fail """
+        results = self.coordinator.imap(abs, [-1])
+        for _ in range(distributed.MAX_ATTEMPTS):
+            lost = Client(self.coordinator.address, authkey=distributed.AUTHKEY)
+            self.assertEqual(lost.recv(), (abs, -1))
+            lost.close()
+        with self.assertRaises(RuntimeError):
+            list(results)
+
+        results = self.coordinator.imap(abs, [lambda: 0])
+        self.start_workers(1)
+        with self.assertRaises((pickle.PicklingError, AttributeError)):
+            list(results)
+        # the worker survives the failed job
+        self.assertEqual(list(self.coordinator.imap(abs, [-2])), [2])
+
+
+class OpeningSuiteTest(unittest.TestCase):
+
+    def test_default_suite(self):
+        """ Test that the shipped suite holds distinct canonical openings """
+        suite = openings.load_suite()
+        self.assertTrue(suite)
+        canonical = [openings.canonical(opening) for opening in suite]
+        self.assertEqual(canonical, [tuple(opening) for opening in suite])
+        self.assertEqual(len(set(canonical)), len(suite))
+
+    def test_symmetric_openings(self):
+        """ Test that mirrored and rotated openings share a canonical form """
+        self.assertEqual(openings.canonical([(0, 1), (3, 3)]),
+                         openings.canonical([(5, 6), (3, 3)]))
+        self.assertEqual(len({openings.canonical([move, (3, 3)])
+                              for move in [(0, 1), (1, 0), (6, 5), (5, 0)]}), 1)
+
+    def test_suite_round(self):
+        """ Test that a round plays the openings of the suite """
+        suite = openings.load_suite()[:4]
+        starts = []
+
+        class RecordingPlayer(RandomPlayer):
+            def get_move(self, game, legal_moves, time_left):
+                if game.move_count == 2:
+                    starts.append([game.get_player_location(game.__player_1__),
+                                   game.get_player_location(game.__player_2__)])
+                return RandomPlayer.get_move(self, game, legal_moves, time_left)
+
+        tournament.play_games(RecordingPlayer(), RecordingPlayer(), 1, opening=suite[0])
+        self.assertEqual(starts, [suite[0], suite[0]])
+
+        agents = make_agents()
+        serial = tournament.play_round(agents, 2, processes=1, seed=13, openings=suite)
+        parallel = tournament.play_round(make_agents(), 2, processes=2, seed=13,
+                                         openings=suite)
+        self.assertEqual(serial, parallel)
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_match_profile(self):
+        """ Test that the get_move calls of a match are sampled per agent """
+        player = game_agent.CustomPlayer(score_fn=open_move_score, search_depth=4,
+                                         method='alphabeta', iterative=False)
+        tournament.play_games(RandomPlayer(), player, seed=2, profile=self.directory,
+                              names=("Random", "AB_Open"))
+        report = profiler.merge_profiles(self.directory)
+        self.assertIn("AB_Open:", report)
+        stacks = profiler.read_collapsed(os.path.join(self.directory, "AB_Open.folded"))
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack.startswith("AB_Open;game_agent.py:get_move")
+                            for stack in stacks))
+        self.assertFalse(any("isolation.py:play" in stack for stack in stacks))
+        self.assertFalse(glob.glob(os.path.join(self.directory, profiler.SAMPLES_PATTERN)))
+
+    def test_anytime_profile(self):
+        """ Test that the wait for an anytime worker is not sampled """
+        player = game_agent.CustomPlayer(score_fn=open_move_score, method='alphabeta',
+                                         anytime=True)
+        sampler = profiler.SamplingProfiler(0.001)
+        sampler.add_player(player, "Anytime")
+        board = Board(player, "null_agent")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        with sampler:
+            for _ in range(3):
+                time_left = WallClock().timer(150)
+                player.get_move(board, board.get_legal_moves(), time_left)
+        samples = {stack: count for (_, stack), count in sampler.samples.items()}
+        self.assertTrue(any("_anytime_search" in stack for stack in samples))
+        # only the moments without a live worker may catch get_move waiting
+        waiting = sum(count for stack, count in samples.items() if "_anytime_move" in stack)
+        self.assertLess(waiting, sum(samples.values()) // 10)
+
+    def test_top_functions(self):
+        """ Test that functions are ranked by self then total samples """
+        stacks = {"A;f;g": 3, "A;f;h": 1, "A;f": 2}
+        samples, functions = profiler.top_functions(stacks)
+        self.assertEqual(samples, 6)
+        self.assertEqual(functions, [("g", 3, 3), ("f", 2, 6), ("h", 1, 1)])
+
+
+class SPRTTest(unittest.TestCase):
+
+    def test_elo_estimate(self):
+        """ Test Elo estimates and their confidence intervals """
+        elo, low, high = sprt.elo_estimate(50, 50)
+        self.assertEqual(elo, 0.)
+        self.assertAlmostEqual(low, -high)
+        elo, low, high = sprt.elo_estimate(75, 25)
+        self.assertAlmostEqual(elo, 190.85, places=2)
+        self.assertTrue(low < elo < high)
+
+    def test_sprt_decisions(self):
+        """ Test that the SPRT accepts the hypothesis matching the results """
+        stronger = sprt.SPRT(0., 50.)
+        while stronger.status is None:
+            stronger.update(stronger.games % 4 != 0)  # 75% score
+        self.assertEqual(stronger.status, "H1")
+
+        equal = sprt.SPRT(0., 50.)
+        while equal.status is None:
+            equal.update(equal.games % 2 == 0)  # 50% score
+        self.assertEqual(equal.status, "H0")
+
+
+if __name__ == '__main__':
+    unittest.main()